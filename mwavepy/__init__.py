@@ -39,6 +39,8 @@ import touchstone
 import frequency
 import network
 import networkSet
+import circuit
+import container
 import convenience
 import plotting
 import mathFunctions
@@ -49,6 +51,8 @@ import tlineFunctions
 from frequency import * 
 from network import * 
 from networkSet import * 
+from circuit import * 
+from container import * 
 from calibration import * 
 from convenience import * 
 from plotting import  * 
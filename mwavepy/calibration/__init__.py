@@ -39,6 +39,7 @@ Modules
    calibration
    calibrationAlgorithms
    calibrationFunctions
+   monteCarlo
 
 
 Classes
@@ -54,7 +55,9 @@ Classes
 import calibration 
 import parametricStandard
 import calibrationFunctions
+import monteCarlo
 
 from parametricStandard import * 
 from calibration import Calibration 
 from calibrationFunctions import * 
+from monteCarlo import *
@@ -42,16 +42,23 @@ import numpy as npy
 from numpy import mean, std
 import pylab as plb
 import os 
-from copy import deepcopy, copy
+import time
 import itertools
+import multiprocessing
+import multiprocessing.pool
+from copy import deepcopy, copy
 import warnings
 
 from calibrationAlgorithms import *
 from ..mathFunctions import complex_2_db, sqrt_phase_unwrap
+from .. import mathFunctions as mf
 from ..frequency import *
 from ..network import *
+from ..network import _touchstone_filenames
 from ..networkSet import func_on_networks as fon
+from ..networkSet import NetworkSet
 from ..convenience import *
+from ..container import ContainerWriter
 
 
 
@@ -71,8 +78,10 @@ class Calibration(object):
 		'one port nls': one_port_nls,\
 		'one port parametric':parameterized_self_calibration,\
 		'one port parametric bounded':parameterized_self_calibration_bounded,\
+		'one port parametric fast':parameterized_self_calibration_fast,\
 		'two port': two_port,\
 		'two port parametric':parameterized_self_calibration,\
+		'two port parametric fast':parameterized_self_calibration_fast,\
 		}
 	'''
 	dictionary holding calibration algorithms.
@@ -163,11 +172,45 @@ class Calibration(object):
 		self.name = name
 		self.is_reciprocal = is_reciprocal
 		#self.switch_terms = switch_terms
+		self._residual_array = None
 		self._residual_ntwks = None
+		self._residual_index = None
+		self._error_metrics = {}
 		self.has_run = False
 		self.sloppy_input= sloppy_input
 
 	## properties
+	@property
+	def measured(self):
+		'''
+		list of the raw measurements of the calibration standards. 
+		
+		setting this means the calibration must be run again, which 
+		happens the next time a dependent property is referenced. if 
+		the list is changed in place, call :func:`run`.
+		'''
+		return self._measured
+	
+	@measured.setter
+	def measured(self, new_measured):
+		self._measured = new_measured
+		self.has_run = False
+	
+	@property
+	def ideals(self):
+		'''
+		list of the ideal responses of the calibration standards. 
+		
+		setting this means the calibration must be run again, see 
+		:attr:`measured`.
+		'''
+		return self._ideals
+	
+	@ideals.setter
+	def ideals(self, new_ideals):
+		self._ideals = new_ideals
+		self.has_run = False
+	
 	@property 
 	def frequency(self):
 		'''
@@ -274,7 +317,8 @@ class Calibration(object):
 		in the form of a vector. 
 		
 		also available are the complex residuals in the form
-		of mwavepy.Network's, see the property 'residual_ntwks'
+		of mwavepy.Network's, see the property 'residual_ntwks', or
+		as an array, see 'residual_array'
 		
 		from numpy.lstsq:
 			residues:
@@ -294,6 +338,10 @@ class Calibration(object):
 			self.run()
 			
 		if self.nports ==1:
+			if self._error_ntwk is None:
+				self._error_ntwk = error_dict_2_network(self.coefs, \
+					frequency=self.frequency, \
+					is_reciprocal=self.is_reciprocal)
 			return self._error_ntwk
 
 		elif self.nports == 2:
@@ -313,6 +361,24 @@ class Calibration(object):
 		else:
 			raise NotImplementedError('Not sure what to do yet')
 	
+	@property
+	def residual_array(self):
+		'''
+		the residuals of all calibration standards, as an array of 
+		shape nstandards x f x n x n.
+		
+		these are the s-matrices of :attr:`residual_ntwks`. they are 
+		calculated for all standards at once, the first time they are 
+		referenced after each :func:`run`.
+		'''
+		if not self.has_run:
+			self.run()
+		if self._residual_array is None:
+			self._residual_array = \
+				self.apply_cal(npy.array([ntwk.s for ntwk in self.measured]))\
+				- npy.array([ntwk.s for ntwk in self.ideals])
+		return self._residual_array
+	
 	@property
 	def residual_ntwks(self):
 		'''
@@ -333,27 +399,17 @@ class Calibration(object):
 		
 		
 		note:
-			the residuals are only calculated if they are not existent.
-		so, if you want to re-calculate the residual networks then 
-		you delete the property '_residual_ntwks'. 
+			the Networks are made from :attr:`residual_array` the 
+		first time they are referenced after each :func:`run`. their 
+		s-matrices are views of that array.
 		'''
-		if self._residual_ntwks is not None:
-			return self._residual_ntwks
-		else:
-			ntwk_list=\
-				[ ((self.apply_cal(self.measured[k]))-self.ideals[k]) \
-					for k in range(len(self.ideals))]
-			
-			for k in range(len(ntwk_list)):
-				if self.ideals[k].name  is not None:
-					name = self.ideals[k].name
-				else:
-					name='std# %i'%k
-				
-				ntwk_list[k].name = self.ideals[k].name 
-			
-			self._residual_ntwks = ntwk_list
-		return ntwk_list 
+		if not self.has_run:
+			self.run()
+		if self._residual_ntwks is None:
+			self._residual_ntwks = [self.measured[k]._with_s(residual, \
+				name=self.ideals[k].name) \
+				for k, residual in enumerate(self.residual_array)]
+		return self._residual_ntwks
 	
 
 	##  methods for manual control of internal calculations
@@ -368,70 +424,131 @@ class Calibration(object):
 		'''
 		# some basic checking to make sure they gave us consistent data
 		if self.type == 'one port' or self.type == 'two port':
-			
-			if self.sloppy_input == True:
-				# if they gave sloppy input try to align networks based
-				# on their names 
-				self.ideals= [ ideal for measure in self.measured\
-					for ideal in self.ideals if ideal.name in measure.name]
-			else:
-				#1 did they supply the same number of  ideals as measured?
-				if len(self.measured) != len(self.ideals):
-					raise(IndexError(' The length of measured and ideals lists are different. Number of ideals must equal the number of measured. '))
-			
-			#2 are all the networks' frequency's the same? 
-			index_tuple = \
-			list(itertools.permutations(range(len(self.measured)),2))
-			
-			for k in index_tuple:
-				if self.measured[k[0]].frequency != \
-					self.ideals[k[1]].frequency:
-					raise(IndexError('Frequency information doesnt match on measured[%i], ideals[%i]. All networks must have identical frequency information'%(k[0],k[1])))
-#
-		
-		
+			self._check_standards()
 		
 		# actually call the algorithm and run the calibration
-		self._output_from_cal = \
-			self.calibration_algorithm_dict[self.type](measured = self.measured, ideals = self.ideals,**self.kwargs)
+		self._set_output_from_cal(\
+			self.calibration_algorithm_dict[self.type](measured = self.measured, ideals = self.ideals,**self.kwargs))
 
+	## methods 
+	def _check_standards(self):
+		'''
+		aligns the ideals to the measured, if `sloppy_input`, and 
+		checks the standards are consistent. used by :func:`run` for
+		the linear calibration types.
+		'''
+		if self.sloppy_input == True:
+			# if they gave sloppy input try to align networks based
+			# on their names 
+			self.ideals= [ ideal for measure in self.measured\
+				for ideal in self.ideals if ideal.name in measure.name]
+		else:
+			#1 did they supply the same number of  ideals as measured?
+			if len(self.measured) != len(self.ideals):
+				raise(IndexError(' The length of measured and ideals lists are different. Number of ideals must equal the number of measured. '))
+		
+		#2 are all the networks' frequency's the same? 
+		# equality is transitive, so each network is compared to
+		# the first measurement only
+		self._check_frequencies()
+	
+	def _set_output_from_cal(self, output_from_cal):
+		'''
+		stores the output of the calibration algorithm, and the
+		quantities apply_cal needs which are derived from it.
+		'''
+		self._output_from_cal = output_from_cal
+		
 		if self.nports ==1:
-			self._error_ntwk = error_dict_2_network(self.coefs, \
-				frequency=self.frequency, is_reciprocal=self.is_reciprocal)
+			# made when it is first used, see error_ntwk
+			self._error_ntwk = None
+			self._one_port_kernel = _one_port_kernel(self.coefs)
 		elif self.nports ==2:
 			self._Ts = two_port_error_vector_2_Ts(self.coefs)
+			# the T-matrices are diagonal, apply_cal only needs these
+			self._Ts_diagonals = _Ts_diagonals(self._Ts)
 		
-		#reset the residuals
+		#reset the residuals, and the error metrics made from them
+		self._residual_array = None
 		self._residual_ntwks = None
+		self._residual_index = None
+		self._error_metrics = {}
 		
 		self.has_run = True
 
-	## methods 
+	def _check_frequencies(self):
+		'''
+		raises an IndexError if the measured and ideal networks dont 
+		all have the same frequency as `measured[0]`
+		'''
+		reference = self.measured[0].frequency
+		for kind, ntwk_list in [('measured', self.measured), \
+			('ideals', self.ideals)]:
+			for k, ntwk in enumerate(ntwk_list):
+				if ntwk.frequency != reference:
+					raise(IndexError('Frequency information doesnt match on %s[%i] and measured[0]. All networks must have identical frequency information'%(kind,k)))
+
 	def apply_cal(self,input_ntwk):
 		'''
-		apply the current calibration to a measurement.
+		apply the current calibration to a measurement, or to a batch
+		of measurements.
 
 		takes:
-			input_ntwk: the measurement to apply the calibration to, a
-				Network type.
+			input_ntwk: the measurement to apply the calibration to. a
+				Network, a list of Networks, a NetworkSet, or a numpy
+				array of s-matrices of shape fxnxn, or dxfxnxn for d 
+				measurements.
 		returns:
-			caled: the calibrated measurement, a Network type.
+			caled: the calibrated measurement, of the same type as 
+				input_ntwk.
+		
+		note:
+			two-port batches are corrected in one vectorized 
+			operation, so passing a whole batch is much faster than 
+			calling this for each measurement.
 		'''
-		if self.nports ==1:
-			caled =  self.error_ntwk.inv**input_ntwk 
-			caled.name = input_ntwk.name
-			
-		elif self.nports == 2:
-			caled = deepcopy(input_ntwk)
-			T1,T2,T3,T4 = self.Ts
-			dot = npy.dot
-			for f in range(len(input_ntwk.s)):
-				t1,t2,t3,t4,m = T1[f,:,:],T2[f,:,:],T3[f,:,:],\
-					T4[f,:,:],input_ntwk.s[f,:,:]
-				caled.s[f,:,:] = dot(npy.linalg.inv(-1*dot(m,t3)+t1),(dot(m,t4)-t2))
-		return caled 
+		if isinstance(input_ntwk, NetworkSet):
+			return NetworkSet(self.apply_cal(input_ntwk.ntwk_set))
+		
+		if isinstance(input_ntwk, (list, tuple)):
+			if len(input_ntwk) == 0:
+				return []
+			s = self.apply_cal(npy.array([ntwk.s for ntwk in input_ntwk]))
+			return [ntwk._with_s(s_k) for ntwk, s_k in zip(input_ntwk,s)]
+		
+		if isinstance(input_ntwk, npy.ndarray):
+			if self.nports == 1:
+				return self._apply_one_port_cal(input_ntwk)
+			elif self.nports == 2:
+				return self._apply_two_port_cal(input_ntwk)
+		
+		return input_ntwk._with_s(self.apply_cal(input_ntwk.s))
+	
+	def _apply_one_port_cal(self, s):
+		'''
+		corrects raw one-port s-matrices, of shape fx1x1 or dxfx1x1. 
+		
+		this is the same as `self.error_ntwk.inv ** m`, written as the 
+		bilinear transform whose coefficients are kept by :func:`run`.
+		'''
+		if not self.has_run:
+			self.run()
+		return _apply_one_port_kernel(self._one_port_kernel, s)
+	
+	def _apply_two_port_cal(self, s):
+		'''
+		corrects raw two-port s-matrices, of shape fx2x2 or dxfx2x2. 
+		
+		the calibrated s-matrix is inv(T1-m*T3)*(m*T4-T2), where m is 
+		the measured s-matrix. the T-matrices are diagonal, so the 
+		products are scalings of the columns of m, and the inverse is 
+		written out for the 2x2 case.
+		'''
+		self.Ts	# makes sure the calibration has run
+		return _apply_two_port_kernel(self._Ts_diagonals, s)
 
-	def apply_cal_to_all_in_dir(self, dir, contains=None, f_unit = 'ghz'):
+	def apply_cal_to_all_in_dir(self, dir, contains=None, f_unit = 'ghz',\
+		**kwargs):
 		'''
 		convience function to apply calibration to an entire directory
 		of measurements, and return a dictionary of the calibrated
@@ -444,19 +561,196 @@ class Calibration(object):
 				this string.
 			f_unit: frequency unit, to use for all networks. see
 				frequency.Frequency.unit for info.
+			\*\*kwargs: passed to load_all_touchstones, to filter the
+				files, or load them in parallel. see
+				network.load_all_touchstones for info.
 		returns:
 			ntwkDict: a dictionary of calibrated measurements, the keys
 				are the filenames.
+		
+		see also:
+			apply_cal_to_dir: for directories too large to hold in 
+				memory
 		'''
 		ntwkDict = load_all_touchstones(dir=dir, contains=contains,\
-			f_unit=f_unit)
+			f_unit=f_unit, **kwargs)
 
 		for ntwkKey in ntwkDict:
 			ntwkDict[ntwkKey] = self.apply_cal(ntwkDict[ntwkKey])
 		
 		return ntwkDict
+	
+	def apply_cal_to_dir(self, dir, out_dir=None, container=None, \
+		contains=None, pattern=None, workers=1, pool='process', \
+		progress=None, form='ri'):
+		'''
+		corrects every touchstone file in a directory, writing the 
+		results as it goes. 
+		
+		unlike :func:`apply_cal_to_all_in_dir`, the measurements are 
+		never all held in memory. files are read, corrected and written 
+		a few at a time, optionally by a pool of workers, so memory use
+		does not depend on the size of the directory. a ValueError is 
+		raised if a file does not have the frequency of the calibration.
+		
+		takes:
+			dir: directory of measurements (string)
+			out_dir: directory to write the corrected touchstone files 
+				to, with the same names as the measurements.
+			container: filename of a container file to write the 
+				corrected networks to instead. see 
+				mwavepy.container.
+			contains: only files whose name contains this are corrected
+			pattern: only files whose name matches this glob pattern, 
+				or compiled regular expression, are corrected.
+			workers: number of files corrected at once. if None, the 
+				number of cpus is used.
+			pool: ['process','thread'], kind of worker pool
+			progress: function, called as 
+				progress(n_done, n_total, filename) after each file 
+				is written, like in load_all_touchstones.
+			form: format of the written touchstone files, see 
+				Network.write_touchstone
+		returns:
+			stats: a dictionary with the number of 'files', the 
+				'seconds' it took and the throughput, 'files per second'.
+		
+		example:
+			>>> cal.apply_cal_to_dir('raw/', out_dir='corrected/', workers=4)
+		'''
+		if (out_dir is None) == (container is None):
+			raise(ValueError('give one of out_dir or container'))
+		if out_dir is not None and not os.path.isdir(out_dir):
+			os.makedirs(out_dir)
+		if not self.has_run:
+			# run once here, instead of in every worker
+			self.run()
+		
+		writer = None
+		if container is not None:
+			writer = ContainerWriter(container, self.frequency, self.nports)
+		if workers is None:
+			workers = multiprocessing.cpu_count()
+		
+		filenames = list(_touchstone_filenames(dir, contains, pattern))
+		args = ((filename, out_dir, form) for filename in filenames)
+		worker_pool = None
+		if workers == 1:
+			_set_worker_calibration(self)
+			results = (_correct_file(arg) for arg in args)
+		else:
+			if pool == 'process':
+				worker_pool = multiprocessing.Pool(workers, \
+					_set_worker_calibration, (self,))
+			elif pool == 'thread':
+				worker_pool = multiprocessing.pool.ThreadPool(workers, \
+					_set_worker_calibration, (self,))
+			else:
+				raise(ValueError('pool must be \'process\' or \'thread\''))
+			results = _imap_bounded(worker_pool, _correct_file, args, \
+				4*workers)
+		
+		start, count = time.time(), 0
+		try:
+			for filename, caled in results:
+				if writer is not None:
+					writer.append(caled)
+				count += 1
+				if progress is not None:
+					progress(count, len(filenames), filename)
+		finally:
+			if worker_pool is not None:
+				worker_pool.close()
+				worker_pool.join()
+			if writer is not None:
+				writer.close()
+			_set_worker_calibration(None)
+		seconds = time.time() - start
+		return {'files':count, 'seconds':seconds, \
+			'files per second':count/max(seconds, 1e-9)}
 		
 	## error metrics and related functions
+	def residual_index(self, std_names=None):
+		'''
+		the residuals of each standard, stacked across connections. 
+		
+		the index is made once per :func:`run`, and the error metrics
+		are calculated from it.
+		
+		takes:
+			std_names: list of strings to uniquely identify each
+				standard. a residual belongs to every std_name which is 
+				in its ideal's name. [names of the ideals]
+		returns:
+			index: dictionary with the std_names as keys, and values 
+				equal to (the indecies of the residuals in 
+				residual_array, stack of their s-matrices of shape 
+				cxfxnxn, for c connections)
+		'''
+		if not self.has_run:
+			self.run()
+		if self._residual_index is None:
+			self._residual_index = {}
+		key = self._std_names_key(std_names)
+		if key not in self._residual_index:
+			residuals = self.residual_array
+			names = [ntwk.name for ntwk in self.ideals]
+			index = {}
+			for std_name in self._std_names(std_names):
+				k_list = [k for k in range(len(names)) \
+					if std_name in names[k]]
+				index[std_name] = (k_list, residuals[k_list])
+			self._residual_index[key] = index
+		return self._residual_index[key]
+	
+	def _std_names(self, std_names):
+		'''
+		the std_names the error metrics are calculated for, in order.
+		by default, the names of the ideals, in the order they first 
+		appear.
+		'''
+		if std_names is None:
+			std_names = []
+			for ntwk in self.ideals:
+				if ntwk.name not in std_names:
+					std_names.append(ntwk.name)
+		return list(std_names)
+	
+	def _std_names_key(self, std_names):
+		if std_names is None:
+			return None
+		return tuple(std_names)
+	
+	def _error_metric(self, key, func):
+		'''
+		memoizes error metric `key`, calculated by func(). the metrics
+		are cleared when the calibration is run. 
+		
+		copies of the memoized Networks are returned, so callers can 
+		change them.
+		'''
+		if not self.has_run:
+			self.run()
+		if key not in self._error_metrics:
+			self._error_metrics[key] = func()
+		metric = self._error_metrics[key]
+		if isinstance(metric, list):
+			return [ntwk._with_s(ntwk.s.copy()) for ntwk in metric]
+		return metric._with_s(metric.s.copy())
+	
+	def _residual_component(self, s, attribute):
+		'''
+		a component of a stack of residual s-matrices, like the 
+		Network attribute `attribute`
+		'''
+		if attribute in RESIDUAL_COMPONENTS:
+			return RESIDUAL_COMPONENTS[attribute](s)
+		return npy.array([getattr(self.measured[0]._with_s(s_k), \
+			attribute) for s_k in s])
+	
+	def _residual_network(self, s, name):
+		return self.measured[0]._with_s(s, name=name)
+	
 	def mean_residuals(self):
 		'''
 		'''
@@ -486,18 +780,25 @@ class Calibration(object):
 				mycal.uncertainty_per_standard(['short','open','match'])
 		
 		'''
-		if std_names is None:
-			std_names = set([ntwk.name for ntwk in self.ideals])
-		return [fon([r for r in self.residual_ntwks \
-			if std_name in r.name],std,attribute) \
-			for std_name in std_names]
+		return self.func_per_standard(std, attribute, std_names)
 	
 	def func_per_standard(self, func,attribute='s',std_names=None):
-		if std_names is None:
-			std_names = set([ntwk.name for ntwk in self.ideals])
-		return [fon([r for r in self.residual_ntwks \
-			if std_name in r.name],func,attribute) \
-			for std_name in std_names]
+		'''
+		applies func(residuals, axis=0) across the connections of each 
+		standard, see uncertainty_per_standard.
+		
+		returns:
+			list of mwavepy.Networks, one per standard
+		'''
+		def per_standard():
+			index = self.residual_index(std_names)
+			return [self._residual_network(\
+				func(self._residual_component(index[std_name][1], \
+					attribute), axis=0), \
+				self.ideals[index[std_name][0][0]].name) \
+				for std_name in self._std_names(std_names)]
+		return self._error_metric(('func_per_standard', func, attribute, \
+			self._std_names_key(std_names)), per_standard)
 		
 	def biased_error(self, std_names=None):
 		'''
@@ -519,14 +820,13 @@ class Calibration(object):
 				mean_c: complex mean taken accross connection
 				mean_s: complex mean taken accross standard
 		'''
-		if std_names is None:
-			std_names = set([ntwk.name for ntwk in self.ideals])
-		biased_error= \
-			fon([fon( [ntwk for ntwk in self.residual_ntwks \
-				if std_name in ntwk.name],mean) \
-				for std_name in std_names],mean, 's_mag')
-		biased_error.name='biased error'
-		return biased_error
+		def biased_error():
+			mean_c = npy.array([ntwk.s for ntwk in \
+				self.func_per_standard(mean, 's', std_names)])
+			return self._residual_network(\
+				mean(abs(mean_c), axis=0), 'biased error')
+		return self._error_metric(\
+			('biased error', self._std_names_key(std_names)), biased_error)
 	
 	def unbiased_error(self, std_names=None):
 		'''
@@ -552,14 +852,14 @@ class Calibration(object):
 				std_c: standard deviation taken accross  connections
 				mean_s: complex mean taken accross  standards
 		'''
-		if std_names is None:
-			std_names = set([ntwk.name for ntwk in self.ideals])
-		unbiased_error= \
-			fon([fon( [ntwk for ntwk in self.residual_ntwks \
-				if std_name in ntwk.name],std) \
-				for std_name in std_names],mean)
-		unbiased_error.name = 'unbiased error'
-		return unbiased_error
+		def unbiased_error():
+			std_c = npy.array([ntwk.s for ntwk in \
+				self.uncertainty_per_standard(std_names)])
+			return self._residual_network(mean(std_c, axis=0), \
+				'unbiased error')
+		return self._error_metric(\
+			('unbiased error', self._std_names_key(std_names)), \
+			unbiased_error)
 		
 	def total_error(self, std_names=None):
 		'''
@@ -569,7 +869,8 @@ class Calibration(object):
 		
 		takes:
 			std_names: list of strings to uniquely identify each
-				standard.* 
+				standard.* only the residuals of these standards are
+				used. [all residuals]
 		returns:
 			composit error: mwavepy.Network type who's .s_mag is 
 				proportional to the composit error metric
@@ -582,12 +883,18 @@ class Calibration(object):
 				std_cs: standard deviation taken accross connections
 					and standards
 		'''	
-		if std_names is None:
-			std_names = set([ntwk.name for ntwk in self.ideals])
-		total_error= \
-			fon([ntwk for ntwk in self.residual_ntwks],mean,'s_mag') 
-		total_error.name='total error'
-		return total_error
+		def total_error():
+			if std_names is None:
+				residuals = self.residual_array
+			else:
+				index = self.residual_index(std_names)
+				k_list = sorted(set([k for std_name in index \
+					for k in index[std_name][0]]))
+				residuals = self.residual_array[k_list]
+			return self._residual_network(mean(abs(residuals), axis=0), \
+				'total error')
+		return self._error_metric(\
+			('total error', self._std_names_key(std_names)), total_error)
 
 	## ploting
 	def plot_coefs_db(self,ax=None,show_legend=True,**kwargs):
@@ -675,6 +982,108 @@ class Calibration(object):
 		
 	
 ## Functions	
+# components of stacks of residual s-matrices, like the Network 
+# attributes of the same name. see Calibration._residual_component
+RESIDUAL_COMPONENTS = {\
+	's': lambda s: s,\
+	's_re': npy.real,\
+	's_im': npy.imag,\
+	's_mag': mf.complex_2_magnitude,\
+	's_db': mf.complex_2_db,\
+	's_deg': mf.complex_2_degree,\
+	}
+
+# the calibration used by _correct_file, set once in each worker
+_worker_calibration = None
+
+def _set_worker_calibration(cal):
+	global _worker_calibration
+	_worker_calibration = cal
+
+def _correct_file(args):
+	'''
+	reads and corrects one touchstone file, for 
+	:func:`Calibration.apply_cal_to_dir`. if `out_dir` is given the 
+	result is written there and only the filename is returned.
+	'''
+	filename, out_dir, form = args
+	ntwk = Network(filename)
+	if ntwk.frequency != _worker_calibration.frequency:
+		raise(ValueError('%s does not have the frequency of the calibration'\
+			%filename))
+	caled = _worker_calibration.apply_cal(ntwk)
+	if out_dir is not None:
+		caled.write_touchstone(caled.name, dir=out_dir, form=form)
+		caled = None
+	return filename, caled
+
+def _imap_bounded(pool, func, iterable, size):
+	'''
+	like pool.imap, but only `size` items of `iterable` are taken at
+	a time, so results cant pile up faster than they are used.
+	'''
+	iterable = iter(iterable)
+	while True:
+		chunk = list(itertools.islice(iterable, size))
+		if len(chunk) == 0:
+			return
+		for result in pool.imap(func, chunk):
+			yield result
+
+def _one_port_kernel(coefs):
+	'''
+	the one-port correction is the bilinear transform 
+	(m-e00)/(e11*m + e01e10-e11*e00). this returns its coefficients, 
+	[b,c,d] of (m+b)/(c*m+d), for a one-port error coefficient 
+	dictionary.
+	'''
+	return npy.array([\
+		-coefs['directivity'], \
+		coefs['source match'], \
+		coefs['reflection tracking'] - \
+			coefs['source match']*coefs['directivity'],\
+		]).reshape(3,-1,1,1)
+
+def _Ts_diagonals(Ts):
+	'''
+	the diagonals of the (diagonal) T-matrices, which is all the 
+	two-port correction needs.
+	'''
+	return [npy.diagonal(T, axis1=1, axis2=2) for T in Ts]
+
+def _apply_one_port_kernel(kernel, s):
+	'''
+	the one-port correction (m+b)/(c*m+d), for `kernel` = [b,c,d], as
+	kept by :func:`Calibration.run`. the kernel may have leading 
+	dimensions, for several calibrations, which broadcast against `s`.
+	'''
+	b, c, d = kernel
+	m = npy.asarray(s)
+	return (m + b)/(c*m + d)
+
+def _apply_two_port_kernel(Ts_diagonals, s):
+	'''
+	the two-port correction inv(T1-m*T3)*(m*T4-T2), for the diagonals
+	of the T-matrices, as kept by :func:`Calibration.run`. the 
+	diagonals may have leading dimensions, for several calibrations,
+	which broadcast against `s`.
+	'''
+	t1, t2, t3, t4 = Ts_diagonals
+	m = npy.asarray(s)
+	m00, m01, m10, m11 = m[...,0,0], m[...,0,1], m[...,1,0], m[...,1,1]
+	# A = T1-m*T3, B = m*T4-T2
+	a00, a01 = t1[...,0] - m00*t3[...,0], -m01*t3[...,1]
+	a10, a11 = -m10*t3[...,0], t1[...,1] - m11*t3[...,1]
+	b00, b01 = m00*t4[...,0] - t2[...,0], m01*t4[...,1]
+	b10, b11 = m10*t4[...,0], m11*t4[...,1] - t2[...,1]
+	inv_det = 1./(a00*a11 - a01*a10)
+	caled = npy.empty(inv_det.shape + (2,2), dtype=complex)
+	caled[...,0,0] = (a11*b00 - a01*b10)*inv_det
+	caled[...,0,1] = (a11*b01 - a01*b11)*inv_det
+	caled[...,1,0] = (a00*b10 - a10*b00)*inv_det
+	caled[...,1,1] = (a00*b11 - a10*b01)*inv_det
+	return caled
+
 def two_port_error_vector_2_Ts(error_coefficients):
 	ec = error_coefficients
 	npoints = len(ec['k'])
@@ -42,6 +42,7 @@ Calibration Algorithms
 	two_port
 	parameterized_self_calibration
 	parameterized_self_calibration_nls
+	parameterized_self_calibration_fast
 
 Supporting Functions
 -----------------------
@@ -51,6 +52,8 @@ Supporting Functions
    unterminate_switch_terms
    abc_2_coefs_dict
    eight_term_2_one_port_coefs
+   batched_lstsq
+   ParametricStandardEvaluator
    
 
 '''
@@ -59,6 +62,7 @@ from copy import copy,deepcopy
 import numpy as npy
 from scipy import rand
 from scipy.optimize import fmin_slsqp,fmin,leastsq # used for xds
+from scipy.optimize import fmin_l_bfgs_b
 
 from parametricStandard.parametricStandard import ParameterBoundsError
 from ..mathFunctions import scalar2Complex, complex2Scalar
@@ -114,6 +118,120 @@ def eight_term_2_one_port_coefs(coefs):
 		}
 	return port1_coefs, port2_coefs
 
+def batched_lstsq(A, b, solver='svd'):
+	'''
+	least squares solutions of a stack of linear systems, A[k]x[k]=b[k]
+	
+	this solves the systems for all frequencies at once, instead of 
+	calling :func:`numpy.linalg.lstsq` for each.
+	
+	Parameters
+	-----------
+	A : numpy.ndarray
+		stack of matrices, shape FxMxN
+	b : numpy.ndarray
+		stack of vectors, shape FxM, or of matrices, shape FxMxK
+	solver : ['svd','normal']
+		'svd' solves with the pseudo-inverse from a batched singular 
+		value decomposition. like :func:`numpy.linalg.lstsq`, 
+		singular values below machine precision (relative to the 
+		largest) are ignored. 'normal' solves the normal equations, 
+		A^H A x = A^H b, which is faster but squares the condition 
+		number.
+	
+	Returns
+	--------
+	x : numpy.ndarray
+		solutions, shape FxN or FxNxK
+	residuals : numpy.ndarray
+		sums of squared magnitudes of the residuals, |b-Ax|^2, shape 
+		F or FxK
+	rank : numpy.ndarray
+		rank of each matrix, shape F. for the 'normal' solver this is
+		always N, a singular system raises a LinAlgError instead.
+	'''
+	vector = (b.ndim == A.ndim-1)
+	if vector:
+		b = b[...,None]
+	A_H = A.conj().swapaxes(-1,-2)
+	if solver == 'svd':
+		U, s, Vh = npy.linalg.svd(A, full_matrices=False)
+		cutoff = npy.finfo(float).eps * s[...,:1]
+		rank = npy.sum(s > cutoff, axis=-1)
+		s_inv = npy.where(s > cutoff, 1./npy.where(s > cutoff, s, 1), 0)
+		x = npy.matmul(Vh.conj().swapaxes(-1,-2), \
+			s_inv[...,None]*npy.matmul(U.conj().swapaxes(-1,-2), b))
+	elif solver == 'normal':
+		x = npy.linalg.solve(npy.matmul(A_H, A), npy.matmul(A_H, b))
+		rank = npy.repeat(A.shape[-1], A.shape[0])
+	else:
+		raise(ValueError('solver must be \'svd\' or \'normal\''))
+	residuals = npy.sum(npy.abs(b - npy.matmul(A, x))**2, axis=-2)
+	if vector:
+		x, residuals = x[...,0], residuals[...,0]
+	return x, residuals, rank
+
+class ParametricStandardEvaluator(object):
+	'''
+	calculates the s-matrices of a list of parametric standards, for a
+	parameter vector holding all of their parameters. 
+	
+	the s-matrix of each standard is kept, and only re-calculated when
+	that standard's parameters change. so when an optimizer changes one
+	parameter, only one standard's network is generated.
+	'''
+	def __init__(self, ideals_ps):
+		'''
+		takes:
+			ideals_ps: list of ParametricStandard types
+		'''
+		self.ideals_ps = ideals_ps
+		# the slice of the parameter vector belonging to each std
+		self.slices = []
+		p_index = 0
+		for a_ps in ideals_ps:
+			self.slices.append(slice(p_index, \
+				p_index+a_ps.number_of_parameters))
+			p_index += a_ps.number_of_parameters
+		self.number_of_parameters = p_index
+		self.parameter_owner = npy.zeros(p_index, dtype=int)
+		for k, a_slice in enumerate(self.slices):
+			self.parameter_owner[a_slice] = k
+		self._parameters = [None]*len(ideals_ps)
+		self._s = [None]*len(ideals_ps)
+	
+	@property
+	def parameter_vector(self):
+		'''
+		the current parameters of all stds, in order
+		'''
+		return npy.array([p for a_ps in self.ideals_ps \
+			for p in a_ps.parameter_array], dtype=float)
+	
+	def s_of_standard(self, k, parameters):
+		'''
+		the s-matrix of standard `k` for its `parameters`. this does
+		not change the kept s-matrices.
+		'''
+		a_ps = self.ideals_ps[k]
+		a_ps.parameter_array = parameters
+		return a_ps.network.s
+	
+	def s_list(self, parameter_vector):
+		'''
+		list of the s-matrices of all stds, for `parameter_vector`
+		'''
+		for k, a_slice in enumerate(self.slices):
+			parameters = npy.array(parameter_vector[a_slice], dtype=float)
+			if self._s[k] is None or \
+				not npy.array_equal(parameters, self._parameters[k]):
+				self._s[k] = self.s_of_standard(k, parameters)
+				self._parameters[k] = parameters
+			else:
+				# a jacobian may have left a std at other parameters
+				self.ideals_ps[k].parameter_array = parameters
+		return list(self._s)
+
 def guess_length_of_delay_short( aNtwk,tline):
 		'''
 		guess length of physical length of a Delay Short given by aNtwk
@@ -172,7 +290,7 @@ def unterminate_switch_terms(two_port, gamma_f, gamma_r):
 
 	
 ## ONE PORT 
-def one_port(measured, ideals):
+def one_port(measured, ideals, solver='svd'):
 	'''
 	Standard algorithm for a one port calibration. 
 	
@@ -191,6 +309,10 @@ def one_port(measured, ideals):
 		of the list can  either a kxnxn numpy.ndarray, representing a 
 		s-matrix, or list of  1-port :class:`~mwavepy.network.Network`
 		objects.
+	solver : ['svd','normal','lstsq']
+		how the least squares problem is solved. 'svd' and 'normal' 
+		solve all frequencies at once, see :func:`batched_lstsq`. 
+		'lstsq' calls numpy.linalg.lstsq() at each frequency.
 	
 	Returns
 	-----------
@@ -200,11 +322,14 @@ def one_port(measured, ideals):
 		   coefficients
 		 * 'residuals': a matrix of residuals from the least squared 
 		   calculation. see numpy.linalg.lstsq() for more info
+		 * 'parameter variance': fx3x3 matrix, only calculated if 
+		   more than three standards are given
 
 
 	Notes
 	-----
-		uses numpy.linalg.lstsq() for least squares calculation
+		uses numpy.linalg.lstsq(), or an equivalent batched solver, 
+		for least squares calculation
 	
 	See Also
 	---------
@@ -228,6 +353,28 @@ def one_port(measured, ideals):
 	# ASSERT: mList and aList are now kx1x1 matrices, where k in frequency
 	fLength = len(mList[0])
 	
+	if solver != 'lstsq':
+		# form Q for all frequencies at once, Q[f] is the matrix 
+		# described in the loop below
+		m = npy.array(mList).reshape(numStds,fLength).T
+		i = npy.array(iList).reshape(numStds,fLength).T
+		Q = npy.concatenate([i[...,None], npy.ones(i.shape+(1,)), \
+			(i*m)[...,None]], axis=-1)
+		abc, residualsTmp, rank = batched_lstsq(Q, m, solver=solver)
+		residuals =	npy.zeros((fLength,\
+			npy.sign(numStds-numCoefs)),dtype=complex) 
+		parameter_variance = npy.zeros((fLength, 3,3),dtype=complex)
+		if numStds > 3:
+			if npy.any(rank < numCoefs):
+				raise(ValueError('matrix has singular values. ensure standards are far enough away on smith chart'))
+			residuals[:,0] = residualsTmp
+			measurement_variance = residuals/(numStds-numCoefs)
+			parameter_variance[:] = abs(measurement_variance)[...,None]*\
+				npy.linalg.inv(npy.matmul(Q.swapaxes(-1,-2),Q))
+		output = {'error coefficients':abc_2_coefs_dict(abc), \
+			'residuals':residuals, 'parameter variance':parameter_variance}
+		return output
+	
 	#initialize outputs 
 	abc = npy.zeros((fLength,numCoefs),dtype=complex) 
 	residuals =	npy.zeros((fLength,\
@@ -366,7 +513,7 @@ def one_port_nls (measured, ideals):
 
 
 ## TWO PORT
-def two_port(measured, ideals, switch_terms = None):
+def two_port(measured, ideals, switch_terms = None, solver='svd'):
 	'''
 	Two port calibration based on the 8-term error model.
 	
@@ -392,6 +539,11 @@ def two_port(measured, ideals, switch_terms = None):
 			(forward, reverse).  This is only applicable in two-port
 			calibrations. See Roger Mark's paper on switch terms [1]_ 
 			for explanation of what they are.
+	
+	solver : ['svd','normal','lstsq']
+		how the least squares problem is solved. 'svd' and 'normal' 
+		solve all frequencies at once, see :func:`batched_lstsq`. 
+		'lstsq' calls numpy.linalg.lstsq() at each frequency.
 
 	Returns
 	----------
@@ -448,6 +600,66 @@ def two_port(measured, ideals, switch_terms = None):
 	#initialize outputs 
 	error_vector = npy.zeros(shape=(fLength,numCoefs),dtype=complex) 
 	residuals = npy.zeros(shape=(fLength,4*numStds-numCoefs),dtype=complex) 
+	
+	if solver != 'lstsq':
+		# form Q and M for all frequencies at once. the rows for 
+		# each standard are the same as in the loop below.
+		m = npy.array(mList).swapaxes(0,1)	# fxnumStdsx2x2
+		i = npy.array(iList).swapaxes(0,1)
+		Q = npy.zeros((fLength, numStds, 4, numCoefs), dtype=complex)
+		M = npy.zeros((fLength, numStds, 4), dtype=complex)
+		Q[...,0,0] = 1
+		Q[...,3,3] = 1
+		for r, (a, b) in enumerate([(0,0),(0,1),(1,0),(1,1)]):
+			# i[0,b]*m[a,0] and i[1,b]*m[a,1]
+			Q[...,r,1] = i[...,0,b]*m[...,a,0]
+			Q[...,r,4] = i[...,1,b]*m[...,a,1]
+		Q[...,0,2] = -i[...,0,0]
+		Q[...,1,2] = -i[...,0,1]
+		Q[...,2,5] = -i[...,1,0]
+		Q[...,3,5] = -i[...,1,1]
+		Q[...,1,6] = -m[...,0,1]
+		Q[...,3,6] = -m[...,1,1]
+		M[...,0] = m[...,0,0]
+		M[...,2] = m[...,1,0]
+		
+		error_vector, residuals_at_f, rank = batched_lstsq(\
+			Q.reshape(fLength, 4*numStds, numCoefs), \
+			M.reshape(fLength, 4*numStds), solver=solver)
+		if 4*numStds > numCoefs:
+			if npy.any(rank < numCoefs):
+				raise(ValueError('matrix has singular values, check standards'))
+			residuals[:] = residuals_at_f[:,None]
+	else:
+		error_vector, residuals = _two_port_lstsq_loop(mList, iList, \
+			error_vector, residuals)
+
+	# put the error vector into human readable dictionary
+	error_coefficients = {\
+		'e00':error_vector[:,0],\
+		'e11':error_vector[:,1],\
+		'det_X':error_vector[:,2],\
+		'e33':error_vector[:,3]/error_vector[:,6],\
+		'e22':error_vector[:,4]/error_vector[:,6],\
+		'det_Y':error_vector[:,5]/error_vector[:,6],\
+		'k':error_vector[:,6],\
+		}
+	
+	# output is a dictionary of information
+	output = {\
+		'error coefficients':error_coefficients,\
+		'error vector':error_vector, \
+		'residuals':residuals\
+		}
+	
+	return output
+
+def _two_port_lstsq_loop(mList, iList, error_vector, residuals):
+	'''
+	per-frequency least squares of :func:`two_port`, filling 
+	`error_vector` and `residuals`
+	'''
+	numStds, fLength = len(mList), len(mList[0])
 	Q = npy.zeros((numStds*4, 7),dtype=complex)
 	M = npy.zeros((numStds*4, 1),dtype=complex)
 	# loop through frequencies and form m, a vectors and 
@@ -479,26 +691,7 @@ def two_port(measured, ideals, switch_terms = None):
 			
 		error_vector[f,:] = error_vector_at_f.flatten()
 		residuals[f,:] = residuals_at_f
-
-	# put the error vector into human readable dictionary
-	error_coefficients = {\
-		'e00':error_vector[:,0],\
-		'e11':error_vector[:,1],\
-		'det_X':error_vector[:,2],\
-		'e33':error_vector[:,3]/error_vector[:,6],\
-		'e22':error_vector[:,4]/error_vector[:,6],\
-		'det_Y':error_vector[:,5]/error_vector[:,6],\
-		'k':error_vector[:,6],\
-		}
-	
-	# output is a dictionary of information
-	output = {\
-		'error coefficients':error_coefficients,\
-		'error vector':error_vector, \
-		'residuals':residuals\
-		}
-	
-	return output
+	return error_vector, residuals
 
 	
 ## SELF CALIBRATION
@@ -558,6 +751,10 @@ def parameterized_self_calibration(measured, ideals, showProgress=True,\
 		#parameter_bounds = npy.append(parameter_bounds, a_ps.parameter_bounds)
 
 
+	evaluator = ParametricStandardEvaluator(ideals_ps)
+	# the cal functions take s-matrices, so the networks are only 
+	# unpacked once
+	measured = [ntwk.s for ntwk in measured]
 	ideals = copy(measured) #sloppy initalization, but this gets re-written by sub_cal
 	mean_residual_list = []	
 
@@ -566,20 +763,13 @@ def parameterized_self_calibration(measured, ideals, showProgress=True,\
 
 		# loop through the parameterized stds and assign the current
 		# parameter vectors' elements to each std. 
-		p_index = 0 # index, of first element of current_ps in parameter vector
-		for stdNum in range(len(ideals_ps)):
-			current_ps = ideals_ps[stdNum]
-			current_ps.parameter_array = \
-				parameter_vector[p_index:p_index+current_ps.number_of_parameters]
-			try:
-				ideals[stdNum]=current_ps.network
-				### HACK for parameterized standard sets.
-				#ideals.append(current_ps.network)
-			except (ParameterBoundsError):
-				if showProgress:
-					print 'Bound Error:','==>',parameter_vector
-				return  1e3* rand()
-			p_index +=current_ps.number_of_parameters
+		# only the stds whose parameters changed are re-calculated
+		try:
+			ideals[:] = evaluator.s_list(parameter_vector)
+		except (ParameterBoundsError):
+			if showProgress:
+				print 'Bound Error:','==>',parameter_vector
+			return  1e3* rand()
 
 		residues = cal_function(measured, ideals)['residuals']	
 		mean_residual_list.append((npy.mean(abs(residues))))
@@ -658,6 +848,10 @@ def parameterized_self_calibration_nls(measured, ideals_ps, showProgress=True,\
 		#parameter_bounds = npy.append(parameter_bounds, a_ps.parameter_bounds)
 
 
+	evaluator = ParametricStandardEvaluator(ideals_ps)
+	# the cal functions take s-matrices, so the networks are only 
+	# unpacked once
+	measured = [ntwk.s for ntwk in measured]
 	ideals = copy(measured) #sloppy initalization, but this gets re-written by sub_cal
 	mean_residual_list = []	
 
@@ -666,13 +860,8 @@ def parameterized_self_calibration_nls(measured, ideals_ps, showProgress=True,\
 
 		# loop through the parameterized stds and assign the current
 		# parameter vectors' elements to each std. 
-		p_index = 0 # index, of first element of current_ps in parameter vector
-		for stdNum in range(len(ideals_ps)):
-			current_ps = ideals_ps[stdNum]
-			current_ps.parameter_array = \
-				parameter_vector[p_index:p_index+current_ps.number_of_parameters]
-			ideals[stdNum]=current_ps.network
-			p_index +=current_ps.number_of_parameters
+		# only the stds whose parameters changed are re-calculated
+		ideals[:] = evaluator.s_list(parameter_vector)
 
 		residues = cal_function(measured, ideals)['residuals']	
 		mean_residual_list.append(npy.mean(abs(residues)))
@@ -745,6 +934,10 @@ def parameterized_self_calibration_bounded(measured, ideals_ps, showProgress=Tru
 	print parameter_bounds_list
 	print parameter_vector
 
+	evaluator = ParametricStandardEvaluator(ideals_ps)
+	# the cal functions take s-matrices, so the networks are only 
+	# unpacked once
+	measured = [ntwk.s for ntwk in measured]
 	ideals = copy(measured) #sloppy initalization, but this gets re-written by sub_cal
 	mean_residual_list = []	
 
@@ -753,13 +946,8 @@ def parameterized_self_calibration_bounded(measured, ideals_ps, showProgress=Tru
 
 		# loop through the parameterized stds and assign the current
 		# parameter vectors' elements to each std. 
-		p_index = 0 # index, of first element of current_ps in parameter vector
-		for stdNum in range(len(ideals_ps)):
-			current_ps = ideals_ps[stdNum]
-			current_ps.parameter_array = \
-				parameter_vector[p_index:p_index+current_ps.number_of_parameters]
-			ideals[stdNum]=current_ps.network
-			p_index +=current_ps.number_of_parameters
+		# only the stds whose parameters changed are re-calculated
+		ideals[:] = evaluator.s_list(parameter_vector)
 
 		residues = cal_function(measured, ideals)['residuals']	
 		mean_residual_list.append((npy.mean(abs(residues))))
@@ -787,3 +975,126 @@ def parameterized_self_calibration_bounded(measured, ideals_ps, showProgress=Tru
 	})
 	return output
 
+def parameterized_self_calibration_fast(measured, ideals, \
+	showProgress=False, epsilon=1e-8, solver='normal', **kwargs):
+	'''
+	A self-calibration routine, like :func:`parameterized_self_calibration`,
+	which uses a gradient based optimizer.
+	
+	The mean residual error is minimized with
+	:func:`scipy.optimize.fmin_l_bfgs_b`. Its gradient is calculated by
+	forward differences, in a single calibration: the standards are
+	re-calculated only for the parameters they own, and all of the 
+	perturbed calibrations are stacked along the frequency axis and 
+	solved at once by :func:`one_port` or :func:`two_port`. 
+	
+	Parameters are optimized relative to their initial values, so
+	that lengths in meters and unit-less reflection coefficients take
+	similar steps.
+	
+	Parameters
+	------------
+	measured : list of :class:`~....network.Network` objects
+		a list of the measured networks 
+	ideals : list of :class:`~mwavepy.calibration.parametricStandard.parametricStandard.ParametricStandard` objects 
+		a list of the ideal networks
+	showProgress : Boolean
+		turn printing progress on/off 
+	epsilon : number
+		step of the forward differences, relative to the initial 
+		parameter values. parameters at their upper bound are stepped
+		backward instead.
+	solver : string
+		passed to the calibration algorithm, see :func:`batched_lstsq`.
+		the normal equations are fastest, which matters as the 
+		calibration is solved at each iteration.
+	**kwargs : key-word arguments
+		passed to :func:`scipy.optimize.fmin_l_bfgs_b`
+	
+	Returns
+	-----------
+	output : a dictionary
+		a dictionary containing the following keys:
+		
+		* 'error_coefficients' : dictionary of error coefficients
+		* 'residuals': residual matrix (shape depends on #stds)
+		* 'parameter_vector_final': final results for parameter vector
+		* 'mean_residual_list': the mean, magnitude of the residuals at each
+			iteration of calibration. this is the variable being minimized.
+	
+	See Also
+	----------
+		ParametricStandardEvaluator : re-calculates only the stds which
+			change
+	'''
+	if len(measured) != len(ideals):
+		raise(IndexError('Number of ideals and measurements must be equal'))
+	if measured[0].number_of_ports ==1:
+		cal_function = one_port
+	elif measured[0].number_of_ports ==2:
+		cal_function = two_port
+	else:
+		raise NotImplementedError('only 2 port supported')
+	
+	ideals_ps = ideals
+	evaluator = ParametricStandardEvaluator(ideals_ps)
+	parameter_vector = evaluator.parameter_vector
+	scale = abs(parameter_vector)
+	scale[scale==0] = 1.
+	measured = [ntwk.s for ntwk in measured]
+	npoints = len(measured[0])
+	mean_residual_list = []
+	bounds_array = [bound for a_ps in ideals_ps \
+		for bound in a_ps.parameter_bounds_array]
+	upper_bounds = npy.array([upper for lower, upper in bounds_array], \
+		dtype=float)
+	
+	def residual_and_gradient(x):
+		parameter_vector = x*scale
+		ideals = evaluator.s_list(parameter_vector)
+		# step backward at the upper bounds, so the stds are only
+		# evaluated inside the bounds
+		signs = npy.where(parameter_vector + epsilon*scale > upper_bounds,\
+			-1., 1.)
+		steps = signs*epsilon*scale
+		# for each parameter, only the std which owns it changes. 
+		# stack the unchanged and all perturbed cals along frequency
+		ideals_stack = [[s] for s in ideals]
+		for j, step in enumerate(steps):
+			owner = evaluator.parameter_owner[j]
+			parameters = parameter_vector[evaluator.slices[owner]].copy()
+			parameters[j - evaluator.slices[owner].start] += step
+			for k in range(len(ideals)):
+				if k == owner:
+					ideals_stack[k].append(\
+						evaluator.s_of_standard(k, parameters))
+				else:
+					ideals_stack[k].append(ideals[k])
+		n_cals = len(steps)+1
+		residuals = cal_function(\
+			[npy.concatenate([s]*n_cals) for s in measured], \
+			[npy.concatenate(s_list) for s_list in ideals_stack], \
+			solver=solver)['residuals']
+		mean_residuals = npy.mean(abs(residuals).reshape(n_cals, \
+			npoints, -1), axis=2).mean(axis=1)
+		mean_residual_list.append(mean_residuals[0])
+		if showProgress:
+			print '%.3e'%mean_residual_list[-1],'==>',parameter_vector
+		return mean_residuals[0], \
+			(mean_residuals[1:]-mean_residuals[0])/(signs*epsilon)
+	
+	if showProgress:
+		print ('| er |  ==>',[ k.parameter_keys for k in ideals_ps])
+		print ('==================================================')
+	bounds = [(lower/s, upper/s) for (lower, upper), s in zip(\
+		bounds_array, scale)]
+	parameter_vector_end = scale*fmin_l_bfgs_b(residual_and_gradient, \
+		parameter_vector/scale, bounds=bounds, **kwargs)[0]
+	
+	output = cal_function(measured = measured, \
+		ideals = evaluator.s_list(parameter_vector_end), solver=solver)
+	output.update( {\
+	'parameter_vector_final':parameter_vector_end,\
+	'mean_residual_list':mean_residual_list\
+	})
+	return output
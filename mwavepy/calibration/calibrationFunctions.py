@@ -34,12 +34,27 @@ Functions which operate on or pertain to :class:`~mwavepy.calibration.calibratio
    :toctree: generated/
 	
 	cartesian_product_calibration_set
+	dot_product_calibration_set
+	binomial_coefficient_calibration_set
+	CalibrationEnsemble
 
 '''
 from itertools import product, combinations, permutations
-from calibration import Calibration
+import multiprocessing
+import multiprocessing.pool
+
+import numpy as npy
 from numpy import array
 
+from calibration import Calibration, _apply_one_port_kernel, \
+	_apply_two_port_kernel
+from ..networkSet import NetworkSet
+
+__all__ = ['cartesian_product_calibration_set', \
+	'dot_product_calibration_set', 'binomial_coefficient_calibration_set', \
+	'zip_calibration_ensemble', 'subset_calibration_ensemble', \
+	'CalibrationEnsemble']
+
 def cartesian_product_calibration_set( ideals, measured, *args, **kwargs):
 	'''
 	This function is used for calculating calibration uncertainty due 
@@ -77,6 +92,11 @@ def cartesian_product_calibration_set( ideals, measured, *args, **kwargs):
 	network_ensemble = [cal.apply_cal(dut) for cal in cal_ensemble]
 	mv.plot_uncertainty_mag(network_ensemble)
 	[network.plot_s_smith() for network in network_ensemble]
+	
+	the ensemble can be run and applied much faster all at once, see 
+	CalibrationEnsemble
+	
+	network_set = mv.CalibrationEnsemble(cal_ensemble).apply_cal(dut)
 	'''
 	measured_iterable = \
 		[[ measure for measure in measured \
@@ -161,3 +181,190 @@ def binomial_coefficient_calibration_set( ideals, measured, n,  *args, **kwargs)
 # for backward compatability
 zip_calibration_ensemble = dot_product_calibration_set
 subset_calibration_ensemble = binomial_coefficient_calibration_set
+
+
+class CalibrationEnsemble(object):
+	'''
+	Runs and applies an ensemble of calibrations together.
+	
+	The calibration sets made by :func:`cartesian_product_calibration_set`,
+	:func:`dot_product_calibration_set` and 
+	:func:`binomial_coefficient_calibration_set` can be large, and
+	running and applying each member on its own is slow. This runs 
+	all 'one port' and 'two port' members that have the same number of
+	standards and frequency points in a single call of the algorithm, 
+	by stacking their standards along the frequency axis. Members of
+	other types (like the parametric self-calibrations) are run by a
+	pool of workers.
+	
+	Once run, every member holds its own results, as if it had been 
+	run on its own.
+	
+	Examples
+	----------
+	>>> cal_set = cartesian_product_calibration_set(ideals, measured)
+	>>> ensemble = CalibrationEnsemble(cal_set)
+	>>> dut_set = ensemble.apply_cal(mv.Network('dut.s1p'))
+	>>> dut_set.plot_uncertainty_bounds_s_db()
+	'''
+	def __init__(self, cal_set, workers=1, pool='process', \
+		stack_size=None):
+		'''
+		CalibrationEnsemble initializer.
+		
+		Parameters
+		-------------
+		cal_set : list of :class:`~mwavepy.calibration.calibration.Calibration` objects
+			the members of the ensemble. they must all have the same
+			number of ports.
+		workers : int, or None
+			number of members which cant be stacked that are run at 
+			once. if None, the number of cpus is used. 
+		pool : ['process','thread']
+			kind of worker pool. members are sent to a process pool by
+			pickling them, so use 'thread' for members whose standards
+			cant be pickled.
+		stack_size : int, or None
+			maximum number of members solved in one call of the 
+			algorithm. this limits the memory used. if None, all 
+			members are stacked.
+		'''
+		if len(set([cal.nports for cal in cal_set])) > 1:
+			raise(ValueError('All calibrations in an ensemble must have the same number of ports'))
+		self.cal_set = list(cal_set)
+		self.workers = workers
+		self.pool = pool
+		self.stack_size = stack_size
+	
+	def __len__(self):
+		return len(self.cal_set)
+	
+	@property
+	def has_run(self):
+		'''
+		True if all members have been run
+		'''
+		return all([cal.has_run for cal in self.cal_set])
+	
+	@property
+	def nports(self):
+		'''
+		the number of ports of the members
+		'''
+		return self.cal_set[0].nports
+	
+	def run(self):
+		'''
+		runs the members of the ensemble which have not been run.
+		'''
+		stacks = {}
+		others = []
+		for cal in self.cal_set:
+			if cal.has_run:
+				continue
+			if (cal.type == 'one port' or cal.type == 'two port') and \
+				set(cal.kwargs.keys()) <= set(['solver']):
+				cal._check_standards()
+				key = (cal.type, cal.nstandards, len(cal.measured[0].s), \
+					cal.kwargs.get('solver', 'svd'))
+				stacks.setdefault(key, []).append(cal)
+			else:
+				others.append(cal)
+		
+		for key in stacks:
+			stack = stacks[key]
+			stack_size = self.stack_size or len(stack)
+			for k in range(0, len(stack), stack_size):
+				_run_stacked(stack[k:k+stack_size], solver=key[3])
+		
+		if len(others) == 0:
+			return
+		workers = self.workers
+		if workers is None:
+			workers = multiprocessing.cpu_count()
+		if workers == 1 or len(others) == 1:
+			outputs = [_run_calibration(cal) for cal in others]
+		else:
+			if self.pool == 'process':
+				worker_pool = multiprocessing.Pool(workers)
+			elif self.pool == 'thread':
+				worker_pool = multiprocessing.pool.ThreadPool(workers)
+			else:
+				raise(ValueError('pool must be \'process\' or \'thread\''))
+			try:
+				outputs = worker_pool.map(_run_calibration, others)
+			finally:
+				worker_pool.close()
+				worker_pool.join()
+		for cal, output in zip(others, outputs):
+			cal._set_output_from_cal(output)
+	
+	def apply_cal(self, input_ntwk):
+		'''
+		applies every member of the ensemble to a measurement.
+		
+		the corrections of all members are applied in one vectorized
+		operation.
+		
+		Parameters
+		------------
+		input_ntwk : :class:`~mwavepy.network.Network` object
+			the measurement to correct
+		
+		Returns
+		---------
+		caled_set : :class:`~mwavepy.networkSet.NetworkSet` object
+			the measurement corrected by each member, in the order of 
+			the members
+		'''
+		if not self.has_run:
+			self.run()
+		if self.nports == 1:
+			kernel = npy.array([cal._one_port_kernel \
+				for cal in self.cal_set]).swapaxes(0,1)
+			s = _apply_one_port_kernel(kernel, input_ntwk.s)
+		elif self.nports == 2:
+			Ts_diagonals = [npy.array([cal._Ts_diagonals[k] \
+				for cal in self.cal_set]) for k in range(4)]
+			s = _apply_two_port_kernel(Ts_diagonals, input_ntwk.s)
+		else:
+			raise NotImplementedError('only 2 port supported')
+		return NetworkSet([input_ntwk._with_s(s_k) for s_k in s])
+
+
+def _run_calibration(cal):
+	'''
+	runs a calibration, and returns its output. used by 
+	:func:`CalibrationEnsemble.run`, in worker processes.
+	'''
+	cal.run()
+	return cal.output_from_cal
+
+def _run_stacked(cal_list, solver):
+	'''
+	runs calibrations of the same type, number of standards and 
+	frequency points, in one call of their algorithm. the standards 
+	are stacked along the frequency axis, and the output is split 
+	back up between the calibrations.
+	'''
+	npoints = len(cal_list[0].measured[0].s)
+	measured = [npy.concatenate([cal.measured[k].s for cal in cal_list]) \
+		for k in range(cal_list[0].nstandards)]
+	ideals = [npy.concatenate([cal.ideals[k].s for cal in cal_list]) \
+		for k in range(cal_list[0].nstandards)]
+	output = cal_list[0].calibration_algorithm_dict[cal_list[0].type](\
+		measured = measured, ideals = ideals, solver=solver)
+	
+	def split(value):
+		if isinstance(value, dict):
+			split_values = dict([(key, split(value[key])) for key in value])
+			return [dict([(key, split_values[key][k]) \
+				for key in split_values]) for k in range(len(cal_list))]
+		if isinstance(value, npy.ndarray) and value.ndim > 0 and \
+			len(value) == npoints*len(cal_list):
+			return list(value.reshape((len(cal_list), npoints) + \
+				value.shape[1:]))
+		return [value]*len(cal_list)
+	
+	for cal, cal_output in zip(cal_list, split(output)):
+		cal._set_output_from_cal(cal_output)
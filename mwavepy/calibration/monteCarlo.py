@@ -0,0 +1,276 @@
+
+#       monteCarlo.py
+#
+#
+#       Copyright 2011 alex arsenovic <arsenovic@virginia.edu>
+#
+#
+#       This program is free software; you can redistribute it and/or modify
+#       it under the terms of the GNU General Public License as published by
+#       the Free Software Foundation; either version 2 of the License, or
+#       (at your option) any later versionpy.
+#
+#       This program is distributed in the hope that it will be useful,
+#       but WITHOUT ANY WARRANTY; without even the implied warranty of
+#       MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#       GNU General Public License for more details.
+#
+#       You should have received a copy of the GNU General Public License
+#       along with this program; if not, write to the Free Software
+#       Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#       MA 02110-1301, USA.
+
+'''
+.. module:: mwavepy.calibration.monteCarlo
+===================================================================================
+monteCarlo (:mod:`mwavepy.calibration.monteCarlo`)
+===================================================================================
+
+Monte-Carlo estimation of calibration uncertainty.
+
+Noise is drawn for all trials of all standards at once, and the
+calibrations of the trials are solved together, by stacking them along
+the frequency axis. Trials can also be split into chunks, which are
+run by a pool of workers.
+
+.. autosummary::
+   :toctree: generated/
+
+	polar_noise
+	monte_carlo_uncertainty
+
+'''
+import multiprocessing
+import multiprocessing.pool
+
+import numpy as npy
+
+from calibration import Calibration, _one_port_kernel, _Ts_diagonals, \
+	_apply_one_port_kernel, _apply_two_port_kernel, \
+	two_port_error_vector_2_Ts
+
+__all__ = ['polar_noise', 'monte_carlo_uncertainty']
+
+# scalar components of s-matrices, for the percentile bounds
+_ATTRIBUTE_FUNCTIONS = {\
+	's_re': npy.real,\
+	's_im': npy.imag,\
+	's_mag': npy.abs,\
+	's_deg': lambda s: npy.angle(s, deg=True),\
+	}
+
+def polar_noise(s, mag_dev, phase_dev, n_trials, noise='add', \
+	flatband=False, random_state=None):
+	'''
+	draws `n_trials` noisy copies of an array of s-matrices at once.
+
+	The noise is gaussian in magnitude and phase, like
+	:func:`~mwavepy.network.Network.add_noise_polar` and
+	:func:`~mwavepy.network.Network.multiply_noise`, but all trials are
+	drawn in one call of the random number generator.
+
+	Parameters
+	------------
+	s : numpy.ndarray
+		s-matrices, of any shape. the last three dimensions are
+		frequency and ports.
+	mag_dev : number
+		standard deviation of magnitude
+	phase_dev : number
+		standard deviation of phase [in degrees]
+	n_trials : int
+		number of noisy copies
+	noise : ['add','multiply']
+		'add' adds the noise to the magnitude and phase of `s`, like
+		`add_noise_polar`. 'multiply' multiplies `s` by a complex noise
+		of mean magnitude 1 and mean phase 0, like `multiply_noise`.
+	flatband : Boolean
+		use the same noise for all frequencies, like
+		`add_noise_polar_flatband`
+	random_state : None, int, or numpy.random.RandomState
+		seed, or generator, for the noise. the same seed gives the
+		same noise.
+
+	Returns
+	---------
+	noisy_s : numpy.ndarray
+		noisy s-matrices, of shape (n_trials,)+s.shape
+	'''
+	if not isinstance(random_state, npy.random.RandomState):
+		random_state = npy.random.RandomState(random_state)
+	s = npy.asarray(s)
+	shape = (n_trials,) + s.shape
+	if flatband:
+		# one draw per trial and port, shared across frequency
+		shape = shape[:-3] + (1,) + shape[-2:]
+	mag_rv = random_state.normal(0, mag_dev, size=shape)
+	phase_rv = random_state.normal(0, phase_dev, size=shape)
+	if noise == 'add':
+		return (abs(s) + mag_rv)*npy.exp(1j*(npy.angle(s) + \
+			npy.pi/180.*phase_rv))
+	elif noise == 'multiply':
+		return (1 + mag_rv)*npy.exp(1j*npy.pi/180.*phase_rv)*s
+	else:
+		raise(ValueError('noise must be \'add\' or \'multiply\''))
+
+def monte_carlo_uncertainty(measured, ideals, dut, n_trials=100, \
+	mag_dev=0, phase_dev=0, noise='add', perturb_dut=True, seed=None, \
+	percentiles=(2.5, 97.5), attribute='s_mag', chunk_size=None, \
+	workers=1, pool='process', type=None, **kwargs):
+	'''
+	Monte-Carlo estimate of the uncertainty of a calibrated measurement.
+
+	In each trial, noise is added to the measured standards (and the
+	DUT), the calibration is solved and the DUT is corrected. The
+	noise for all trials is drawn at once, by :func:`polar_noise`, and
+	the calibrations of all trials in a chunk are solved in one call of
+	the algorithm. Chunks of trials can be run by a pool of workers.
+
+	Parameters
+	------------
+	measured : list of :class:`~mwavepy.network.Network` objects
+		raw measurements of the calibration standards
+	ideals : list of :class:`~mwavepy.network.Network` objects
+		ideal responses of the calibration standards
+	dut : :class:`~mwavepy.network.Network` object
+		raw measurement of the device under test
+	n_trials : int
+		number of trials
+	mag_dev : number
+		standard deviation of the magnitude noise
+	phase_dev : number
+		standard deviation of the phase noise [in degrees]
+	noise : ['add','multiply']
+		how the noise is applied, see :func:`polar_noise`
+	perturb_dut : Boolean
+		add noise to the DUT measurement too
+	seed : None, or int
+		seed for the noise. the results only depend on the seed, not
+		on `chunk_size` or `workers`.
+	percentiles : tuple of two numbers
+		the lower and upper percentiles of `attribute` reported as
+		the bounds.
+	attribute : ['s_re','s_im','s_mag','s_deg']
+		the scalar component of the corrected s-matrices the bounds
+		are calculated on. for 's_deg', the phase of each trial is
+		unwrapped about the phase of the mean, so the bounds are
+		continuous through +-180 degrees.
+	chunk_size : int, or None
+		number of trials solved in one call of the algorithm. if None,
+		the trials are split evenly between the workers.
+	workers : int, or None
+		number of chunks run at once. if None, the number of cpus is
+		used.
+	pool : ['process','thread']
+		kind of worker pool.
+	type : ['one port','two port'], or None
+		the calibration algorithm. if None, it is chosen from the
+		number of ports of `measured`.
+	\*\*kwargs : key-word arguments
+		passed to the calibration algorithm, like `solver`
+
+	Returns
+	---------
+	output : a dictionary
+		a dictionary containing the following keys:
+
+		* 'mean' : Network, the complex mean of the corrected DUT
+		* 'std' : array, the standard deviation (distance) of the
+			corrected DUT s-matrices
+		* 'lower', 'upper' : arrays, the percentiles of `attribute`
+		* 'trials' : array of the corrected DUT s-matrices of every
+			trial, of shape (n_trials, F, n, n)
+
+	Examples
+	----------
+	>>> out = monte_carlo_uncertainty(measured, ideals, dut, n_trials=1000,
+		mag_dev=.01, phase_dev=.5, seed=0, workers=4)
+	>>> out['mean'].plot_s_db()
+	'''
+	if len(measured) != len(ideals):
+		raise(IndexError('Number of ideals and measurements must be equal'))
+	if type is None:
+		type = {1:'one port', 2:'two port'}[measured[0].number_of_ports]
+	if type not in ['one port', 'two port']:
+		raise(ValueError('type must be \'one port\' or \'two port\''))
+	if attribute not in _ATTRIBUTE_FUNCTIONS:
+		raise(ValueError('attribute must be one of %s'%\
+			sorted(_ATTRIBUTE_FUNCTIONS.keys())))
+
+	# all trials of all standards, in one draw
+	random_state = npy.random.RandomState(seed)
+	measured_s = polar_noise(npy.array([ntwk.s for ntwk in measured]), \
+		mag_dev, phase_dev, n_trials, noise=noise, \
+		random_state=random_state)
+	if perturb_dut:
+		dut_s = polar_noise(dut.s, mag_dev, phase_dev, n_trials, \
+			noise=noise, random_state=random_state)
+	else:
+		dut_s = npy.array([dut.s]*n_trials)
+	ideals_s = [ntwk.s for ntwk in ideals]
+
+	if workers is None:
+		workers = multiprocessing.cpu_count()
+	if chunk_size is None:
+		chunk_size = int(npy.ceil(float(n_trials)/workers))
+	chunks = [(type, measured_s[k:k+chunk_size], ideals_s, \
+		dut_s[k:k+chunk_size], kwargs) \
+		for k in range(0, n_trials, chunk_size)]
+	if workers == 1 or len(chunks) == 1:
+		results = [_monte_carlo_chunk(chunk) for chunk in chunks]
+	else:
+		if pool == 'process':
+			worker_pool = multiprocessing.Pool(workers)
+		elif pool == 'thread':
+			worker_pool = multiprocessing.pool.ThreadPool(workers)
+		else:
+			raise(ValueError('pool must be \'process\' or \'thread\''))
+		try:
+			results = worker_pool.map(_monte_carlo_chunk, chunks)
+		finally:
+			worker_pool.close()
+			worker_pool.join()
+	trials = npy.concatenate(results)
+
+	mean = dut._with_s(trials.mean(axis=0))
+	if attribute == 's_deg':
+		# phase relative to the mean, so trials dont wrap around +-180
+		component = npy.angle(mean.s, deg=True) + \
+			npy.angle(trials/mean.s, deg=True)
+	else:
+		component = _ATTRIBUTE_FUNCTIONS[attribute](trials)
+	lower, upper = npy.percentile(component, percentiles, axis=0)
+	return {\
+		'mean': mean,\
+		'std': trials.std(axis=0),\
+		'lower': lower,\
+		'upper': upper,\
+		'trials': trials,\
+		}
+
+def _monte_carlo_chunk(args):
+	'''
+	solves the calibrations of a chunk of trials and corrects their
+	DUTs. used by :func:`monte_carlo_uncertainty`, in worker processes.
+
+	the trials are stacked along the frequency axis, so the algorithm
+	is called once for the whole chunk.
+	'''
+	type, measured_s, ideals_s, dut_s, kwargs = args
+	n_trials, n_stds, npoints = measured_s.shape[:3]
+	nports = measured_s.shape[-1]
+	measured = [measured_s[:,k].reshape(-1, nports, nports) \
+		for k in range(n_stds)]
+	ideals = [npy.concatenate([s]*n_trials) for s in ideals_s]
+	output = Calibration.calibration_algorithm_dict[type](\
+		measured = measured, ideals = ideals, **kwargs)
+
+	if nports == 1:
+		kernel = _one_port_kernel(output['error coefficients'])
+		kernel = kernel.reshape(3, n_trials, npoints, 1, 1)
+		return _apply_one_port_kernel(kernel, dut_s)
+	else:
+		Ts_diagonals = [t.reshape(n_trials, npoints, 2) for t in \
+			_Ts_diagonals(two_port_error_vector_2_Ts(\
+			output['error coefficients']))]
+		return _apply_two_port_kernel(Ts_diagonals, dut_s)
@@ -0,0 +1,236 @@
+#       circuit.py
+#
+#
+#       Copyright 2010 alex arsenovic <arsenovic@virginia.edu>
+#
+#       This program is free software; you can redistribute it and/or modify
+#       it under the terms of the GNU General Public License as published by
+#       the Free Software Foundation; either version 2 of the License, or
+#       (at your option) any later versionpy.
+#
+#       This program is distributed in the hope that it will be useful,
+#       but WITHOUT ANY WARRANTY; without even the implied warranty of
+#       MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#       GNU General Public License for more details.
+#
+#       You should have received a copy of the GNU General Public License
+#       along with this program; if not, write to the Free Software
+#       Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#       MA 02110-1301, USA.
+
+'''
+.. module:: mwavepy.circuit
+========================================
+circuit (:mod:`mwavepy.circuit`)
+========================================
+
+
+Provides a class for solving circuits made of many n-port networks.
+
+A circuit is defined by a list of :class:`~mwavepy.network.Network`'s
+and a list of connections between their ports. The circuit is reduced
+to the s-matrix of its un-connected (external) ports by sub-network 
+growth on the raw s-parameter arrays, each connection being one 
+call to :func:`~mwavepy.network.connect_s` or 
+:func:`~mwavepy.network.innerconnect_s` over the whole frequency axis.
+
+
+Circuit Class
+===============
+
+.. autosummary::
+   :toctree: generated/
+
+   Circuit
+
+'''
+
+import numpy as npy
+
+from network import Network, connect_s, innerconnect_s, impedance_mismatch
+
+
+class Circuit(object):
+	'''
+	A circuit made of n-port networks connected together.
+
+	The ports which do not appear in `connections` are the external
+	ports of the circuit. They are ordered by network, then by port,
+	so `Circuit([ntwkA, ntwkB], [((0,k),(1,l))])` gives the same
+	result as `connect(ntwkA, k, ntwkB, l)`.
+
+	Parameters
+	-----------
+	ntwk_list : list of :class:`~mwavepy.network.Network` objects
+		the networks that make up the circuit. they must all have
+		the same number of frequency points.
+	connections : list of pairs of (network index, port index) tuples
+		each entry `((i,k),(j,l))` connects port `k` of
+		`ntwk_list[i]` to port `l` of `ntwk_list[j]`. a port may only
+		be used in one connection. `i` and `j` may be the same network.
+	name : string, optional
+		name of the resultant network
+
+	Notes
+	-------
+	the networks are grouped into sub-networks as the connections are 
+	made, in the order given. a connection within a sub-network is 
+	made with :func:`~mwavepy.network.innerconnect_s`, and one 
+	between two sub-networks with :func:`~mwavepy.network.connect_s`. 
+	unlike repeated calls to :func:`~mwavepy.network.connect`, no 
+	intermediate :class:`~mwavepy.network.Network`'s are created or 
+	copied. the cost of each connection depends on the size of the 
+	sub-network being grown, so connections should be listed in an 
+	order which keeps it small, ie along the circuit. 
+	
+	port impedance mis-matches are handled as 
+	:func:`~mwavepy.network.connect` does, by inserting a 
+	:func:`~mwavepy.network.impedance_mismatch` network.
+
+	See Also
+	---------
+	mwavepy.network.connect : connects two networks
+	mwavepy.network.innerconnect : connects two ports of one network
+
+	Examples
+	---------
+	A shunted network, ie what :func:`Media.shunt` does
+
+	>>> tee = my_media.tee()
+	>>> cir = mv.Circuit([tee, ntwk], [((0,1),(1,0))])
+	>>> shunted_ntwk = cir.network
+
+	A line between two shunted capacitors (a pi-network)
+
+	>>> ntwks = [my_media.tee(), my_media.line(1e-3),  my_media.tee(),
+		my_media.capacitor(1e-12), my_media.capacitor(1e-12)]
+	>>> cir = mv.Circuit(ntwks,
+		[((0,1),(1,0)), ((1,1),(2,0)), ((0,2),(3,0)), ((2,2),(4,0))])
+	>>> pi_ntwk = cir.network
+	'''
+	def __init__(self, ntwk_list, connections, name=None):
+		if len(ntwk_list) == 0:
+			raise(ValueError('ntwk_list is empty'))
+		npoints = ntwk_list[0].frequency.npoints
+		for ntwk in ntwk_list:
+			if ntwk.frequency.npoints != npoints:
+				raise(IndexError('Networks must have same number of frequency points'))
+
+		self.ntwk_list = list(ntwk_list)
+		self.connections = [tuple([tuple(port) for port in connection]) \
+			for connection in connections]
+		self.name = name
+
+		# offset of each network's ports in the list of all ports
+		self._offsets = npy.cumsum(\
+			[0]+[ntwk.number_of_ports for ntwk in self.ntwk_list])
+
+		internal = []
+		for connection in self.connections:
+			if len(connection) != 2:
+				raise(ValueError('a connection must be a pair of ports'))
+			for port in connection:
+				index = self._global_index(port)
+				if index in internal:
+					raise(ValueError('port %s is connected more than once'\
+						%str(port)))
+				internal.append(index)
+		if len(internal) == self._offsets[-1]:
+			raise(ValueError('circuit has no external ports'))
+
+		self._internal = npy.array(internal, dtype=int)
+		self._external = npy.array([k for k in range(self._offsets[-1]) \
+			if k not in internal], dtype=int)
+
+	def _global_index(self, port):
+		'''
+		index of a (network index, port index) pair in the list of
+		all ports
+		'''
+		i, k = port
+		if i < 0 or i >= len(self.ntwk_list) or \
+			k < 0 or k >= self.ntwk_list[i].number_of_ports:
+			raise(IndexError('port %s does not exist'%str(port)))
+		return self._offsets[i] + k
+
+	@property
+	def external_ports(self):
+		'''
+		list of the (network index, port index) of each external port
+
+		this is the port order of :attr:`s` and :attr:`network`.
+		'''
+		ports = []
+		for index in self._external:
+			i = npy.searchsorted(self._offsets, index, side='right')-1
+			ports.append((i, index - self._offsets[i]))
+		return ports
+
+	@property
+	def z0(self):
+		'''
+		characteristic impedance of the external ports, fxn
+		'''
+		z0 = npy.hstack([ntwk.z0 for ntwk in self.ntwk_list])
+		return z0[:,self._external]
+
+	@property
+	def s(self):
+		'''
+		the scattering parameter matrix of the external ports, fxnxn
+		'''
+		z0 = npy.hstack([ntwk.z0 for ntwk in self.ntwk_list])
+		
+		# each sub-network is a [s-matrix, list of its port indices] pair
+		groups = [[ntwk.s, range(offset, offset+ntwk.number_of_ports)] \
+			for ntwk, offset in zip(self.ntwk_list, self._offsets)]
+		
+		def find(index):
+			for group in groups:
+				if index in group[1]:
+					return group
+		
+		for connection in self.connections:
+			i, j = [self._global_index(port) for port in connection]
+			group_i, group_j = find(i), find(j)
+			
+			if not (z0[:,i] == z0[:,j]).all():
+				# the mismatch takes the place of port i, at the end 
+				group_i[0] = connect_s(group_i[0], group_i[1].index(i), \
+					impedance_mismatch(z0[:,i], z0[:,j]), 0)
+				group_i[1] = [k for k in group_i[1] if k != i] + [i]
+			
+			if group_i is group_j:
+				group_i[0] = innerconnect_s(group_i[0], \
+					group_i[1].index(i), group_i[1].index(j))
+				group_i[1] = [k for k in group_i[1] if k not in (i,j)]
+			else:
+				group_i[0] = connect_s(group_i[0], group_i[1].index(i), \
+					group_j[0], group_j[1].index(j))
+				group_i[1] = [k for k in group_i[1] if k != i] + \
+					[k for k in group_j[1] if k != j]
+				groups = [group for group in groups if group is not group_j]
+		
+		# un-connected sub-networks are combined block-diagonally, and
+		# the ports are put into the external port order
+		npoints = self.ntwk_list[0].frequency.npoints
+		n = len(self._external)
+		s = npy.zeros((npoints, n, n), dtype=complex)
+		ports = []
+		for group in groups:
+			m = len(group[1])
+			s[:,len(ports):len(ports)+m, len(ports):len(ports)+m] = group[0]
+			ports += group[1]
+		order = npy.argsort(ports)
+		return s[:,order][:,:,order]
+
+	@property
+	def network(self):
+		'''
+		the circuit as a :class:`~mwavepy.network.Network`
+		'''
+		result = Network(name=self.name)
+		result.frequency = self.ntwk_list[0].frequency
+		result.s = self.s
+		result.z0 = self.z0
+		return result
@@ -0,0 +1,347 @@
+#       container.py
+#
+#
+#       Copyright 2010 alex arsenovic <arsenovic@virginia.edu>
+#
+#       This program is free software; you can redistribute it and/or modify
+#       it under the terms of the GNU General Public License as published by
+#       the Free Software Foundation; either version 2 of the License, or
+#       (at your option) any later versionpy.
+#
+#       This program is distributed in the hope that it will be useful,
+#       but WITHOUT ANY WARRANTY; without even the implied warranty of
+#       MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#       GNU General Public License for more details.
+#
+#       You should have received a copy of the GNU General Public License
+#       along with this program; if not, write to the Free Software
+#       Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#       MA 02110-1301, USA.
+
+'''
+.. module:: mwavepy.container
+========================================
+container (:mod:`mwavepy.container`)
+========================================
+
+
+Provides a binary file format for storing many networks.
+
+A container file holds any number of networks which share the same
+frequency and number of ports. Unlike touchstone files, the data is
+stored as raw complex128 arrays, so it is read back with
+:class:`numpy.memmap` instead of being parsed. Slicing a frequency
+band, or a subset of the networks, only reads the pages of the file
+which are needed.
+
+The layout of the file is,
+
+ * a fixed size text header, holding a python dictionary with the
+   number of networks, frequency points and ports
+ * the frequency vector in Hz, as float64
+ * one record for each network, holding its name, z0 (fxn) and s
+   (fxnxn) contiguously
+
+Functions
+==========
+
+.. autosummary::
+   :toctree: generated/
+
+   write_container
+   read_container
+   load_container_arrays
+   ContainerWriter
+
+'''
+
+import ast
+
+import numpy as npy
+
+from network import Network
+from networkSet import NetworkSet
+
+## first bytes of every container file
+MAGIC = 'MWAVEPY CONTAINER\n'
+## size of the header, in bytes. the data starts after it
+HEADER_SIZE = 1024
+## maximum length of a network name
+NAME_LENGTH = 128
+VERSION = 1
+
+
+def record_dtype(npoints, nports):
+	'''
+	the numpy dtype of the record holding one network
+
+	Parameters
+	-----------
+	npoints : int
+		number of frequency points
+	nports : int
+		number of ports
+
+	Returns
+	--------
+	dtype : numpy.dtype
+		structured dtype with fields 'name', 'z0' and 's'
+	'''
+	return npy.dtype([\
+		('name', 'S%i'%NAME_LENGTH),\
+		('z0', '<c16', (npoints, nports)),\
+		('s', '<c16', (npoints, nports, nports)),\
+		])
+
+def read_header(filename):
+	'''
+	reads the header of a container file
+
+	Parameters
+	-----------
+	filename : string
+		container file name
+
+	Returns
+	--------
+	header : dict
+		with keys 'version', 'kind', 'count', 'npoints', 'nports'
+		and 'f_unit'
+	'''
+	f = open(filename, 'rb')
+	text = f.read(HEADER_SIZE)
+	f.close()
+	if not text.startswith(MAGIC):
+		raise(ValueError('%s is not a container file'%filename))
+	return ast.literal_eval(text[len(MAGIC):].strip())
+
+def load_container_arrays(filename, mode='r'):
+	'''
+	memory-maps the arrays of a container file
+
+	this gives direct access to the data, without creating any
+	:class:`~mwavepy.network.Network` objects.
+
+	Parameters
+	-----------
+	filename : string
+		container file name
+	mode : ['r','r+','c']
+		passed to :class:`numpy.memmap`. 'r+' allows the data to be
+		changed in place.
+
+	Returns
+	--------
+	header : dict
+		see :func:`read_header`
+	f : numpy.memmap
+		frequency vector in Hz
+	records : numpy.memmap
+		structured array, with one record for each network. the fields
+		are 'name', 'z0' (fxn) and 's' (fxnxn).
+
+	Examples
+	----------
+	>>> header, f, records = mv.load_container_arrays('sweeps.mwc')
+	>>> s21 = records['s'][:,:,1,0]
+	'''
+	header = read_header(filename)
+	npoints, nports = header['npoints'], header['nports']
+	f = npy.memmap(filename, dtype='<f8', mode=mode, \
+		offset=HEADER_SIZE, shape=(npoints,))
+	if header['count'] == 0:
+		records = npy.zeros(0, dtype=record_dtype(npoints, nports))
+	else:
+		records = npy.memmap(filename, dtype=record_dtype(npoints, nports),\
+			mode=mode, offset=HEADER_SIZE+f.nbytes, shape=(header['count'],))
+	return header, f, records
+
+def read_container(filename, index=None, band=None, mmap=True):
+	'''
+	reads networks from a container file
+
+	Parameters
+	-----------
+	filename : string
+		container file name
+	index : int, slice, or list of ints, optional
+		which networks to read. if an int, a single
+		:class:`~mwavepy.network.Network` is returned. default is all.
+	band : slice, optional
+		slice of frequency indices to read. default is all.
+	mmap : boolean
+		if True, the s and z0 arrays of the networks are views into
+		the memory-mapped file, and are only read from disk when
+		used. if False they are read into memory.
+
+	Returns
+	--------
+	ntwk : :class:`~mwavepy.network.Network` or :class:`~mwavepy.networkSet.NetworkSet`
+		a :class:`~mwavepy.network.Network` if `index` is an int, or
+		if the file was written from a single network and `index` is
+		None. a :class:`~mwavepy.networkSet.NetworkSet` otherwise.
+
+	See Also
+	----------
+	write_container
+	load_container_arrays
+
+	Examples
+	----------
+	>>> ntwk_set = mv.read_container('sweeps.mwc')
+	>>> ntwk = mv.read_container('sweeps.mwc', index=3, band=slice(0,100))
+	'''
+	header, f, records = load_container_arrays(filename)
+	if band is None:
+		band = slice(None)
+
+	if index is None:
+		indices = range(header['count'])
+	elif isinstance(index, slice):
+		indices = range(header['count'])[index]
+	else:
+		indices = npy.atleast_1d(index)
+
+	ntwk_list = []
+	for k in indices:
+		record = records[k]
+		ntwk = Network(name=record['name'])
+		ntwk.f = f[band]
+		ntwk.frequency.unit = header['f_unit']
+		if mmap:
+			ntwk.s = record['s'][band]
+			ntwk.z0 = record['z0'][band]
+		else:
+			ntwk.s = npy.array(record['s'][band])
+			ntwk.z0 = npy.array(record['z0'][band])
+		ntwk_list.append(ntwk)
+
+	if npy.isscalar(index) or (index is None and header['kind'] == 'Network'):
+		return ntwk_list[0]
+	return NetworkSet(ntwk_list)
+
+def write_container(ntwks, filename):
+	'''
+	writes networks to a container file
+
+	Parameters
+	-----------
+	ntwks : :class:`~mwavepy.network.Network`, list of Networks, or :class:`~mwavepy.networkSet.NetworkSet`
+		the networks to write. they must share the same frequency and
+		number of ports.
+	filename : string
+		container file name. no extension is added.
+
+	See Also
+	----------
+	read_container
+	ContainerWriter : writes networks one at a time
+
+	Examples
+	----------
+	>>> mv.write_container(mv.load_all_touchstones('.').values(), 'sweeps.mwc')
+	'''
+	if isinstance(ntwks, Network):
+		kind, ntwk_list = 'Network', [ntwks]
+	elif isinstance(ntwks, NetworkSet):
+		kind, ntwk_list = 'NetworkSet', ntwks.ntwk_set
+	else:
+		kind, ntwk_list = 'NetworkSet', list(ntwks)
+	if len(ntwk_list) == 0:
+		raise(ValueError('no networks to write'))
+
+	writer = ContainerWriter(filename, ntwk_list[0].frequency, \
+		ntwk_list[0].number_of_ports, kind=kind)
+	for ntwk in ntwk_list:
+		writer.append(ntwk)
+	writer.close()
+
+
+class ContainerWriter(object):
+	'''
+	writes networks to a container file, one at a time
+
+	the header is re-written with the final number of networks when
+	:func:`close` is called.
+
+	Parameters
+	-----------
+	filename : string
+		container file name
+	frequency : :class:`~mwavepy.frequency.Frequency` object
+		frequency of all networks in the file
+	nports : int
+		number of ports of all networks in the file
+	kind : ['NetworkSet','Network']
+		what :func:`read_container` returns by default
+
+	Examples
+	----------
+	>>> writer = mv.ContainerWriter('sweeps.mwc', ntwk.frequency, 2)
+	>>> for filename in filenames:
+	...	writer.append(mv.Network(filename))
+	>>> writer.close()
+	'''
+	def __init__(self, filename, frequency, nports, kind='NetworkSet'):
+		self.filename = filename
+		self.frequency = frequency
+		self.nports = nports
+		self.kind = kind
+		self.count = 0
+		self.dtype = record_dtype(frequency.npoints, nports)
+
+		self.file = open(filename, 'wb')
+		self.write_header()
+		self.file.write(npy.asarray(frequency.f, dtype='<f8').tostring())
+
+	def write_header(self):
+		'''
+		writes the header at the start of the file
+		'''
+		header = {\
+			'version': VERSION,\
+			'kind': self.kind,\
+			'count': self.count,\
+			'npoints': self.frequency.npoints,\
+			'nports': self.nports,\
+			'f_unit': self.frequency.unit,\
+			}
+		text = MAGIC + repr(header) + '\n'
+		position = self.file.tell()
+		self.file.seek(0)
+		self.file.write(text.ljust(HEADER_SIZE))
+		if position > 0:
+			self.file.seek(position)
+
+	def append(self, ntwk):
+		'''
+		appends a network to the file
+
+		Parameters
+		-----------
+		ntwk : :class:`~mwavepy.network.Network` object
+			must have the frequency and number of ports given to the
+			writer
+		'''
+		if ntwk.number_of_ports != self.nports or \
+			ntwk.frequency != self.frequency:
+			raise(ValueError('Network does not match the container\'s frequency and number of ports'))
+		name = ntwk.name
+		if name is None:
+			name = ''
+		if len(name) > NAME_LENGTH:
+			raise(ValueError('name is longer than %i characters'%NAME_LENGTH))
+
+		record = npy.zeros(1, dtype=self.dtype)
+		record['name'] = name
+		record['z0'] = ntwk.z0
+		record['s'] = ntwk.s
+		self.file.write(record.tostring())
+		self.count += 1
+
+	def close(self):
+		'''
+		writes the final header and closes the file
+		'''
+		self.write_header()
+		self.file.close()
@@ -41,7 +41,11 @@ Frequency Class
 	
 '''
 
-from pylab import linspace, gca
+import hashlib
+from copy import copy
+
+import numpy as npy
+from pylab import linspace, logspace, gca
 from numpy import pi
 
 class Frequency(object):
@@ -53,6 +57,17 @@ class Frequency(object):
 	a frequency unit. This allows a frequency vector in a given unit
 	to be available (:attr:`f_scaled`), as well as an absolute frquency
 	axis in 'Hz'  (:attr:`f`).  
+	
+	The frequency vector is stored, so it may be any sweep, linear, 
+	logarithmic, segmented or measured. It is read-only, which 
+	allows the vectors derived from it (:attr:`f_scaled` and 
+	:attr:`w`) to be computed once, and two Frequency objects to be
+	compared quickly by their :attr:`fingerprint`. Frequency 
+	vectors which agree to a relative tolerance of 1e-9 are equal.
+	Because of the tolerance, the hash of a Frequency is only its
+	number of points, so all bands of the same length share a hash
+	bucket in a set or dictionary. To change the band, set
+	:attr:`f`, or :attr:`start`, :attr:`stop` and :attr:`npoints`.
 	'''
 	unit_dict = {\
 		'hz':'Hz',\
@@ -74,7 +89,8 @@ class Frequency(object):
 		
 		Creates a Frequency object from start/stop/npoints and a unit. 
 		Alternatively, the class method :func:`from_f` can be used to 
-		create a Frequency object from a frequency vector instead.
+		create a Frequency object from a frequency vector instead, 
+		and :func:`from_segments` from a list of sweeps.
 		
 		Parameters
 		----------
@@ -89,6 +105,8 @@ class Frequency(object):
 			attribute :attr:`f_scaled`. It is also used by the 
 			:class:`~mwavepy.network.Network` class for plots vs. 
 			frequency.
+		sweep_type : ['lin','log']
+			linearly or logarithmically spaced points
 		
 		Notes
 		--------
@@ -99,20 +117,21 @@ class Frequency(object):
 		---------
 			from_f : constructs a Frequency object from a frequency 
 				vector instead of start/stop/npoints. 
+			from_segments : constructs a Frequency object from 
+				several sweeps
 			
 		Examples
 		---------
 		
 		>>> wr1p5band = Frequency(500,750,401, 'ghz')
+		>>> wideband = Frequency(.01,50,1001, 'ghz', sweep_type='log')
 			
 		
 			
 		'''
 		self._unit = unit.lower()
-		self.start =  self.multiplier * start
-		self.stop = self.multiplier * stop
-		self.npoints = npoints
-		self.sweep_type = sweep_type
+		self._set_sweep(self.multiplier * start, self.multiplier * stop,\
+			npoints, sweep_type)
 		
 	@classmethod
 	def from_f(cls,f, *args,**kwargs):
@@ -120,10 +139,13 @@ class Frequency(object):
 		Alternative constructor of a Frequency object from a frequency
 		vector,
 		
+		The vector is kept as it is, so it does not need to be 
+		linearly spaced.
+		
 		Parameters
 		-----------
 		f : array-like 
-			frequency vector  
+			frequency vector, in units of `unit` 
 		 
 		*args, **kwargs : arguments, keyword arguments
 			passed on to  :func:`__init__`.
@@ -138,13 +160,171 @@ class Frequency(object):
 		>>> f = np.linspace(75,100,101)
 		>>> mv.Frequency.from_f(f, unit='ghz')
 		'''
-		return cls(start=f[0], stop=f[-1],npoints = len(f), *args, **kwargs)
+		kwargs.setdefault('sweep_type', 'arbitrary')
+		result = cls(0, 0, 0, *args, **kwargs)
+		result._set_f(npy.asarray(f, dtype=float) * result.multiplier, \
+			result.sweep_type)
+		return result
 	
+	@classmethod
+	def from_segments(cls, segments, unit='hz'):
+		'''
+		Alternative constructor of a Frequency object from several 
+		sweeps, like the segmented sweep of a VNA.
+		
+		A segment which starts where the previous one stopped does not
+		repeat that point.
+		
+		Parameters
+		-----------
+		segments : list of tuples
+			each is (start, stop, npoints) or (start, stop, npoints, 
+			sweep_type), in units of `unit`. see :func:`__init__`.
+		unit : ['hz','khz','mhz','ghz']
+			frequency unit
+		
+		Returns
+		--------
+		myfrequency : :class:`Frequency` object
+			the Frequency object, with `sweep_type` 'segmented'
+		
+		Examples
+		-----------
+		>>> mv.Frequency.from_segments([(1,10,10), (10,100,91)], 'ghz')
+		'''
+		f_list = []
+		for segment in segments:
+			f = cls(*segment[:3], unit=unit, sweep_type = \
+				(segment[3] if len(segment) > 3 else 'lin')).f
+			if len(f_list) > 0 and len(f) > 0 and len(f_list[-1]) > 0 \
+				and f[0] == f_list[-1][-1]:
+				f = f[1:]
+			f_list.append(f)
+		result = cls(0, 0, 0, unit=unit, sweep_type='segmented')
+		result._set_f(npy.concatenate(f_list), 'segmented')
+		return result
+	
+	def _set_sweep(self, start, stop, npoints, sweep_type):
+		'''
+		sets the frequency vector from start/stop/npoints in Hz
+		'''
+		if sweep_type == 'log':
+			f = logspace(npy.log10(start), npy.log10(stop), npoints)
+		else:
+			# other sweeps cant be re-made from start/stop/npoints
+			f, sweep_type = linspace(start, stop, npoints), 'lin'
+		self._set_f(f, sweep_type)
+	
+	def _set_f(self, f, sweep_type):
+		'''
+		sets the frequency vector in Hz. 
+		
+		the vector is copied and made read-only, so the cached vectors
+		derived from it never go stale. the cache is replaced rather 
+		than cleared, because copies of this object share it.
+		'''
+		f = npy.array(f, dtype=float).reshape(-1)
+		f.flags.writeable = False
+		self._f = f
+		self._cache = {}
+		self.sweep_type = sweep_type
+	
+	def _cached(self, key, func):
+		'''
+		returns `func()`, which is computed once for each `key`
+		'''
+		try:
+			return self._cache[key]
+		except KeyError:
+			value = func()
+			if isinstance(value, npy.ndarray):
+				value.flags.writeable = False
+			self._cache[key] = value
+			return value
+	
+	def __deepcopy__(self, memo):
+		# the frequency vector is read-only, so it can be shared 
+		return copy(self)
 	
 	def __eq__(self, other):
-		return (list(self.f) == list(other.f))	
+		if self._f is other._f:
+			return True
+		if self.npoints != other.npoints:
+			return False
+		if self.fingerprint == other.fingerprint:
+			return True
+		# vectors read from files differ from a linspace by rounding
+		return npy.allclose(self._f, other._f, rtol=1e-9, atol=0)
 	def __ne__(self,other):
 		return (not self.__eq__(other))
+	def __hash__(self):
+		'''
+		hash of the number of points.
+		
+		Equal Frequency objects only agree to a tolerance, and a hash
+		of the rounded vector could differ for vectors on either side
+		of a rounding boundary. So only the number of points is hashed,
+		and Frequency objects of the same length collide: a set or
+		dictionary of them falls back to comparing them with
+		:func:`__eq__`. Changing the number of points of a Frequency
+		held in a set or dictionary breaks it.
+		'''
+		return hash(self.npoints)
+	
+	@property
+	def fingerprint(self):
+		'''
+		A digest of the frequency vector.
+		
+		Two Frequency objects with the same frequency vector, in Hz, 
+		have the same fingerprint. It is computed once, so comparing 
+		Frequency objects does not look at every point again.
+		
+		Returns
+		---------
+		fingerprint : string
+			sha1 hex digest of the frequency vector
+		'''
+		return self._cached('fingerprint', \
+			lambda: hashlib.sha1(self._f.tostring()).hexdigest())
+	
+	@property
+	def start(self):
+		'''
+		Start frequency in Hz.
+		
+		Setting it re-makes the band as a linear sweep, or logarithmic
+		if :attr:`sweep_type` is 'log', with the same stop frequency 
+		and number of points.
+		'''
+		return self._f[0]
+	@start.setter
+	def start(self, start):
+		self._set_sweep(start, self.stop, self.npoints, self.sweep_type)
+	
+	@property
+	def stop(self):
+		'''
+		Stop frequency in Hz.
+		
+		Setting it re-makes the band, see :attr:`start`.
+		'''
+		return self._f[-1]
+	@stop.setter
+	def stop(self, stop):
+		self._set_sweep(self.start, stop, self.npoints, self.sweep_type)
+	
+	@property
+	def npoints(self):
+		'''
+		Number of points in the band.
+		
+		Setting it re-makes the band, see :attr:`start`.
+		'''
+		return len(self._f)
+	@npoints.setter
+	def npoints(self, npoints):
+		self._set_sweep(self.start, self.stop, npoints, self.sweep_type)
 		
 	@property
 	def center(self):
@@ -165,24 +345,20 @@ class Frequency(object):
 		Returns
 		----------
 		f :  :class:`numpy.ndarray` 
-			The frequency vector  in Hz
+			The frequency vector  in Hz. it is read-only.
 		
 		See Also
 		----------
 			f_scaled : frequency vector in units of :attr:`unit`
 			w : angular frequency vector in rad/s
 		'''
-		return linspace(self.start,self.stop,self.npoints)
-		#return self._f
+		return self._f
 	@f.setter
 	def f(self,new_f):
 		'''
 		sets the frequency object by passing a vector in Hz
 		'''
-		#self._f = new_f
-		self.start = new_f[0]
-		self.stop = new_f[-1]
-		self.npoints = len(new_f)
+		self._set_f(new_f, 'arbitrary')
 		
 	@property
 	def	f_scaled(self):
@@ -199,7 +375,8 @@ class Frequency(object):
 			f : frequency vector in Hz
 			w : frequency vector in rad/s
 		'''
-		return self.f/self.multiplier
+		return self._cached(('f_scaled', self._unit), \
+			lambda: self.f/self.multiplier)
 	@property
 	def w(self):
 		'''
@@ -217,7 +394,7 @@ class Frequency(object):
 			f_scaled : frequency vector in units of :attr:`unit`
 			f :  frequency vector in Hz
 		'''
-		return 2*pi*self.f
+		return self._cached('w', lambda: 2*pi*self.f)
 	@property
 	def unit(self):
 		'''
@@ -284,4 +461,4 @@ def f_2_frequency(f):
 	
 	!depricated, use classmethod from_f instead. 
 	'''
-	return Frequency(start=f[0], stop=f[-1],npoints = len(f), unit='hz')
+	return Frequency.from_f(f, unit='hz')
@@ -35,6 +35,7 @@ import numpy as npy
 from scipy import stats
 
 from ..network import Network, connect
+from ..circuit import Circuit
 from .. import tlineFunctions as tf
 from .. import mathFunctions as mf
 
@@ -520,10 +521,9 @@ class Media(object):
 		n=nports
 		result = self.match(n, **kwargs)
 		
-		for f in range(self.frequency.npoints):
-			result.s[f,:,:] =  (2*1./n-1)*npy.eye(n) + \
-				npy.sqrt((1-((2.-n)/n)**2)/(n-1))*\
-				(npy.ones((n,n))-npy.eye(n))
+		result.s[:] =  (2*1./n-1)*npy.eye(n) + \
+			npy.sqrt((1-((2.-n)/n)**2)/(n-1))*\
+			(npy.ones((n,n))-npy.eye(n))
 		return result
 	
 
@@ -727,9 +727,13 @@ class Media(object):
 		shunted_ntwk : :class:`~mwavepy.network.Network` object
 			a shunted a ntwk. The resultant shunted_ntwk will have 
 			(2 + ntwk.number_of_ports -1) ports.
-			
+		
+		See Also
+		---------
+		mwavepy.circuit.Circuit : used to connect the tee and `ntwk`
 		'''
-		return connect(self.tee(**kwargs),1,ntwk,0)
+		tee = self.tee(**kwargs)
+		return Circuit([tee, ntwk], [((0,1),(1,0))], name=tee.name).network
 		
 	def shunt_delay_load(self,*args, **kwargs):
 		'''
@@ -51,6 +51,7 @@ Functions On Networks
    connect 
    innerconnect
    cascade
+   cascade_list
    de_embed
    average
    one_port_2_two_port
@@ -67,6 +68,7 @@ Supporting Functions
    t2s
    inv
    flip
+   singular_points
    
 Misc Functions 
 =====================
@@ -75,12 +77,19 @@ Misc Functions
    
 	impedance_mismatch
 	load_all_touchstones
+	iter_touchstone
 	write_dict_of_networks
 	csv_2_touchstone
 '''
 from copy import deepcopy as copy
 from copy import deepcopy
+from copy import copy as shallow_copy
 import os
+import re
+import fnmatch
+import warnings
+import multiprocessing
+import multiprocessing.pool
 
 import numpy as npy
 import pylab as plb 
@@ -170,6 +179,10 @@ class Network(object):
 	global ALMOST_ZER0
 	ALMOST_ZER0=1e-6 
 	
+	# matches the names of the one-port sub-networks, s11, s21, ...
+	global SMN_ATTRIBUTE
+	SMN_ATTRIBUTE = re.compile(r'^s(\d)(\d)$')
+	
 	# used to assign y-axis labels to the plotting functions
 	global ATTRIBUTE_DICT
 	ATTRIBUTE_DICT= {
@@ -223,6 +236,50 @@ class Network(object):
 		#convenience 
 		#self.nports = self.number_of_ports
 		
+	@classmethod
+	def _from_arrays(cls, frequency, s, z0=50, name=None):
+		'''
+		makes a Network from existing arrays, without copying them.
+		
+		this is used by the operators and the functions on networks, 
+		whose results have a new s-matrix but the frequency and z0 
+		of an input. unlike copying the input network, nothing is 
+		duplicated just to be replaced.
+		
+		Parameters
+		-----------
+		frequency : :class:`~mwavepy.frequency.Frequency` object
+			frequency of the network. the object is copied, so that 
+			changing its `unit` does not change the original, but any 
+			arrays it holds are shared.
+		s : numpy.ndarray
+			s-matrix. it is not copied.
+		z0 : number or numpy.ndarray
+			characteristic impedance, in any shape accepted by 
+			:attr:`z0`. it is not copied.
+		name : string
+			name of the network
+		
+		Returns
+		--------
+		ntwk : :class:`Network` object
+		'''
+		result = cls(name=name)
+		result._frequency = shallow_copy(frequency)
+		result.s = s
+		result.z0 = z0
+		return result
+	
+	def _with_s(self, s, name=None):
+		'''
+		a Network with this network's frequency, z0 and name, and the 
+		s-matrix `s`. see :func:`_from_arrays`
+		'''
+		if name is None:
+			name = self.name
+		return self._from_arrays(self.frequency, s, \
+			self.__dict__.get('_z0', 50), name)
+
 
 	## OPERATORS
 	def __pow__(self,other):
@@ -247,18 +304,14 @@ class Network(object):
 			# then deEmbed like A.inv*C*B.inv
 			b = other[0]
 			c = other[1]
-			result =  copy (self)
-			result.s =  (b.inv**self**c.inv).s
+			return self._with_s((b.inv**self**c.inv).s)
 			#flip(de_embed( flip(de_embed(c.s,self.s)),b.s))
-			return result
 		except TypeError:
 			pass
 				
 		if other.number_of_ports == 2:
-			result = copy(self)
-			result.s = (other.inv**self).s
+			return self._with_s((other.inv**self).s)
 			#de_embed(self.s,other.s)
-			return result
 		else:
 			raise IndexError('Incorrect number of ports.')
 
@@ -266,25 +319,19 @@ class Network(object):
 		'''
 		element-wise complex multiplication  of s-matrix
 		'''
-		result = copy(self)
-		result.s = result.s * a.s
-		return result
+		return self._with_s(self.s * a.s)
 
 	def __add__(self,other):
 		'''
 		element-wise addition of s-matrix
 		'''
-		result = copy(self)
-		result.s = result.s + other.s
-		return result
+		return self._with_s(self.s + other.s)
 		
 	def __sub__(self,other):
 		'''
 		element-wise subtraction of s-matrix
 		'''
-		result = copy(self)
-		result.s = result.s - other.s
-		return result
+		return self._with_s(self.s - other.s)
 
 	def __div__(self,other):
 		'''
@@ -293,14 +340,11 @@ class Network(object):
 		if other.number_of_ports != self.number_of_ports:
 			raise IndexError('Networks must have same number of ports.')
 		else:
-			result = copy(self)
 			try:
-				result.name = self.name+'/'+other.name
+				name = self.name+'/'+other.name
 			except TypeError:
-				pass
-			result.s =(self.s/ other.s)
-			
-			return result
+				name = self.name
+			return self._with_s(self.s/ other.s, name)
 
 	def __eq__(self,other):
 		if npy.mean(npy.abs(self.s - other.s)) < ALMOST_ZER0:
@@ -309,17 +353,41 @@ class Network(object):
 			return False
 	def __ne__(self,other):
 		return (not self.__eq__(other))
+	
+	def __getattr__(self, name):
+		'''
+		one-port sub-networks, `s11`, `s21`, ... 
 		
-	def __getitem__(self,key):
+		this is only called for attributes which are not found 
+		otherwise, so `ntwk.s21` returns a 1-port :class:`Network` 
+		whose s-matrix is a view of `ntwk.s[:,1,0]`.
 		'''
-		returns a Network object at a given single frequency
+		match = SMN_ATTRIBUTE.match(name)
+		if match is None or '_s' not in self.__dict__:
+			raise AttributeError('\'Network\' object has no attribute \'%s\''\
+				%name)
+		m, n = int(match.group(1))-1, int(match.group(2))-1
+		if m < 0 or n < 0 or m >= self._s.shape[1] or n >= self._s.shape[2]:
+			raise AttributeError('Network has no port pair \'%s\''%name)
+		# need to set characteristic impedance
+		return Network._from_arrays(self.frequency, self._s[:,m,n])
+		
+	def __getitem__(self,key):
 		'''
-		a= self.z0# hack to force getter for z0 to re-shape it
-		output = deepcopy(self)
-		output.s = output.s[key,:,:]
-		output.z0 = output.z0[key,:]
-		output.frequency.f = npy.array(output.frequency.f[key]).reshape(-1)
+		returns a Network object at a given single frequency, or at a 
+		slice of frequencies. 
 		
+		the s-matrix of the result is a view of this network's, when
+		numpy indexing allows it.
+		'''
+		z0 = self.__dict__.get('_z0', 50)
+		if npy.ndim(z0) != 0 and \
+			not (npy.ndim(z0) == 1 and len(z0) != self.frequency.npoints):
+			# z0 depends on frequency, so it is indexed like s
+			z0 = npy.reshape(self.z0[key], (-1, self.number_of_ports))
+		output = self._from_arrays(self.frequency, self.s[key,:,:], z0,\
+			self.name)
+		output.frequency.f = npy.array(self.frequency.f[key]).reshape(-1)
 		return output
 	
 	def __str__(self):
@@ -369,19 +437,7 @@ class Network(object):
 			elif len(s_shape)==1:
 				 s = npy.reshape(s,(-1,1,1))
 		self._s = s
-		
-		# dynamically generate 1-port subnetworks
-		def smn(self,m,n):
-			result = Network()
-			result.frequency = self.frequency
-			result.s = s[:,m,n]
-			# need to set characteristic impedance
-			return result
-		for m in range(s_shape[1]):
-			for n in range(s_shape[2]):
-				setattr(self.__class__,'s%i%i'%(m+1,n+1),\
-					property(lambda self: smn(self,m,n)))
-		#s.squeeze()
+		# the 1-port subnetworks, s11, s21 ..., are made by __getattr__
 	@property
 	def y(self):
 		'''
@@ -431,9 +487,7 @@ class Network(object):
 		'''
 		if self.number_of_ports <2:
 			raise(TypeError('One-Port Networks dont have inverses'))
-		out = copy(self)
-		out.s = inv(self.s)
-		return out
+		return self._with_s(inv(self.s))
 		
 	# frequency information
 	@property
@@ -493,7 +547,7 @@ class Network(object):
 	@f.setter
 	def f(self,f):
 		tmpUnit = self.frequency.unit
-		self._frequency  = Frequency(f[0],f[-1],len(f),'hz')
+		self._frequency  = Frequency.from_f(f, unit='hz')
 		self._frequency.unit = tmpUnit
 	
 
@@ -507,71 +561,49 @@ class Network(object):
 		This property stores the  characteristic impedance of each port
 		of the network. Because it is possible that each port has
 		a different characteristic impedance, that is a function of 
-		frequency, `z0` is stored internally as a `fxn` array.
+		frequency, `z0` is returned as a `fxn` array.
 		
 		However because frequenty `z0` is simple (like 50ohm),it can 
-		be set with just number as well. 
+		be set with just number as well. It can be set with a number,
+		an array of length `n` (one for each port), an array of
+		length `f` (one for each frequency), or a `fxn` array. 
 		
 		Returns
 		--------
 		z0 : numpy.ndarray of shape fxn
 			characteristic impedance for network
 		
-		'''
-		# i hate this function
-		# it was written this way because id like to allow the user to
-		# set the z0 before the s-parameters are set. However, in this 
-		# case we dont know how to re-shape the z0 to fxn. to solve this
-		# i attempt to do the re-shaping when z0 is accessed, not when 
-		# it is set. this is what makes this function confusing. 
-		try:
-			if len(npy.shape(self._z0)) ==0:
-				try:
-					#try and re-shape z0 to match s
-					self._z0=self._z0*npy.ones(self.s.shape[:-1])
-				except(AttributeError):
-					print ('Warning: Network has improper \'z0\' shape.')
-					#they have yet to set s .
-
-			elif len(npy.shape(self._z0)) ==1:
-				try:
-					if len(self._z0) == self.frequency.npoints:
-						# this z0 is frequency dependent but no port dependent
-						self._z0 = \
-							npy.repeat(npy.reshape(self._z0,(-1,1)),self.number_of_ports,1)
-
-					elif len(self._z0) == self.number_of_ports:
-						# this z0 is port dependent but not frequency dependent
-						self._z0 = self._z0*npy.ones(\
-							(self.frequency.npoints,self.number_of_ports))
-						
-					else:
-						raise(IndexError('z0 has bad shape'))
-						
-				except(AttributeError):
-					# there is no self.frequency, or self.number_of_ports
-					raise(AttributeError('Error: i cant reshape z0 through inspection. you must provide correctly shaped z0, or s-matrix first.'))
-			
-			return self._z0
-		
-		except(AttributeError):
-			print 'Warning: z0 is undefined. Defaulting to 50.'
-			self.z0=50
-			return self.z0 #this is not an error, its a recursive call
+		Notes
+		-------
+		`z0` is kept in the shape it was set with, and is broadcast 
+		to `fxn` with :func:`numpy.broadcast_to` when accessed. so a 
+		constant `z0` takes no memory, but the returned array is a 
+		read-only view. to change `z0`, set it.
+		
+		If `z0` has not been set, it is 50. 
+		'''
+		# z0 can be set before the s-parameters are, in which case we 
+		# dont know how to re-shape it to fxn. so the re-shaping is 
+		# done when z0 is accessed, not when it is set. 
+		z0 = self.__dict__.get('_z0', 50)
+		if '_s' not in self.__dict__:
+			return z0
+		shape = self._s.shape[:2]
+		
+		if npy.ndim(z0) == 1:
+			if len(z0) == shape[0]:
+				# this z0 is frequency dependent but no port dependent
+				z0 = npy.reshape(z0,(-1,1))
+			elif len(z0) != shape[1]:
+				# this z0 is neither port, or frequency dependent
+				raise(IndexError('z0 has bad shape'))
+		elif npy.ndim(z0) == 2:
+			return z0
+		return npy.broadcast_to(z0, shape)
 		
 	@z0.setter
 	def z0(self, z0):
-		'''z0=npy.array(z0)
-		if len(z0.shape) < 2:
-			try:
-				#try and re-shape z0 to match s
-				z0=z0*npy.ones(self.s.shape[:-1])
-			except(AttributeError):
-				print ('Warning: you should store a Network\'s \'s\' matrix before its \'z0\'')
-				#they have yet to set s .
-				pass
-		'''
-		self._z0 = z0
+		self._z0 = npy.asarray(z0)
 	
 ## SECONDARY PROPERTIES
 
@@ -785,7 +817,7 @@ class Network(object):
 	
 ## CLASS METHODS
 	# touchstone file IO
-	def read_touchstone(self, filename):
+	def read_touchstone(self, filename, cache=None):
 		'''
 		loads values from a touchstone file. 
 		
@@ -796,6 +828,9 @@ class Network(object):
 		----------
 		filename : string
 			touchstone file name. 
+		cache : :class:`~mwavepy.touchstone.TouchstoneCache`, optional
+			on-disk cache of parsed files. if None, the cache set with
+			:func:`~mwavepy.touchstone.enable_cache` is used, if any.
 		
 		
 		Notes
@@ -806,18 +841,19 @@ class Network(object):
 	
 			
 		'''
-		touchstoneFile = touchstone.touchstone(filename)
+		touchstoneFile = touchstone.touchstone(filename, cache=cache)
 		
 		if touchstoneFile.get_format().split()[1] != 's':
 			raise NotImplementedError('only s-parameters supported for now.')
 		
 		
 		self.f, self.s = touchstoneFile.get_sparameter_arrays() # note: freq in Hz
-		self.z0 = float(touchstoneFile.resistance)
+		self.z0 = _touchstone_z0(touchstoneFile)
 		self.frequency.unit = touchstoneFile.frequency_unit # for formatting plots
 		self.name = os.path.basename( os.path.splitext(filename)[0])
 
-	def write_touchstone(self, filename=None, dir = './'):
+	def write_touchstone(self, filename=None, dir = './', form='ri', \
+		z0_comments=None, version=1):
 		'''
 		write a contents of the :class:`Network` to a touchstone file.
 		 
@@ -830,25 +866,48 @@ class Network(object):
 		dir : string, optional 
 			the directory to save the file in. Defaults 
 			to cwd './'.
+		form : ['ri','ma','db']
+			format of the data; real/imaginary, magnitude/angle, or
+			magnitude in dB/angle. angles are in degrees.
+		z0_comments : boolean, or None
+			write the port impedances as a comment line after every 
+			data line. if None, they are written only if :attr:`z0` 
+			is not the same for all ports and frequencies.
+		version : [1, 2]
+			touchstone file format version. version 2 files state the
+			port impedances with a `[Reference]` line, when they differ 
+			between ports.
 			
 		
 		Notes
 		-------
-			format supported at the moment is,
-				HZ S RI
+			the data is formatted in blocks of many lines at a time, 
+			with a single string formatting operation for each block.
 			
 			The functionality of this function should take place in the 
 			:class:`~mwavepy.touchstone.touchstone` class. 
-	
 		
+		Examples
+		----------
+		>>> ntwk.write_touchstone('myNtwk', form='db', version=2)
 		'''
 		if filename is None:
 			if self.name is not None:
 				filename= self.name
 			else:
 				raise ValueError('No filename given. Network must have a name, or you must provide a filename')
+		if form not in ['ri','ma','db']:
+			raise(ValueError('form must be one of \'ri\',\'ma\' or \'db\''))
+		if version not in [1,2]:
+			raise(ValueError('version must be 1 or 2'))
+		
+		nports = self.number_of_ports
+		npoints = len(self.f)
+		z0 = self.z0
+		if z0_comments is None:
+			z0_comments = not (z0 == z0[0,0]).all()
 		
-		extension = '.s%ip'%self.number_of_ports
+		extension = '.s%ip'%nports
 		
 		outputFile = open(dir+'/'+filename+extension,"w")
 		
@@ -857,32 +916,62 @@ class Network(object):
 		#exactly this format, to work
 		# [HZ/KHZ/MHZ/GHZ] [S/Y/Z/G/H] [MA/DB/RI] [R n]
 		outputFile.write('!Created with mwavepy.\n')
-		outputFile.write('# ' + self.frequency.unit + ' S RI R ' + str(self.z0[0,0]) +" \n")
+		if version == 2:
+			outputFile.write('[Version] 2.0\n')
+		outputFile.write('# %s S %s R %s \n'%\
+			(self.frequency.unit, form.upper(), '%.14g'%z0[0,0].real))
+		if version == 2:
+			outputFile.write('[Number of Ports] %i\n'%nports)
+			if nports == 2:
+				outputFile.write('[Two-Port Data Order] 21_12\n')
+			outputFile.write('[Number of Frequencies] %i\n'%npoints)
+			if not (z0[0] == z0[0,0]).all():
+				outputFile.write('[Reference] %s\n'%\
+					' '.join(['%.14g'%z.real for z in z0[0]]))
+			outputFile.write('[Network Data]\n')
+		
+		# the order of the s-parameters in a line. version 1 files, and 
+		# version 2 2-ports, are written S11, S21, S12, S22 ... 
+		if version == 2 and nports != 2:
+			order = [(m,n) for m in range(nports) for n in range(nports)]
+		else:
+			order = [(m,n) for n in range(nports) for m in range(nports)]
 		
 		#write comment line for users (optional)
-		outputFile.write ("!freq\t")
-		for n in range(self.number_of_ports):
-			for m in range(self.number_of_ports):
-				outputFile.write("Re" +'S'+`m+1`+ `n+1`+  "\tIm"+\
-				'S'+`m+1`+ `n+1`+'\t')
-		outputFile.write('\n')		
-		
-		# write out data, note: this could be done with matrix 
-		#manipulations, but its more readable to me this way
-		for f in range(len(self.f)):
-			outputFile.write(str(self.frequency.f_scaled[f])+'\t')
-			
-			for n in range(self.number_of_ports):
-				for m in range(self.number_of_ports):
-					outputFile.write( str(npy.real(self.s[f,m,n])) + '\t'\
-					 + str(npy.imag(self.s[f,m,n])) +'\t')
-			
-			outputFile.write('\n')
-			outputFile.write('! Port Impedance\t' )
-			for n in range(self.number_of_ports):
-				outputFile.write('%.14f\t%.14f\t'%(self.z0[f,n].real, self.z0[f,n].imag))
-			outputFile.write('\n')
-		
+		names = {'ri':('Re','Im'), 'ma':('Mag','Ang'), 'db':('dB','Ang')}[form]
+		outputFile.write('!freq\t' + ''.join(['%sS%i%i\t%sS%i%i\t'%\
+			(names[0],m+1,n+1,names[1],m+1,n+1) for m,n in order]) + '\n')
+		
+		# build the data block as one array, with a column for 
+		# frequency and two for each s-parameter
+		s = npy.array([self.s[:,m,n] for m,n in order]).T
+		data = npy.empty((npoints, 1+2*nports**2))
+		data[:,0] = self.frequency.f_scaled
+		if form == 'ri':
+			data[:,1::2], data[:,2::2] = s.real, s.imag
+		elif form == 'ma':
+			data[:,1::2], data[:,2::2] = mf.complex_2_magnitude(s), \
+				mf.complex_2_degree(s)
+		elif form == 'db':
+			data[:,1::2], data[:,2::2] = mf.complex_2_db(s), \
+				mf.complex_2_degree(s)
+		line_format = '\t'.join(['%.12g']*data.shape[1]) + '\t\n'
+		
+		if z0_comments:
+			data = npy.hstack((data, npy.empty((npoints, 2*nports))))
+			data[:,-2*nports::2] = z0.real
+			data[:,-2*nports+1::2] = z0.imag
+			line_format = line_format + '! Port Impedance\t' + \
+				'%.14f\t%.14f\t'*nports + '\n'
+		
+		# write out data, many lines with each string formatting 
+		block_size = 10000
+		for start in range(0, npoints, block_size):
+			block = data[start:start+block_size]
+			outputFile.write((line_format*len(block))%tuple(block.ravel().tolist()))
+		
+		if version == 2:
+			outputFile.write('[End]\n')
 		outputFile.close()
 
 
@@ -920,11 +1009,9 @@ class Network(object):
 		'''
 		interpolation_s = interp1d(self.frequency.f,self.s,axis=0,**kwargs)
 		interpolation_z0 = interp1d(self.frequency.f,self.z0,axis=0,**kwargs)
-		result = deepcopy(self)
-		result.frequency = new_frequency
-		result.s = interpolation_s(new_frequency.f)
-		result.z0 = interpolation_z0(new_frequency.f)
-		return result
+		return self._from_arrays(new_frequency, \
+			interpolation_s(new_frequency.f), \
+			interpolation_z0(new_frequency.f), self.name)
 
 	def change_frequency(self, new_frequency, **kwargs):
 		self.frequency.start = new_frequency.start
@@ -1817,18 +1904,19 @@ def connect(ntwkA, k, ntwkB,l):
 	>>> ntwkC = mv.connect(ntwkA, 1, ntwkB,0)
 	
 	'''
-	ntwkC = deepcopy(ntwkA)
 	# account for port impedance mis-match by inserting a two-port 
 	# network at the connection. if ports are matched this becomes a 
 	# thru
+	s = ntwkA.s
 	if not (ntwkA.z0[:,k] == ntwkB.z0[:,l]).all():
-		ntwkC.s = connect_s(\
-			ntwkA.s,k, \
+		s = connect_s(s,k, \
 			impedance_mismatch(ntwkA.z0[:,k],ntwkB.z0[:,l]),0)
 			
-	ntwkC.s = connect_s(ntwkC.s,k,ntwkB.s,l)
-	ntwkC.z0=npy.hstack((npy.delete(ntwkA.z0,k,1),npy.delete(ntwkB.z0,l,1)))
-	return ntwkC
+	s = connect_s(s,k,ntwkB.s,l)
+	z0 = _z0_of_ports([\
+		(ntwkA, [p for p in range(ntwkA.number_of_ports) if p != k]),\
+		(ntwkB, [p for p in range(ntwkB.number_of_ports) if p != l])])
+	return ntwkA._from_arrays(ntwkA.frequency, s, z0, ntwkA.name)
 	
 def innerconnect(ntwkA, k, l):
 	'''
@@ -1871,14 +1959,40 @@ def innerconnect(ntwkA, k, l):
 	>>> ntwkC = mv.innerconnect(ntwkA, 0,1)
 	
 	'''
-	ntwkC = deepcopy(ntwkA)
-	ntwkC.s = connect_s(\
+	s = connect_s(\
 		ntwkA.s,k, \
 		impedance_mismatch(ntwkA.z0[:,k],ntwkA.z0[:,l]),0)
-	ntwkC.s = innerconnect_s(ntwkC.s,k,l)
-	ntwkC.z0=npy.delete(ntwkC.z0,[l,k],1)
-	return ntwkC
+	s = innerconnect_s(s,k,l)
+	z0 = _z0_of_ports([\
+		(ntwkA, [p for p in range(ntwkA.number_of_ports) if p not in (k,l)])])
+	return ntwkA._from_arrays(ntwkA.frequency, s, z0, ntwkA.name)
+	
+def _z0_of_ports(ntwk_ports):
+	'''
+	the z0 of some ports of some networks, side by side. 
 	
+	`ntwk_ports` is a list of (network, list of port indices). if all 
+	of these z0 are constant over frequency, the result is a single 
+	number or an array with one value per port, so that it does not 
+	take up memory for every frequency. otherwise it is a fxn array.
+	'''
+	per_port = []
+	for ntwk, ports in ntwk_ports:
+		z0 = npy.asarray(ntwk.__dict__.get('_z0', 50))
+		npoints, nports = ntwk.s.shape[:2]
+		if z0.ndim == 0:
+			per_port.append(z0.repeat(len(ports)))
+		elif z0.ndim == 1 and len(z0) == nports and len(z0) != npoints:
+			per_port.append(z0[ports])
+		else:
+			break
+	else:
+		z0 = npy.hstack(per_port)
+		if len(z0) > 0 and (z0 == z0[0]).all():
+			return z0[0]
+		return z0
+	return npy.hstack([ntwk.z0[:,ports] for ntwk, ports in ntwk_ports])
+
 def cascade(ntwkA,ntwkB):
 	'''
 	cascade two 2-port Networks together
@@ -1904,6 +2018,79 @@ def cascade(ntwkA,ntwkB):
 	'''
 	return connect(ntwkA,1, ntwkB,0)
 
+def cascade_list(ntwk_list, name=None):
+	'''
+	cascade a list of 2-port Networks together
+	
+	this is equivalent to `ntwk_list[0] ** ntwk_list[1] ** ...` but
+	is much faster for long chains. all links are converted to 
+	scattering transfer parameters once, multiplied together with
+	a tree-reduced (log-depth) matrix product over the whole frequency
+	axis, and converted back to s-parameters once at the end.
+	
+	Parameters
+	-----------
+	ntwk_list : list of :class:`Network` objects
+		the 2-port networks to cascade, in order. port 1 of each
+		network is connected to port 0 of the next. 
+	name : string, optional
+		name of the resultant network
+	
+	Returns
+	--------
+	C : :class:`Network`
+		the resultant cascaded network
+	
+	Notes
+	------
+	port impedance mis-matches between adjacent networks are handled 
+	in the same pass, by inserting the t-parameters of the 
+	:func:`impedance_mismatch` network between the links, just 
+	as :func:`connect` does.
+	
+	See Also
+	---------
+	cascade : cascades two networks 
+	connect : connects two Networks together at arbitrary ports.
+	
+	Examples
+	---------
+	>>> line = my_media.line(1e-3)
+	>>> long_line = mv.cascade_list([line]*100)
+	'''
+	if len(ntwk_list) == 0:
+		raise(ValueError('ntwk_list is empty'))
+	for ntwk in ntwk_list:
+		if ntwk.number_of_ports != 2:
+			raise(ValueError('can only cascade 2-port Networks'))
+		if ntwk.frequency != ntwk_list[0].frequency:
+			raise(IndexError('Networks must have the same frequency'))
+	
+	s_list = []
+	for k in range(len(ntwk_list)):
+		if k > 0:
+			z_left = ntwk_list[k-1].z0[:,1]
+			z_right = ntwk_list[k].z0[:,0]
+			if not (z_left == z_right).all():
+				s_list.append(impedance_mismatch(z_left, z_right))
+		s_list.append(ntwk_list[k].s)
+	
+	# convert all links at once, and re-arrange the t-matrices to be
+	# 2x2xNxF so that each matrix element is a contiguous array.
+	t = s2t(npy.array(s_list)).transpose(2,3,0,1).copy()
+	
+	# multiply neighbouring pairs until one t-matrix is left. each
+	# level is one batched product over all pairs and frequencies
+	while t.shape[2] > 1:
+		n = t.shape[2]
+		t = npy.concatenate((_mul_2x2(t[:,:,0:n-1:2], t[:,:,1::2]),\
+			t[:,:,n-n%2:]), axis=2)
+	
+	return Network._from_arrays(ntwk_list[0].frequency, \
+		t2s(t[:,:,0].transpose(2,0,1)), \
+		npy.column_stack((ntwk_list[0].z0[:,0], ntwk_list[-1].z0[:,1])), \
+		name)
+
 def de_embed(ntwkA,ntwkB):	
 	'''
 	de-embed `ntwkA` from `ntwkB`. this calls `ntwkA.inv**ntwkB`. 
@@ -1957,14 +2144,11 @@ def average(list_of_networks):
 	>>> ntwk_list = [mv.Network('myntwk.s1p'), mv.Network('myntwk2.s1p')]
 	>>> mean_ntwk = mv.average(ntwk_list)	
 	'''
-	out_ntwk = copy(list_of_networks[0])
-	
+	s = npy.array(list_of_networks[0].s, dtype=complex)
 	for a_ntwk in list_of_networks[1:]:
-		out_ntwk += a_ntwk
+		s += a_ntwk.s
 
-	out_ntwk.s = out_ntwk.s/(len(list_of_networks))
-
-	return out_ntwk
+	return list_of_networks[0]._with_s(s/len(list_of_networks))
 
 def one_port_2_two_port(ntwk):
 	'''
@@ -1976,8 +2160,8 @@ def one_port_2_two_port(ntwk):
 	returns:
 		ntwk: the resultant two-port Network
 	'''
-	result = copy(ntwk)
-	result.s = npy.zeros((result.frequency.npoints,2,2), dtype=complex) 
+	result = ntwk._with_s(\
+		npy.zeros((ntwk.frequency.npoints,2,2), dtype=complex))
 	s11 = ntwk.s[:,0,0]
 	result.s[:,0,0] = s11
 	result.s[:,1,1] = s11
@@ -2032,20 +2216,20 @@ def connect_s(A,k,B,l):
 	if k > A.shape[-1]-1 or l>B.shape[-1]-1:
 		raise(ValueError('port indecies are out of range'))
 	
-	if len (A.shape) > 2:
-		# assume this is a kxnxn matrix
-		n = A.shape[-1]+B.shape[-1]-2 # nports of output Matrix
-		C = npy.zeros((A.shape[0], n,n), dtype='complex')
-		
-		for f in range(A.shape[0]):
-			C[f,:,:] = connect_s(A[f,:,:],k,B[f,:,:],l)
-		return C
-	else:		
-		filler = npy.zeros((A.shape[0],B.shape[1]))
-		#create composite matrix, appending each sub-matrix diagonally
-		C= npy.vstack( [npy.hstack([A,filler]),npy.hstack([filler.T,B])])
-		
-		return innerconnect_s(C, k,A.shape[-1]+l)
+	if len (A.shape) < 3:
+		# a single nxn matrix, promote it to a 1xnxn stack and back
+		return connect_s(A.reshape((1,)+A.shape),k,\
+			B.reshape((1,)+B.shape),l)[0]
+	
+	nA = A.shape[-1]
+	nB = B.shape[-1]
+	# create composite matrix, appending each sub-matrix diagonally. 
+	# this is done for all frequencies at once
+	C = npy.zeros((A.shape[0], nA+nB, nA+nB), dtype='complex')
+	C[:,:nA,:nA] = A
+	C[:,nA:,nA:] = B
+	
+	return innerconnect_s(C, k, nA+l)
 		
 def innerconnect_s(A, k, l):
 	'''
@@ -2076,6 +2260,10 @@ def innerconnect_s(A, k, l):
 	'sub-network growth',  can be found in [#]_. The original paper 
 	describing the  algorithm is given in [#]_.
 	
+	The calculation is vectorized over the frequency axis, and only 
+	the (n-2)x(n-2) block of ports which remain after the connection
+	is computed.
+	
 	References
 	----------	
 	.. [#] Compton, R.C.; , "Perspectives in microwave circuit analysis," Circuits and Systems, 1989., Proceedings of the 32nd Midwest Symposium on , vol., no., pp.716-718 vol.2, 14-16 Aug 1989. URL: http://ieeexplore.ieee.org/stamp/stamp.jsp?tp=&arnumber=101955&isnumber=3167
@@ -2085,34 +2273,37 @@ def innerconnect_s(A, k, l):
 
 	'''
 	
-	# TODO: this algorithm is a bit wasteful in that it calculates the 
-	# scattering parameters for a network of rank S.rank+T.rank and 
-	# then deletes the ports which are 'connected' 
 	if k > A.shape[-1] -1 or l>A.shape[-1]-1:
 		raise(ValueError('port indecies are out of range'))
 	
-	if len (A.shape) > 2:
-		# assume this is a kxnxn matrix
-		n = A.shape[-1]-2 # nports of output Matrix
-		C = npy.zeros((A.shape[0], n,n), dtype='complex')
-		
-		for f in range(A.shape[0]):
-			C[f,:,:] = innerconnect_s(A[f,:,:],k,l)
-		return C
-	else:
-		n = A.shape[0]
-		C = npy.zeros([n,n],dtype='complex')
-		for i in range(n):
-			for j in range(n):
-				C[i,j] = A[i,j] +  \
-					( A[k,j]*A[i,l]*(1-A[l,k]) + A[l,j]*A[i,k]*(1-A[k,l]) +\
-					A[k,j]*A[l,l]*A[i,k] + A[l,j]*A[k,k]*A[i,l])/\
-					( (1-A[k,l])*(1-A[l,k]) - A[k,k]*A[l,l] )
-		C = npy.delete(C,(k,l),0)
-		C = npy.delete(C,(k,l),1)
-		return C
-
-def s2t(s):
+	if len (A.shape) < 3:
+		# a single nxn matrix, promote it to a 1xnxn stack and back
+		return innerconnect_s(A.reshape((1,)+A.shape),k,l)[0]
+	
+	# the ports which survive the connection. only the 
+	# (n-2)x(n-2) block of these ports is calculated, for all 
+	# frequencies at once.
+	keep = [p for p in range(A.shape[-1]) if p not in (k,l)]
+	
+	# scalar terms, shaped fx1x1 so they broadcast over the block 
+	Akk = A[:,k,k][:,None,None]
+	Akl = A[:,k,l][:,None,None]
+	Alk = A[:,l,k][:,None,None]
+	All = A[:,l,l][:,None,None]
+	# row vectors (fx1x(n-2)) and column vectors (fx(n-2)x1)
+	Akj = A[:,k,keep][:,None,:]
+	Alj = A[:,l,keep][:,None,:]
+	Aik = A[:,keep,k][:,:,None]
+	Ail = A[:,keep,l][:,:,None]
+	
+	Aij = A[:,keep,:][:,:,keep]
+	
+	C = Aij + ( Akj*Ail*(1-Alk) + Alj*Aik*(1-Akl) +\
+		Akj*All*Aik + Alj*Akk*Ail)/\
+		( (1-Akl)*(1-Alk) - Akk*All )
+	return C
+
+def s2t(s, singular='warn'):
 	'''
 	converts scattering parameters to scattering transfer parameters. 
 	
@@ -2124,13 +2315,22 @@ def s2t(s):
 	-----------
 	s : numpy.ndarray
 		scattering parameter matrix. shape should be should be 2x2, or
-		fx2x2
+		...x2x2, such as fx2x2
+	singular : ['warn','raise','ignore']
+		what to do at points where S21 is zero, and the transfer 
+		parameters dont exist. these points are set to `nan`. see 
+		:func:`singular_points`
 	
 	Returns
 	-------
 	t : numpy.ndarray
 		scattering transfer parameters (aka wave cascading matrix)
-		
+	
+	Notes
+	------
+	the conversion is done in closed-form, for all leading 
+	dimensions at once.
+	
 	See Also
 	---------
 	t2s : converts scattering transfer parameters to scattering 
@@ -2141,19 +2341,20 @@ def s2t(s):
 	-----------
 	.. [#] http://en.wikipedia.org/wiki/Scattering_transfer_parameters#Scattering_transfer_parameters
 	'''
-	t = npy.copy(s)
-
-	if len (s.shape) > 2 :
-		for f in range(s.shape[0]):
-			t[f,:,:] = s2t(s[f,:,:])
-	elif s.shape == (2,2):
-		t = npy.array([[-1*npy.linalg.det(s),	s[0,0]],\
-					[-s[1,1],1]]) / s[1,0]
-	else:
-		raise IndexError('matrix should be 2x2, or kx2x2')
+	s = _check_2x2(s)
+	s11, s12, s21, s22 = s[...,0,0], s[...,0,1], s[...,1,0], s[...,1,1]
+	mask = singular_points(s21, singular, 'S21')
+	
+	t = npy.empty(s.shape, dtype=complex)
+	with npy.errstate(divide='ignore', invalid='ignore'):
+		t[...,0,0] = -1*(s11*s22 - s12*s21)/s21
+		t[...,0,1] = s11/s21
+		t[...,1,0] = -1*s22/s21
+		t[...,1,1] = 1./s21
+	t[mask] = npy.nan
 	return t        
         
-def t2s(t):
+def t2s(t, singular='warn'):
 	'''
 	converts scattering transfer parameters to scattering parameters 
 	
@@ -2166,7 +2367,10 @@ def t2s(t):
 	-----------
 	t : numpy.ndarray
 		scattering transfer parameters, shape should be should be 2x2, or
-		fx2x2
+		...x2x2, such as fx2x2
+	singular : ['warn','raise','ignore']
+		what to do at points where T22 is zero. these points are set 
+		to `nan`. see :func:`singular_points`
 	
 	Returns
 	-------
@@ -2182,19 +2386,20 @@ def t2s(t):
 	-----------
 	.. [#] http://en.wikipedia.org/wiki/Scattering_transfer_parameters#Scattering_transfer_parameters
 	'''
-	s = npy.copy(t)
-	if len (t.shape) > 2 :
-		for f in range(t.shape[0]):
-			s[f,:,:] = t2s(s[f,:,:])
-	
-	elif t.shape== (2,2):
-		s = npy.array([[t[0,1],npy.linalg.det(t)],\
-			[1,-t[1,0]]])/t[1,1]
-	else:
-		raise IndexError('matrix should be 2x2, or kx2x2')
+	t = _check_2x2(t)
+	t11, t12, t21, t22 = t[...,0,0], t[...,0,1], t[...,1,0], t[...,1,1]
+	mask = singular_points(t22, singular, 'T22')
+	
+	s = npy.empty(t.shape, dtype=complex)
+	with npy.errstate(divide='ignore', invalid='ignore'):
+		s[...,0,0] = t12/t22
+		s[...,0,1] = (t11*t22 - t12*t21)/t22
+		s[...,1,0] = 1./t22
+		s[...,1,1] = -1*t21/t22
+	s[mask] = npy.nan
 	return s
 	
-def inv(s):
+def inv(s, singular='warn'):
 	'''
 	calculates 'inverse' s-parameter matrix, used for de-embeding
 	
@@ -2214,13 +2419,26 @@ def inv(s):
 	-----------
 	s : numpy.ndarray
 		scattering parameter matrix. shape should be should be 2x2, or
-		fx2x2
+		...x2x2, such as fx2x2
+	singular : ['warn','raise','ignore']
+		what to do at points where det(s) is zero. these points are 
+		set to `nan`. see :func:`singular_points`
 	
 	Returns
 	-------
 	s' : numpy.ndarray
 		inverse scattering parameter matrix.
 	
+	Notes
+	------
+	carrying out the t-parameter algebra above in closed-form gives
+	
+	.. math::
+	
+		inv(s) = \\frac{1}{det(s)} \\begin{bmatrix} S_{11} & -S_{21} \\\\ -S_{12} & S_{22} \\end{bmatrix}
+	
+	which is what is calculated, for all leading dimensions at once.
+	
 	See Also
 	---------
 	t2s : converts scattering transfer parameters to scattering parameters
@@ -2229,14 +2447,18 @@ def inv(s):
 		
 	'''
 	# this idea is from lihan
-	i = npy.copy(s)
-	if len (s.shape) > 2 :
-		for f in range(len(s)):
-			i[f,:,:] = inv(s[f,:,:])
-	elif s.shape == (2,2):
-		i = t2s(npy.linalg.inv(s2t(s)))
-	else:
-		raise IndexError('matrix should be 2x2, or kx2x2')
+	s = _check_2x2(s)
+	s11, s12, s21, s22 = s[...,0,0], s[...,0,1], s[...,1,0], s[...,1,1]
+	det = s11*s22 - s12*s21
+	mask = singular_points(det, singular, 'det(S)')
+	
+	i = npy.empty(s.shape, dtype=complex)
+	with npy.errstate(divide='ignore', invalid='ignore'):
+		i[...,0,0] = s11/det
+		i[...,0,1] = -1*s21/det
+		i[...,1,0] = -1*s12/det
+		i[...,1,1] = s22/det
+	i[mask] = npy.nan
 	return i
 
 def flip(a):
@@ -2247,7 +2469,7 @@ def flip(a):
 	-----------
 	a : numpy.ndarray
 		scattering parameter matrix. shape should be should be 2x2, or
-		fx2x2
+		...x2x2, such as fx2x2
 	
 	Returns
 	-------
@@ -2259,20 +2481,64 @@ def flip(a):
 	-----
 			only works for 2-ports at the moment
 	'''
-	c = copy(a)
-	
-	if len (a.shape) > 2 :
-		for f in range(a.shape[0]):
-			c[f,:,:] = flip(a[f,:,:])
-	elif a.shape == (2,2):
-		c[0,0] = a[1,1]
-		c[1,1] = a[0,0]
-		c[0,1] = a[1,0]
-		c[1,0] = a[0,1]
-	else:
-		raise IndexError('matricies should be 2x2, or kx2x2')
+	a = _check_2x2(a)
+	# reversing both port axes swaps S11<->S22 and S12<->S21
+	return a[...,::-1,::-1].copy()
+
+def _mul_2x2(a, b):
+	'''
+	closed-form matrix product of two arrays of 2x2 matrices, stored 
+	with the matrix indices first, ie shape 2x2x...
+	'''
+	c = npy.empty(npy.broadcast(a,b).shape, dtype=complex)
+	c[0,0] = a[0,0]*b[0,0] + a[0,1]*b[1,0]
+	c[0,1] = a[0,0]*b[0,1] + a[0,1]*b[1,1]
+	c[1,0] = a[1,0]*b[0,0] + a[1,1]*b[1,0]
+	c[1,1] = a[1,0]*b[0,1] + a[1,1]*b[1,1]
 	return c
 
+def singular_points(x, singular='warn', name='matrix'):
+	'''
+	finds, and handles, the points at which a closed-form 2x2 
+	conversion is singular. 
+	
+	Parameters
+	-----------
+	x : numpy.ndarray
+		the quantity which is divided by in the conversion
+	singular : ['warn','raise','ignore']
+		policy for singular points.
+		 * *warn* : issue a warning (default)
+		 * *raise* : raise a ValueError
+		 * *ignore* : do nothing
+	name : string
+		name of `x`, used in the message
+	
+	Returns
+	--------
+	mask : boolean numpy.ndarray
+		True where `x` is zero. 
+	'''
+	if singular not in ['warn','raise','ignore']:
+		raise(ValueError('singular must be one of: \'warn\',\'raise\',\'ignore\''))
+	mask = (x == 0)
+	if mask.any():
+		msg = '%s is zero at %i point[s], result is undefined (nan) there'\
+			%(name, mask.sum())
+		if singular == 'raise':
+			raise(ValueError(msg))
+		elif singular == 'warn':
+			warnings.warn(msg)
+	return mask
+
+def _check_2x2(a):
+	'''
+	makes sure a is an array of shape ...x2x2
+	'''
+	a = npy.asarray(a)
+	if a.ndim < 2 or a.shape[-2:] != (2,2):
+		raise IndexError('matrix should be 2x2, or kx2x2')
+	return a
 
 
 
@@ -2305,43 +2571,214 @@ def impedance_mismatch(z1, z2):
 
 
 # Touchstone manipulation	
-def load_all_touchstones(dir = '.', contains=None, f_unit=None):
+## matches touchstone file extensions, .s1p, .s2p, ... .s10p ...
+TOUCHSTONE_EXTENSION = re.compile(r'\.s\d+p$', re.IGNORECASE)
+
+def _read_network(filename):
 	'''
-	loads all touchtone files in a given dir into a dictionary. 
-	
+	reads a touchstone file. used by :func:`load_all_touchstones`, in
+	worker processes.
+	'''
+	return filename, Network(filename)
+
+def _touchstone_filenames(dir, contains=None, pattern=None):
+	'''
+	yields the paths of the touchstone files in `dir`, sorted by name.
+	see :func:`load_all_touchstones` for `contains` and `pattern`.
+	'''
+	for f in sorted(os.listdir (dir)):
+		if contains is not None and contains not in f:
+			continue
+		if TOUCHSTONE_EXTENSION.search(f) is None:
+			continue
+		if pattern is not None:
+			if hasattr(pattern, 'search'):
+				if pattern.search(f) is None:
+					continue
+			elif not fnmatch.fnmatch(f, pattern):
+				continue
+		yield os.path.join(dir, f)
+
+def load_all_touchstones(dir = '.', contains=None, f_unit=None, \
+	pattern=None, workers=1, pool='process', as_set=False, \
+	progress=None, cache=None):
+	'''
+	loads all touchtone files in a given dir into a dictionary.
+
+	Any file with a `.sNp` extension is loaded. The files can be read
+	in parallel by a pool of processes or threads.
+
 	Parameters
 	-----------
 	dir :	string
-		the path 
-	contains :	string 
+		the path
+	contains :	string
 		a string the filenames must contain to be loaded.
 	f_unit 	: ['hz','mhz','ghz']
-		the frequency unit to assign all loaded networks. see 
+		the frequency unit to assign all loaded networks. see
 		:attr:`frequency.Frequency.unit`.
-		
+	pattern : string, or compiled regular expression
+		only filenames matching this are loaded. a string is a glob
+		pattern, like '*20v*.s2p'. a regular expression (from
+		`re.compile`) is matched with its `search` method.
+	workers : int, or None
+		number of files read at once. if None, the number of cpus is
+		used. the default, 1, reads the files one at a time without
+		a pool.
+	pool : ['process','thread']
+		kind of worker pool. parsing is cpu bound, so processes
+		are usually faster.
+	as_set : boolean
+		return a :class:`~mwavepy.networkSet.NetworkSet`, ordered by
+		filename, instead of a dictionary.
+	progress : function, optional
+		called as `progress(n_done, n_total, filename)` after each
+		file is loaded.
+	cache : dictionary, optional
+		networks from a previous call, keyed by file path. a file
+		whose modification time and size are unchanged is taken from
+		the cache instead of being read again. the cache is updated
+		with the files that are read. the returned networks are views
+		of the cached ones, with their own frequency, so `f_unit` does
+		not change the cache, but their s-matrices are shared.
+
 	Returns
 	---------
 	ntwkDict : a dictonary with keys equal to the file name (without
 		a suffix), and values equal to the corresponding ntwk types
-	
+
 	Examples
 	----------
 	>>> ntwk_dict = mv.load_all_touchstones('.', contains ='20v')
-		
+
+	Loading a directory with 8 processes, re-using the networks of
+	unchanged files on the next call
+
+	>>> cache = {}
+	>>> ntwk_dict = mv.load_all_touchstones('.', workers=8, cache=cache)
+	>>> ntwk_dict = mv.load_all_touchstones('.', workers=8, cache=cache)
 	'''
+	filenames = list(_touchstone_filenames(dir, contains, pattern))
+
+	def file_key(filename):
+		stat = os.stat(filename)
+		return (stat.st_mtime, stat.st_size)
+
+	ntwks = {}
+	to_read = []
+	for filename in filenames:
+		if cache is not None and filename in cache and \
+			cache[filename][0] == file_key(filename):
+			ntwks[filename] = cache[filename][1]
+		else:
+			to_read.append(filename)
+
+	def done(filename, ntwk):
+		ntwks[filename] = ntwk
+		if cache is not None:
+			cache[filename] = (file_key(filename), ntwk)
+		if progress is not None:
+			progress(len(ntwks), len(filenames), filename)
+
+	if workers == 1 or len(to_read) <= 1:
+		for filename in to_read:
+			done(*_read_network(filename))
+	else:
+		if workers is None:
+			workers = multiprocessing.cpu_count()
+		if pool == 'process':
+			worker_pool = multiprocessing.Pool(workers)
+		elif pool == 'thread':
+			worker_pool = multiprocessing.pool.ThreadPool(workers)
+		else:
+			raise(ValueError('pool must be \'process\' or \'thread\''))
+		try:
+			# results are handed back as soon as they are ready, in
+			# chunks small enough to keep the progress moving
+			chunksize = max(1, len(to_read)//(8*workers))
+			for filename, ntwk in worker_pool.imap_unordered(\
+				_read_network, to_read, chunksize):
+				done(filename, ntwk)
+		finally:
+			worker_pool.close()
+			worker_pool.join()
+
 	ntwkDict = {}
+	for filename in filenames:
+		name = os.path.splitext(os.path.basename(filename))[0]
+		ntwk = ntwks[filename]
+		if cache is not None:
+			ntwk = ntwk._with_s(ntwk.s)
+		ntwkDict[name] = ntwk
+		if f_unit is not None: ntwkDict[name].frequency.unit=f_unit
+
+	if as_set:
+		from networkSet import NetworkSet
+		return NetworkSet([ntwkDict[name] for name in sorted(ntwkDict)])
+	return ntwkDict
+
+def _touchstone_z0(touchstoneFile):
+	'''
+	the port impedances of a :class:`~mwavepy.touchstone.touchstone`
+	
+	this is the resistance from the option line, or the `[Reference]`
+	of a version 2 file if the ports differ.
+	
+	Parameters
+	-----------
+	touchstoneFile : :class:`~mwavepy.touchstone.touchstone` object
+	
+	Returns
+	---------
+	z0 : number, or numpy.ndarray of length nports
+	'''
+	reference = [float(r) for r in touchstoneFile.reference]
+	if len(set(reference)) == 1:
+		return reference[0]
+	return npy.array(reference)
 
-	for f in os.listdir (dir):
-		if contains is not None and contains not in f:
-			continue
-			
-		# TODO: make this s?p with reg ex
-		if( f.lower().endswith ('.s1p') or f.lower().endswith ('.s2p') ):
-			name = f[:-4]
-			ntwkDict[name]=(Network(dir +'/'+f))
-			if f_unit is not None: ntwkDict[name].frequency.unit=f_unit
-		
-	return ntwkDict	
+def iter_touchstone(filename, npoints=10000):
+	'''
+	reads a touchstone file in chunks of frequency points.
+	
+	this is a generator which yields a :class:`Network` for each 
+	chunk of `npoints` frequency points in the file. only one chunk is
+	held in memory at a time, so very large sweeps can be processed 
+	without loading them whole. 
+	
+	Parameters
+	-----------
+	filename : string
+		touchstone file name
+	npoints : int
+		number of frequency points in each yielded network. the last 
+		network may have fewer.
+	
+	Returns
+	---------
+	ntwk_generator : generator of :class:`Network` objects
+		each is a frequency band of the file, in order.
+	
+	See Also
+	----------
+	Network.read_touchstone : reads the whole file at once
+	
+	Examples
+	----------
+	>>> for ntwk in mv.iter_touchstone('big_sweep.s4p', npoints=1000):
+	...	print ntwk.s_db[:,0,0].max()
+	'''
+	touchstoneFile = touchstone.touchstone(filename, header_only=True)
+	if touchstoneFile.get_format().split()[1] != 's':
+		raise NotImplementedError('only s-parameters supported for now.')
+	name = os.path.basename( os.path.splitext(filename)[0])
+	
+	for f, s in touchstoneFile.iter_sparameter_arrays(npoints):
+		ntwk = Network(name=name)
+		ntwk.f, ntwk.s = f, s
+		ntwk.z0 = _touchstone_z0(touchstoneFile)
+		ntwk.frequency.unit = touchstoneFile.frequency_unit
+		yield ntwk
 
 def write_dict_of_networks(ntwkDict, dir='.'):
 	'''
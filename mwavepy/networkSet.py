@@ -519,9 +519,7 @@ def func_on_networks(ntwk_list, func, attribute='s',*args, **kwargs):
 	data_matrix = \
 		npy.array([ntwk.__getattribute__(attribute) for ntwk in ntwk_list])
 	
-	new_ntwk = deepcopy(ntwk_list[0])
-	new_ntwk.s = func(data_matrix,axis=0,*args,**kwargs)
-	return new_ntwk
+	return ntwk_list[0]._with_s(func(data_matrix,axis=0,*args,**kwargs))
 
 # short hand name for convenience
 fon = func_on_networks
@@ -0,0 +1,543 @@
+#       benchmark.py
+#
+#       Copyright 2010 alex arsenovic <arsenovic@virginia.edu>
+#
+#       This program is free software; you can redistribute it and/or modify
+#       it under the terms of the GNU General Public License as published by
+#       the Free Software Foundation; either version 2 of the License, or
+#       (at your option) any later versionpy.
+#
+#       This program is distributed in the hope that it will be useful,
+#       but WITHOUT ANY WARRANTY; without even the implied warranty of
+#       MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#       GNU General Public License for more details.
+#
+#       You should have received a copy of the GNU General Public License
+#       along with this program; if not, write to the Free Software
+#       Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#       MA 02110-1301, USA.
+'''
+benchmarks of the vectorized algorithms against the per-frequency
+implementations they replaced.
+
+the reference implementations are kept here so that results and
+timings can be compared. run this file as a script,
+
+	python benchmark.py
+'''
+import os
+import glob
+import tempfile
+import time
+
+import numpy as npy
+import mwavepy as mv
+from mwavepy.calibration import calibrationAlgorithms
+
+
+def time_it(func, *args, **kwargs):
+	'''
+	returns the result of func(*args, **kwargs) and the time it took,
+	in seconds.
+	'''
+	start = time.time()
+	result = func(*args, **kwargs)
+	return result, time.time()-start
+
+def report(name, t_reference, t_new, max_error):
+	print '%-36s reference: %8.4fs   new: %8.4fs   speedup: %7.1fx   max error: %.2e'\
+		%(name, t_reference, t_new, t_reference/max(t_new,1e-9), max_error)
+
+def random_s(npoints, nports):
+	return npy.random.randn(npoints, nports, nports) + \
+		1j*npy.random.randn(npoints, nports, nports)
+
+
+## reference implementations
+def innerconnect_s_loop(A, k, l):
+	'''
+	per-frequency implementation of :func:`mwavepy.network.innerconnect_s`
+	'''
+	if len (A.shape) > 2:
+		n = A.shape[-1]-2
+		C = npy.zeros((A.shape[0], n,n), dtype='complex')
+		for f in range(A.shape[0]):
+			C[f,:,:] = innerconnect_s_loop(A[f,:,:],k,l)
+		return C
+	else:
+		n = A.shape[0]
+		C = npy.zeros([n,n],dtype='complex')
+		for i in range(n):
+			for j in range(n):
+				C[i,j] = A[i,j] +  \
+					( A[k,j]*A[i,l]*(1-A[l,k]) + A[l,j]*A[i,k]*(1-A[k,l]) +\
+					A[k,j]*A[l,l]*A[i,k] + A[l,j]*A[k,k]*A[i,l])/\
+					( (1-A[k,l])*(1-A[l,k]) - A[k,k]*A[l,l] )
+		C = npy.delete(C,(k,l),0)
+		C = npy.delete(C,(k,l),1)
+		return C
+
+def connect_s_loop(A,k,B,l):
+	'''
+	per-frequency implementation of :func:`mwavepy.network.connect_s`
+	'''
+	if len (A.shape) > 2:
+		n = A.shape[-1]+B.shape[-1]-2
+		C = npy.zeros((A.shape[0], n,n), dtype='complex')
+		for f in range(A.shape[0]):
+			C[f,:,:] = connect_s_loop(A[f,:,:],k,B[f,:,:],l)
+		return C
+	else:
+		filler = npy.zeros((A.shape[0],B.shape[1]))
+		C= npy.vstack( [npy.hstack([A,filler]),npy.hstack([filler.T,B])])
+		return innerconnect_s_loop(C, k,A.shape[-1]+l)
+
+def s2t_loop(s):
+	'''
+	per-frequency implementation of :func:`mwavepy.network.s2t`
+	'''
+	t = npy.copy(s)
+	if len (s.shape) > 2 :
+		for f in range(s.shape[0]):
+			t[f,:,:] = s2t_loop(s[f,:,:])
+	else:
+		t = npy.array([[-1*npy.linalg.det(s),	s[0,0]],\
+					[-s[1,1],1]]) / s[1,0]
+	return t
+
+def t2s_loop(t):
+	'''
+	per-frequency implementation of :func:`mwavepy.network.t2s`
+	'''
+	s = npy.copy(t)
+	if len (t.shape) > 2 :
+		for f in range(t.shape[0]):
+			s[f,:,:] = t2s_loop(s[f,:,:])
+	else:
+		s = npy.array([[t[0,1],npy.linalg.det(t)],\
+			[1,-t[1,0]]])/t[1,1]
+	return s
+
+def inv_loop(s):
+	'''
+	per-frequency implementation of :func:`mwavepy.network.inv`
+	'''
+	i = npy.copy(s)
+	if len (s.shape) > 2 :
+		for f in range(len(s)):
+			i[f,:,:] = inv_loop(s[f,:,:])
+	else:
+		i = t2s_loop(npy.linalg.inv(s2t_loop(s)))
+	return i
+
+def write_touchstone_loop(ntwk, filename):
+	'''
+	per-value implementation of :func:`mwavepy.network.Network.write_touchstone`
+	'''
+	outputFile = open(filename,"w")
+	outputFile.write('!Created with mwavepy.\n')
+	outputFile.write('# ' + ntwk.frequency.unit + ' S RI R ' + str(ntwk.z0[0,0]) +" \n")
+	for f in range(len(ntwk.f)):
+		outputFile.write(str(ntwk.frequency.f_scaled[f])+'\t')
+		for n in range(ntwk.number_of_ports):
+			for m in range(ntwk.number_of_ports):
+				outputFile.write( str(npy.real(ntwk.s[f,m,n])) + '\t'\
+				 + str(npy.imag(ntwk.s[f,m,n])) +'\t')
+		outputFile.write('\n')
+		outputFile.write('! Port Impedance\t' )
+		for n in range(ntwk.number_of_ports):
+			outputFile.write('%.14f\t%.14f\t'%(ntwk.z0[f,n].real, ntwk.z0[f,n].imag))
+		outputFile.write('\n')
+	outputFile.close()
+
+def apply_two_port_cal_loop(cal, ntwk_list):
+	'''
+	per-measurement and per-frequency implementation of the two-port
+	:func:`mwavepy.calibration.calibration.Calibration.apply_cal`
+	'''
+	T1,T2,T3,T4 = cal.Ts
+	dot = npy.dot
+	caled_list = []
+	for input_ntwk in ntwk_list:
+		caled = input_ntwk.s.copy()
+		for f in range(len(input_ntwk.s)):
+			t1,t2,t3,t4,m = T1[f,:,:],T2[f,:,:],T3[f,:,:],\
+				T4[f,:,:],input_ntwk.s[f,:,:]
+			caled[f,:,:] = dot(npy.linalg.inv(-1*dot(m,t3)+t1),(dot(m,t4)-t2))
+		caled_list.append(caled)
+	return caled_list
+
+
+## benchmarks
+def benchmark_connect_s(npoints=20000, nports=4):
+	A = random_s(npoints, nports)
+	B = random_s(npoints, nports)
+
+	C_ref, t_ref = time_it(connect_s_loop, A, 1, B, 2)
+	C_new, t_new = time_it(mv.connect_s, A, 1, B, 2)
+	report('connect_s (%i-ports, %i pts)'%(nports,npoints), t_ref, t_new,\
+		npy.max(npy.abs(C_ref-C_new)))
+
+	D_ref, t_ref = time_it(innerconnect_s_loop, A, 0, 3)
+	D_new, t_new = time_it(mv.innerconnect_s, A, 0, 3)
+	report('innerconnect_s (%i-port, %i pts)'%(nports,npoints), t_ref, t_new,\
+		npy.max(npy.abs(D_ref-D_new)))
+
+def benchmark_two_port_conversions(npoints=20000):
+	s = random_s(npoints, 2)
+	
+	for name, ref_func, new_func in [\
+		('s2t', s2t_loop, mv.s2t),\
+		('t2s', t2s_loop, mv.t2s),\
+		('inv', inv_loop, mv.inv),\
+		]:
+		ref, t_ref = time_it(ref_func, s)
+		new, t_new = time_it(new_func, s)
+		report('%s (%i pts)'%(name,npoints), t_ref, t_new,\
+			npy.max(npy.abs(ref-new)))
+
+def benchmark_cascade_list(npoints=10000, nlinks=100):
+	frequency = mv.Frequency(1,10,npoints,'ghz')
+	media = mv.media.Freespace(frequency)
+	links = []
+	for k in range(nlinks):
+		# slightly mis-matched lines, so the cascade stays well-behaved
+		ntwk = media.line(npy.random.rand()*1e-3) 
+		ntwk.s = ntwk.s + 1e-2*random_s(npoints, 2)
+		links.append(ntwk)
+	
+	new, t_new = time_it(mv.cascade_list, links)
+	
+	# folding the per-frequency connect, as ** did originally. slow.
+	ref, t_ref = time_it(reduce, lambda a,b: connect_s_loop(a,1,b,0), \
+		[link.s for link in links])
+	report('cascade_list vs loop (%i links)'%nlinks, t_ref, t_new, \
+		npy.max(npy.abs(ref-new.s)))
+	
+	# folding the vectorized connect, ie a**b**c...
+	ref, t_ref = time_it(reduce, lambda a,b: a**b, links)
+	report('cascade_list vs ** (%i links)'%nlinks, t_ref, t_new, \
+		npy.max(npy.abs(ref.s-new.s)))
+
+def benchmark_circuit(npoints=10000, nsections=15):
+	frequency = mv.Frequency(1,10,npoints,'ghz')
+	media = mv.media.Freespace(frequency)
+	
+	# ladder filter of `nsections` line + shunt capacitor sections,
+	# ie 30 elements, plus the tees, for the default
+	ntwks, connections = [], []
+	for k in range(nsections):
+		line = media.line(1e-3*(1+npy.random.rand()))
+		line.s = line.s + 1e-2*random_s(npoints, 2)
+		ntwks += [line, media.tee(), media.capacitor(1e-13)]
+		connections += [((3*k,1),(3*k+1,0)), ((3*k+1,2),(3*k+2,0))]
+		if k > 0:
+			connections += [((3*k-2,1),(3*k,0))]
+	
+	def sequential(ntwks):
+		result = ntwks[0]
+		for k in range(0, len(ntwks), 3):
+			if k > 0:
+				result = mv.connect(result, 1, ntwks[k], 0)
+			result = mv.connect(result, 1, ntwks[k+1], 0)
+			result = mv.connect(result, 2, ntwks[k+2], 0)
+		return result
+	
+	ref, t_ref = time_it(sequential, ntwks)
+	new, t_new = time_it(lambda: mv.Circuit(ntwks, connections).network)
+	report('Circuit (%i elements)'%len(ntwks), t_ref, t_new, \
+		npy.max(npy.abs(ref.s-new.s)))
+
+def scale_touchstone(filename, new_filename, npoints):
+	'''
+	writes a copy of a touchstone file with its data rows repeated
+	to `npoints` frequency points, with a monotonic frequency column.
+	'''
+	header = [line for line in open(filename) \
+		if line.strip()[:1] in ['!','#']]
+	rows = mv.touchstone.touchstone(filename).sparameters
+	rows = npy.tile(rows, (npoints//len(rows)+1, 1))[:npoints]
+	rows[:,0] = npy.linspace(rows[0,0], 10*rows[-1,0], npoints)
+	out = open(new_filename, 'w')
+	out.writelines(header)
+	npy.savetxt(out, rows, fmt='%.9g')
+	out.close()
+
+def benchmark_touchstone(npoints=200000):
+	directory = os.path.dirname(os.path.abspath(__file__))
+	tmp_dir = tempfile.mkdtemp()
+	for filename in sorted(glob.glob(os.path.join(directory, '*.s?p'))):
+		big_filename = os.path.join(tmp_dir, \
+			os.path.basename(filename).replace(' ','_'))
+		scale_touchstone(filename, big_filename, npoints)
+		
+		def load(fast_parse):
+			ts = mv.touchstone.touchstone(big_filename, header_only=True)
+			ts.fast_parse = fast_parse
+			ts.load_file(big_filename)
+			return ts.sparameters
+		
+		ref, t_ref = time_it(load, False)
+		new, t_new = time_it(load, True)
+		report('touchstone %s'%os.path.basename(filename)[:25], t_ref, \
+			t_new, npy.max(npy.abs(ref-new)))
+		os.remove(big_filename)
+	os.rmdir(tmp_dir)
+
+def benchmark_write_touchstone(npoints=100000):
+	ntwk = mv.Network()
+	ntwk.f = npy.linspace(1e9, 10e9, npoints)
+	ntwk.s = random_s(npoints, 2)
+	ntwk.z0 = 50
+	tmp_dir = tempfile.mkdtemp()
+	
+	filename = os.path.join(tmp_dir, 'ntwk.s2p')
+	ref, t_ref = time_it(write_touchstone_loop, ntwk, filename)
+	for z0_comments in [True, False]:
+		new, t_new = time_it(ntwk.write_touchstone, 'ntwk', tmp_dir, \
+			z0_comments=z0_comments)
+		saved = mv.Network(filename)
+		report('write_touchstone (z0_comments=%s)'%z0_comments, t_ref, \
+			t_new, npy.max(npy.abs(saved.s-ntwk.s)))
+	os.remove(filename)
+	os.rmdir(tmp_dir)
+
+def one_port_standards(npoints, nstandards):
+	'''
+	ideals and measured one-port standards, behind a random error 
+	network
+	'''
+	frequency = mv.Frequency(1,10,npoints,'ghz')
+	media = mv.media.Freespace(frequency)
+	error_ntwk = media.line(1e-2)
+	error_ntwk.s = error_ntwk.s + .1*random_s(npoints, 2)
+	ideals = [media.short(), media.open(), media.match()] + \
+		[media.delay_short(k*1e-3) for k in range(1, nstandards-2)]
+	measured = [error_ntwk**ideal for ideal in ideals]
+	# a little noise, so the residuals are not zero
+	for ntwk in measured:
+		ntwk.s = ntwk.s + 1e-3*random_s(npoints, 1)
+	return measured, ideals
+
+def benchmark_one_port(npoints=20000, nstandards=6):
+	measured, ideals = one_port_standards(npoints, nstandards)
+	one_port = calibrationAlgorithms.one_port
+	ref, t_ref = time_it(one_port, measured, ideals, solver='lstsq')
+	for solver in ['svd','normal']:
+		new, t_new = time_it(one_port, measured, ideals, solver=solver)
+		max_error = max([npy.max(npy.abs(\
+			ref['error coefficients'][key]-new['error coefficients'][key]))\
+			for key in ref['error coefficients']] + \
+			[npy.max(npy.abs(ref[key]-new[key]))/npy.max(npy.abs(ref[key])) \
+			for key in ['residuals','parameter variance']])
+		report('one_port %s (%i stds, %i pts)'%(solver,nstandards,npoints),\
+			t_ref, t_new, max_error)
+
+def two_port_standards(npoints, nlines=3):
+	'''
+	ideals and measured two-port standards, thru, reflects, match and 
+	`nlines` lines, between two random error networks
+	'''
+	frequency = mv.Frequency(1,10,npoints,'ghz')
+	media = mv.media.Freespace(frequency)
+	X, Y = media.line(1e-2), media.line(2e-2)
+	X.s = X.s + .1*random_s(npoints, 2)
+	Y.s = Y.s + .1*random_s(npoints, 2)
+	def reflect(gamma):
+		ntwk = media.match(nports=2)
+		ntwk.s = gamma*npy.ones(npoints)[:,None,None]*npy.eye(2)
+		return ntwk
+	ideals = [media.thru(), reflect(-1), reflect(1), media.match(nports=2)]+\
+		[media.line(k*1e-3) for k in range(1, nlines+1)]
+	measured = [X**ideal**Y for ideal in ideals]
+	for ntwk in measured:
+		ntwk.s = ntwk.s + 1e-3*random_s(npoints, 2)
+	return measured, ideals
+
+def benchmark_two_port(npoints=16000, nlines=3):
+	measured, ideals = two_port_standards(npoints, nlines)
+	two_port = calibrationAlgorithms.two_port
+	ref, t_ref = time_it(two_port, measured, ideals, solver='lstsq')
+	for solver in ['svd','normal']:
+		new, t_new = time_it(two_port, measured, ideals, solver=solver)
+		max_error = max(\
+			npy.max(npy.abs(ref['error vector']-new['error vector'])),\
+			npy.max(npy.abs(ref['residuals']-new['residuals']))/\
+				npy.max(npy.abs(ref['residuals'])))
+		report('two_port %s (%i stds, %i pts)'%(solver,len(ideals),npoints),\
+			t_ref, t_new, max_error)
+
+def benchmark_apply_cal(npoints=1000, nmeasurements=200):
+	measured, ideals = two_port_standards(npoints)
+	cal = mv.Calibration(measured=measured, ideals=ideals, type='two port')
+	cal.run()
+	duts = [measured[0]**ideal for ideal in measured]*\
+		(nmeasurements//len(measured))
+	
+	ref, t_ref = time_it(apply_two_port_cal_loop, cal, duts)
+	new, t_new = time_it(cal.apply_cal, duts)
+	report('apply_cal two-port (%i x %i pts)'%(len(duts),npoints), t_ref, \
+		t_new, max([npy.max(npy.abs(a-b.s)) for a,b in zip(ref, new)]))
+	s = npy.array([dut.s for dut in duts])
+	new, t_new = time_it(cal.apply_cal, s)
+	report('apply_cal two-port array', t_ref, t_new, \
+		npy.max(npy.abs(npy.array(ref)-new)))
+
+def benchmark_apply_one_port_cal(npoints=1000, nmeasurements=200):
+	measured, ideals = one_port_standards(npoints, 4)
+	cal = mv.Calibration(measured=measured, ideals=ideals, type='one port')
+	cal.run()
+	duts = measured*(nmeasurements//len(measured))
+	expected = ideals*(nmeasurements//len(measured))
+	# the cascade with error_ntwk.inv loses precision where the random
+	# error network is nearly singular, so the error is measured 
+	# against the ideals, which are known up to the added noise
+	def max_error(caled):
+		return max([npy.max(npy.abs(a.s-b.s)) for a,b in zip(caled, expected)])
+	
+	ref, t_ref = time_it(lambda: [cal.error_ntwk.inv**dut for dut in duts])
+	print 'apply_cal one-port reference max error: %.2e'%max_error(ref)
+	new, t_new = time_it(lambda: [cal.apply_cal(dut) for dut in duts])
+	report('apply_cal one-port (%i x %i pts)'%(len(duts),npoints), t_ref, \
+		t_new, max_error(new))
+	new, t_new = time_it(cal.apply_cal, duts)
+	report('apply_cal one-port list', t_ref, t_new, max_error(new))
+
+def benchmark_parametric_self_cal(npoints=2000, d=1.5e-3):
+	from mwavepy.calibration.parametricStandard import Parameterless, \
+		DelayShort_UnknownLength
+	frequency = mv.Frequency(1,10,npoints,'ghz')
+	media = mv.media.Freespace(frequency)
+	error_ntwk = media.line(1e-2)
+	error_ntwk.s = error_ntwk.s + .1*random_s(npoints, 2)
+	ideals = [media.short(), media.open(), media.match()]
+	measured = [error_ntwk**ideal for ideal in ideals + \
+		[media.delay_short(d)]]
+	def ideals_ps():
+		return [Parameterless(ideal) for ideal in ideals] + \
+			[DelayShort_UnknownLength(media, d=.9*d)]
+	
+	ref, t_ref = time_it(calibrationAlgorithms.\
+		parameterized_self_calibration, measured, ideals_ps())
+	print 'parametric self-cal reference error in d: %.2e'\
+		%abs(ref['parameter_vector_final'][0]-d)
+	new, t_new = time_it(calibrationAlgorithms.\
+		parameterized_self_calibration_fast, measured, ideals_ps())
+	report('parametric self-cal (%i pts)'%npoints, t_ref, t_new, \
+		abs(new['parameter_vector_final'][0]-d))
+
+def benchmark_calibration_ensemble(npoints=11, nstandards=5, nrepeats=6,
+	solver='svd'):
+	measured, ideals = one_port_standards(npoints, nstandards)
+	for k, ideal in enumerate(ideals):
+		ideal.name = 'std%i'%k
+	repeats = []
+	for ntwk, ideal in zip(measured, ideals):
+		for k in range(nrepeats):
+			repeat = ntwk._with_s(ntwk.s + 1e-3*random_s(npoints, 1))
+			repeat.name = '%s %i'%(ideal.name, k)
+			repeats.append(repeat)
+	dut = measured[-1]
+	cal_set = mv.cartesian_product_calibration_set(ideals, repeats, \
+		type='one port', solver=solver)
+	def loop():
+		return [cal.apply_cal(dut) for cal in cal_set]
+	ref, t_ref = time_it(loop)
+	cal_set = mv.cartesian_product_calibration_set(ideals, repeats, \
+		type='one port', solver=solver)
+	new, t_new = time_it(mv.CalibrationEnsemble(cal_set).apply_cal, dut)
+	report('calibration ensemble %s (%i cals)'%(solver, len(cal_set)), \
+		t_ref, t_new, \
+		max([npy.max(npy.abs(a.s-b.s)) for a,b in zip(ref, new.ntwk_set)]))
+
+def monte_carlo_loop(measured, ideals, dut, n_trials, mag_dev, phase_dev):
+	trials = []
+	for k in range(n_trials):
+		noisy = [ntwk._with_s(ntwk.s) for ntwk in measured + [dut]]
+		for ntwk in noisy:
+			ntwk.add_noise_polar(mag_dev, phase_dev)
+		cal = mv.Calibration(measured=noisy[:-1], ideals=ideals, \
+			type='one port')
+		trials.append(cal.apply_cal(noisy[-1]).s)
+	return npy.array(trials)
+
+def benchmark_monte_carlo(npoints=201, n_trials=500):
+	from mwavepy.calibration.monteCarlo import monte_carlo_uncertainty
+	measured, ideals = one_port_standards(npoints, 4)
+	dut = measured[-1]
+	ref, t_ref = time_it(monte_carlo_loop, measured, ideals, dut, \
+		n_trials, .01, 1)
+	# the noise differs, so the spread of the trials is compared
+	for workers in [1, 4]:
+		new, t_new = time_it(monte_carlo_uncertainty, measured, ideals, \
+			dut, n_trials=n_trials, mag_dev=.01, phase_dev=1, seed=0, \
+			workers=workers)
+		report('monte carlo %i trials, %i workers'%(n_trials, workers), \
+			t_ref, t_new, npy.max(npy.abs(npy.median(ref.std(axis=0)) - \
+			npy.median(new['std']))))
+
+def error_metrics_loop(cal, std_names):
+	'''
+	the error metrics, calculated as Calibration did before they were
+	cached
+	'''
+	from mwavepy.networkSet import func_on_networks as fon
+	residuals = cal.residual_ntwks
+	def per_standard(func):
+		return [fon([r for r in residuals if std_name in r.name], func) \
+			for std_name in std_names]
+	return [fon(per_standard(npy.mean), npy.mean, 's_mag'), \
+		fon(per_standard(npy.std), npy.mean), \
+		fon(residuals, npy.mean, 's_mag')]
+
+def benchmark_error_metrics(npoints=1000, nstandards=4, nrepeats=10, \
+	nplots=3):
+	measured, ideals = one_port_standards(npoints, nstandards)
+	repeated_measured, repeated_ideals = [], []
+	for j, (ntwk, ideal) in enumerate(zip(measured, ideals)):
+		for k in range(nrepeats):
+			repeated_measured.append(\
+				ntwk._with_s(ntwk.s + 1e-3*random_s(npoints, 1)))
+			repeated_ideals.append(\
+				ideal._with_s(ideal.s, name='std%i %i'%(j, k)))
+	std_names = ['std%i '%k for k in range(nstandards)]
+	cal = mv.Calibration(measured=repeated_measured, \
+		ideals=repeated_ideals, type='one port')
+	cal.residual_ntwks
+	# plotting the metrics a few times, like plot_errors
+	ref, t_ref = time_it(lambda: [error_metrics_loop(cal, std_names) \
+		for k in range(nplots)][-1])
+	new, t_new = time_it(lambda: [[cal.biased_error(std_names), \
+		cal.unbiased_error(std_names), cal.total_error()] \
+		for k in range(nplots)][-1])
+	report('error metrics (%i residuals)'%len(repeated_ideals), t_ref, \
+		t_new, max([npy.max(npy.abs(a.s-b.s)) for a,b in zip(ref, new)]))
+
+def benchmark_residuals(npoints=1000, nstandards=40):
+	measured, ideals = one_port_standards(npoints, nstandards)
+	cal = mv.Calibration(measured=measured, ideals=ideals, type='one port')
+	cal.run()
+	ref, t_ref = time_it(lambda: [cal.apply_cal(m) - i \
+		for m, i in zip(measured, ideals)])
+	new, t_new = time_it(lambda: cal.residual_array)
+	report('residuals (%i stds, %i pts)'%(nstandards, npoints), t_ref, \
+		t_new, max([npy.max(npy.abs(a.s-b)) for a,b in zip(ref, new)]))
+
+
+if __name__ == '__main__':
+	benchmark_connect_s()
+	benchmark_two_port_conversions()
+	benchmark_cascade_list()
+	benchmark_circuit()
+	benchmark_touchstone()
+	benchmark_write_touchstone()
+	benchmark_one_port()
+	benchmark_two_port()
+	benchmark_apply_cal()
+	benchmark_apply_one_port_cal()
+	benchmark_parametric_self_cal()
+	benchmark_calibration_ensemble()
+	benchmark_calibration_ensemble(solver='normal')
+	benchmark_monte_carlo()
+	benchmark_error_metrics()
+	benchmark_residuals()
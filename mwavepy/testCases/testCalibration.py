@@ -1,5 +1,16 @@
 import unittest
+import os
+import shutil
+import tempfile
+import numpy as npy
 import mwavepy as mv
+from mwavepy.calibration.calibrationAlgorithms import one_port, two_port,\
+	parameterized_self_calibration_fast, ParametricStandardEvaluator
+from mwavepy.calibration.parametricStandard import Parameterless, \
+	DelayShort_UnknownLength
+from mwavepy.calibration.monteCarlo import polar_noise, \
+	monte_carlo_uncertainty
+from mwavepy.networkSet import func_on_networks as fon
 
 
 
@@ -65,7 +76,402 @@ class OnePortStandardCalibration(unittest.TestCase):
 		for ntwk in std_list:
 			self.assertEqual(ntwk,  cal.apply_cal(self.embeding_network**ntwk))
 
+	def test_solvers(self):
+		random_state = npy.random.RandomState(0)
+		std_list = [self.short, self.match, self.open, self.delay_short]
+		measured = [self.embeding_network**ntwk for ntwk in std_list]
+		# noise, so the residuals and variance are not zero
+		for ntwk in measured:
+			ntwk.s = ntwk.s + 1e-3*random_state.randn(*ntwk.s.shape)
+		ref = one_port(measured, std_list, solver='lstsq')
+		for solver in ['svd','normal']:
+			out = one_port(measured, std_list, solver=solver)
+			for key in ref['error coefficients']:
+				self.assertTrue(npy.allclose(ref['error coefficients'][key],\
+					out['error coefficients'][key]))
+			self.assertTrue(npy.allclose(ref['residuals'], out['residuals']))
+			self.assertTrue(npy.allclose(ref['parameter variance'], \
+				out['parameter variance']))
+		
+		cal = mv.Calibration(measured = measured, ideals = std_list, \
+			type = 'one port', solver = 'normal')
+		cal.run()
+		self.assertTrue(npy.allclose(cal.coefs['directivity'], \
+			ref['error coefficients']['directivity']))
+
+	def test_apply_cal_kernel(self):
+		std_list = [self.short, self.match, self.open, self.delay_short]
+		measured = [self.embeding_network**ntwk for ntwk in std_list]
+		cal = mv.Calibration(measured = measured, ideals = std_list, \
+			type = 'one port')
+		dut = self.embeding_network**self.delay_short
+		self.assertEqual(cal.apply_cal(dut), cal.error_ntwk.inv**dut)
+		caled = cal.apply_cal(measured)
+		for ntwk, ideal in zip(caled, std_list):
+			self.assertEqual(ntwk, ideal)
+		s = cal.apply_cal(npy.array([ntwk.s for ntwk in measured]))
+		self.assertTrue(npy.allclose(s[2], self.open.s))
+		
+		# changing the standards invalidates the cached kernel
+		cal.ideals = [std_list[1], std_list[0], std_list[2], std_list[3]]
+		self.assertFalse(cal.has_run)
+		self.assertNotEqual(cal.apply_cal(dut), self.delay_short)
+
+	def test_apply_cal_to_dir(self):
+		std_list = [self.short, self.match, self.open, self.delay_short]
+		measured = [self.embeding_network**ntwk for ntwk in std_list]
+		cal = mv.Calibration(measured = measured, ideals = std_list, \
+			type = 'one port')
+		raw_dir = tempfile.mkdtemp()
+		for ntwk, ideal in zip(measured, std_list):
+			ntwk.write_touchstone(ideal.name.replace(' ','_'), dir=raw_dir)
+		
+		for workers, pool in [(1,'process'), (2,'process'), (2,'thread')]:
+			out_dir = os.path.join(raw_dir, 'corrected')
+			calls = []
+			stats = cal.apply_cal_to_dir(raw_dir, out_dir=out_dir, \
+				workers=workers, pool=pool, \
+				progress=lambda n, total, filename: calls.append((n,total)))
+			self.assertEqual(stats['files'], 4)
+			self.assertEqual(calls, [(1,4),(2,4),(3,4),(4,4)])
+			corrected = mv.load_all_touchstones(out_dir)
+			self.assertEqual(corrected['open'], self.open)
+			self.assertEqual(corrected['delay_short'], self.delay_short)
+			shutil.rmtree(out_dir)
+		
+		container = os.path.join(raw_dir, 'corrected.mwc')
+		cal.apply_cal_to_dir(raw_dir, container=container, pattern='*o*')
+		ntwk_set = mv.read_container(container, mmap=False)
+		self.assertEqual([ntwk.name for ntwk in ntwk_set.ntwk_set], \
+			['delay_short', 'open', 'short'])
+		self.assertEqual(ntwk_set.ntwk_set[1], self.open)
+		
+		# a file on another grid, with the same number of points
+		other = measured[0]._with_s(measured[0].s, name='other')
+		other.frequency = mv.Frequency.from_f(other.f*2)
+		other.write_touchstone('other', dir=raw_dir)
+		for kwargs in [{'out_dir':os.path.join(raw_dir, 'corrected')}, \
+			{'container':container}]:
+			self.assertRaises(ValueError, cal.apply_cal_to_dir, raw_dir, \
+				pattern='other*', **kwargs)
+		shutil.rmtree(raw_dir)
+
+	def test_parametric_self_calibration_fast(self):
+		media = mv.media.Freespace(self.short.frequency, z0=50)
+		d = 2.5e-3
+		std_list = [self.short, self.match, self.open, media.delay_short(d)]
+		measured = [self.embeding_network**ntwk for ntwk in std_list]
+		ideals_ps = [Parameterless(ntwk) for ntwk in std_list[:3]] + \
+			[DelayShort_UnknownLength(media, d=2.45e-3)]
+		out = parameterized_self_calibration_fast(measured, ideals_ps)
+		self.assertTrue(abs(out['parameter_vector_final'][0] - d) < 1e-7)
+		self.assertTrue(out['mean_residual_list'][-1] < \
+			out['mean_residual_list'][0])
+		for key in ['error coefficients', 'residuals']:
+			self.assertTrue(key in out)
+		
+		# the stds are only evaluated inside the bounds, also by the
+		# gradient at the upper bound
+		delay_short = DelayShort_UnknownLength(media, d=2.45e-3)
+		delay_short.parameter_bounds = {'d':(2e-3, 2.47e-3)}
+		lengths = []
+		function = delay_short.function
+		def recorded_function(**kwargs):
+			lengths.append(kwargs['d'])
+			return function(**kwargs)
+		delay_short.function = recorded_function
+		out = parameterized_self_calibration_fast(measured, \
+			ideals_ps[:3] + [delay_short])
+		self.assertTrue(abs(out['parameter_vector_final'][0] - 2.47e-3) \
+			< 1e-12)
+		self.assertTrue(max(lengths) <= 2.47e-3)
+		
+		# stds are only re-calculated when their parameters change
+		evaluator = ParametricStandardEvaluator(ideals_ps)
+		s_list = evaluator.s_list(npy.array([d]))
+		self.assertEqual(evaluator.slices[3], slice(0,1))
+		self.assertTrue(evaluator.s_list(npy.array([d]))[3] is s_list[3])
+		self.assertFalse(evaluator.s_list(npy.array([d/2]))[3] is s_list[3])
+		self.assertTrue(evaluator.s_list(npy.array([d/2]))[0] is s_list[0])
+
+	def test_ensemble(self):
+		random_state = npy.random.RandomState(0)
+		ideals, measured = [], []
+		for ntwk in [self.short, self.match, self.open]:
+			ideals.append(ntwk)
+			for k in range(2):
+				measure = self.embeding_network**ntwk
+				measure.s = measure.s + 1e-3*random_state.randn(*measure.s.shape)
+				measure.name = '%s %i'%(ntwk.name, k)
+				measured.append(measure)
+		cal_set = mv.cartesian_product_calibration_set(ideals, measured, \
+			type='one port')
+		self.assertEqual(len(cal_set), 8)
+		# members which cant be stacked are run by the pool
+		media = mv.media.Freespace(self.short.frequency, z0=50)
+		delay_short = media.delay_short(2.5e-3)
+		for d in [2.45e-3, 2.48e-3]:
+			cal_set.append(mv.Calibration(\
+				measured = [self.embeding_network**ntwk for ntwk in \
+					[self.short, self.match, self.open, delay_short]], \
+				ideals = [Parameterless(ntwk) for ntwk in \
+					[self.short, self.match, self.open]] + \
+					[DelayShort_UnknownLength(media, d=d)], \
+				type = 'one port parametric fast'))
+		ensemble = mv.CalibrationEnsemble(cal_set, workers=2, pool='thread')
+		dut = self.embeding_network**self.delay_short
+		caled_set = ensemble.apply_cal(dut)
+		self.assertTrue(ensemble.has_run)
+		self.assertEqual(len(caled_set.ntwk_set), 10)
+		
+		for cal, caled in zip(cal_set[:8], caled_set.ntwk_set):
+			ref = mv.Calibration(ideals=cal.ideals, measured=cal.measured,\
+				type='one port')
+			ref.run()
+			for key in ref.coefs:
+				self.assertTrue(npy.allclose(ref.coefs[key], cal.coefs[key]))
+			self.assertTrue(npy.allclose(ref.residuals, cal.residuals))
+			self.assertEqual(ref.apply_cal(dut), caled)
+		self.assertEqual(caled_set.ntwk_set[8], self.delay_short)
+		self.assertEqual(caled_set.ntwk_set[9], self.delay_short)
+
+	def test_monte_carlo(self):
+		std_list = [self.short, self.match, self.open, self.delay_short]
+		measured = [self.embeding_network**ntwk for ntwk in std_list]
+		dut = self.embeding_network**self.delay_short
+		
+		noisy = polar_noise(dut.s, .01, 1, 5, random_state=0)
+		self.assertEqual(noisy.shape, (5,) + dut.s.shape)
+		self.assertTrue(npy.all(noisy == polar_noise(dut.s, .01, 1, 5, \
+			random_state=0)))
+		self.assertTrue(npy.allclose(polar_noise(dut.s, 0, 0, 2)[1], dut.s))
+		
+		out = monte_carlo_uncertainty(measured, std_list, dut, n_trials=4)
+		self.assertEqual(out['mean'], self.delay_short)
+		self.assertTrue(npy.allclose(out['lower'], out['upper']))
+		
+		out = monte_carlo_uncertainty(measured, std_list, dut, \
+			n_trials=10, mag_dev=.01, phase_dev=1, seed=1)
+		self.assertEqual(out['trials'].shape, (10,) + dut.s.shape)
+		self.assertTrue(npy.all(out['lower'] <= out['upper']))
+		self.assertTrue(npy.all(out['std'] > 0))
+		# the results depend only on the seed
+		out_pool = monte_carlo_uncertainty(measured, std_list, dut, \
+			n_trials=10, mag_dev=.01, phase_dev=1, seed=1, chunk_size=3, \
+			workers=2, pool='thread')
+		self.assertTrue(npy.allclose(out['trials'], out_pool['trials']))
+		# each trial is a calibration of the noisy standards
+		random_state = npy.random.RandomState(1)
+		noisy = polar_noise(npy.array([ntwk.s for ntwk in measured]), \
+			.01, 1, 10, random_state=random_state)
+		noisy_measured = [ntwk._with_s(s) for ntwk, s in \
+			zip(measured, noisy[3])]
+		cal = mv.Calibration(measured = noisy_measured, ideals = std_list,\
+			type = 'one port')
+		noisy_dut = polar_noise(dut.s, .01, 1, 10, \
+			random_state=random_state)
+		self.assertTrue(npy.allclose(cal.apply_cal(noisy_dut[3]), \
+			out['trials'][3]))
+		# phase bounds dont wrap around +-180 degrees
+		dut = self.embeding_network**self.short
+		out = monte_carlo_uncertainty(measured, std_list, dut, \
+			n_trials=50, mag_dev=.001, phase_dev=.5, seed=2, \
+			attribute='s_deg')
+		self.assertTrue(npy.all(out['upper'] - out['lower'] < 180))
+		mean_deg = npy.angle(out['mean'].s, deg=True)
+		self.assertTrue(npy.all(out['lower'] <= mean_deg))
+		self.assertTrue(npy.all(mean_deg <= out['upper']))
+
+	def test_error_metrics(self):
+		random_state = npy.random.RandomState(0)
+		ideals, measured = [], []
+		for ntwk in [self.short, self.match, self.open]:
+			for k in range(3):
+				measure = self.embeding_network**ntwk
+				measure.s = measure.s + 1e-3*random_state.randn(*measure.s.shape)
+				measured.append(measure)
+				ideals.append(ntwk._with_s(ntwk.s, name='%s %i'%(ntwk.name,k)))
+		cal = mv.Calibration(measured = measured, ideals = ideals, \
+			type = 'one port')
+		std_names = ['short', 'match', 'open']
+		residuals = cal.residual_ntwks
+		def per_standard(func, attribute='s'):
+			return [fon([r for r in residuals if std_name in r.name], \
+				func, attribute) for std_name in std_names]
+		
+		self.assertTrue(npy.allclose(cal.biased_error(std_names).s, \
+			fon(per_standard(npy.mean), npy.mean, 's_mag').s))
+		self.assertTrue(npy.allclose(cal.unbiased_error(std_names).s, \
+			fon(per_standard(npy.std), npy.mean).s))
+		self.assertTrue(npy.allclose(cal.total_error().s, \
+			fon(residuals, npy.mean, 's_mag').s))
+		for a, b in zip(cal.uncertainty_per_standard(std_names, 's_deg'), \
+			per_standard(npy.std, 's_deg')):
+			self.assertTrue(npy.allclose(a.s, b.s))
+			self.assertEqual(a.name, b.name)
+		index = cal.residual_index(std_names)
+		self.assertEqual(index['open'][0], [6,7,8])
+		self.assertEqual(index['open'][1].shape, (3,) + self.open.s.shape)
+		
+		self.assertTrue(npy.allclose(cal.total_error(['open']).s, \
+			fon(residuals[6:], npy.mean, 's_mag').s))
+		# by default, the standards are in the order of the ideals
+		self.assertEqual([ntwk.name for ntwk in \
+			cal.uncertainty_per_standard()], [ntwk.name for ntwk in ideals])
+		
+		# metrics are calculated once per run, and copies are returned
+		biased_error = cal.biased_error(std_names)
+		biased_error.s[:] = 0
+		biased_error.name = 'changed'
+		self.assertEqual(cal.biased_error(std_names).name, 'biased error')
+		self.assertTrue(npy.all(cal.biased_error(std_names).s != 0))
+		self.assertTrue(cal._error_metrics[('biased error', \
+			tuple(std_names))] is not biased_error)
+		cal.run()
+		self.assertEqual(cal._error_metrics, {})
+
+	def test_residuals(self):
+		random_state = npy.random.RandomState(0)
+		std_list = [self.short, self.match, self.open, self.delay_short]
+		measured = [self.embeding_network**ntwk for ntwk in std_list]
+		for ntwk in measured:
+			ntwk.s = ntwk.s + 1e-3*random_state.randn(*ntwk.s.shape)
+		cal = mv.Calibration(measured = measured, ideals = std_list, \
+			type = 'one port')
+		self.assertEqual(cal.residual_array.shape, (4,) + self.open.s.shape)
+		for k in range(4):
+			residual = cal.apply_cal(measured[k]) - std_list[k]
+			self.assertTrue(npy.allclose(cal.residual_array[k], residual.s))
+			self.assertEqual(cal.residual_ntwks[k].name, std_list[k].name)
+			self.assertTrue(npy.may_share_memory(cal.residual_ntwks[k].s, \
+				cal.residual_array))
+		residual_array = cal.residual_array
+		self.assertTrue(cal.residual_array is residual_array)
+		cal.run()
+		self.assertFalse(cal.residual_array is residual_array)
+
+	def test_touchstone_measured_media_ideals(self):
+		# the frequencies printed in the file differ from a linspace
+		# by rounding
+		ntwk = mv.Network('ntwk1.s2p')
+		freq = ntwk.frequency
+		media = mv.media.Freespace(mv.Frequency(freq.f_scaled[0], \
+			freq.f_scaled[-1], freq.npoints, freq.unit))
+		std_list = [media.short(), media.match(), media.open(), \
+			media.delay_short(1e-3)]
+		cal = mv.Calibration(measured = [ntwk**std for std in std_list], \
+			ideals = std_list, type = 'one port')
+		cal.run()
+		self.assertEqual(cal.apply_cal(ntwk**std_list[3]), std_list[3])
+
+	def test_frequency_mismatch(self):
+		std_list = [self.short, self.match, self.open]
+		measured = [self.embeding_network**ntwk for ntwk in std_list]
+		ideals = list(std_list)
+		ideals[2] = self.open[1:]
+		cal = mv.Calibration(\
+			ideals = ideals,\
+			measured = measured,\
+			type = 'one port',\
+			frequency = self.short.frequency,\
+			)
+		self.assertRaises(IndexError, cal.run)
+
+
+class TwoPortCalibration(unittest.TestCase):
+	'''
+	Two-port calibration test.
+	
+	ficticous measurements are made by embedding ideal thru, reflect,
+	match and line standards between two error networks. 
+	'''
+	def setUp(self):
+		self.X = mv.Network('embedingNetwork.s2p')
+		media = mv.media.Freespace(self.X.frequency)
+		self.media = media
+		self.Y = media.line(1e-2)**self.X
+		def reflect(gamma):
+			ntwk = media.match(nports=2)
+			ntwk.s = gamma*npy.ones(len(ntwk.s))[:,None,None]*npy.eye(2)
+			return ntwk
+		self.ideals = [media.thru(), reflect(-1), reflect(1), \
+			media.match(nports=2), media.line(1e-3)]
+		self.measured = [self.X**ideal**self.Y for ideal in self.ideals]
+	
+	def test_solvers(self):
+		random_state = npy.random.RandomState(0)
+		measured = self.measured
+		for ntwk in measured:
+			ntwk.s = ntwk.s + 1e-3*random_state.randn(*ntwk.s.shape)
+		ref = two_port(measured, self.ideals, solver='lstsq')
+		for solver in ['svd','normal']:
+			out = two_port(measured, self.ideals, solver=solver)
+			self.assertTrue(npy.allclose(ref['error vector'], \
+				out['error vector']))
+			self.assertTrue(npy.allclose(ref['residuals'], out['residuals']))
 	
-suite = unittest.TestLoader().loadTestsFromTestCase(OnePortStandardCalibration)
-unittest.TextTestRunner(verbosity=2).run(suite)
+	def test_apply_cal(self):
+		cal = mv.Calibration(measured = self.measured, ideals = self.ideals)
+		dut = self.media.line(3e-3)**self.media.shunt_capacitor(1e-13)
+		self.assertEqual(cal.apply_cal(self.X**dut**self.Y), dut)
+	
+	def test_apply_cal_batch(self):
+		cal = mv.Calibration(measured = self.measured, ideals = self.ideals,\
+			type = 'two port')
+		caled = cal.apply_cal(self.measured)
+		for ntwk, ideal in zip(caled, self.ideals):
+			self.assertEqual(ntwk, ideal)
+		caled_set = cal.apply_cal(mv.NetworkSet(self.measured))
+		self.assertEqual(caled_set.ntwk_set[1], self.ideals[1])
+		s = cal.apply_cal(npy.array([ntwk.s for ntwk in self.measured]))
+		self.assertTrue(npy.allclose(s[4], self.ideals[4].s))
+		self.assertTrue(npy.allclose(cal.apply_cal(self.measured[4].s), s[4]))
+	
+	def test_monte_carlo(self):
+		dut = self.media.line(3e-3)
+		out = monte_carlo_uncertainty(self.measured, self.ideals, \
+			self.X**dut**self.Y, n_trials=3, perturb_dut=False)
+		self.assertEqual(out['mean'], dut)
+		out = monte_carlo_uncertainty(self.measured, self.ideals, \
+			self.X**dut**self.Y, n_trials=6, mag_dev=1e-3, phase_dev=.1,\
+			seed=0, attribute='s_deg')
+		self.assertTrue(npy.all(out['lower'] <= out['upper']))
+		out_pool = monte_carlo_uncertainty(self.measured, self.ideals, \
+			self.X**dut**self.Y, n_trials=6, mag_dev=1e-3, phase_dev=.1,\
+			seed=0, attribute='s_deg', workers=2)
+		self.assertTrue(npy.allclose(out['trials'], out_pool['trials']))
+		self.assertTrue(npy.allclose(out['lower'], out_pool['lower']))
+	
+	def test_ensemble(self):
+		random_state = npy.random.RandomState(0)
+		for ntwk in self.measured:
+			ntwk.s = ntwk.s + 1e-3*random_state.randn(*ntwk.s.shape)
+		cal_set = mv.binomial_coefficient_calibration_set(self.ideals, \
+			self.measured, 4, type='two port')
+		# members which have run are not solved again
+		cal_set[0].run()
+		output = cal_set[0].output_from_cal
+		ensemble = mv.CalibrationEnsemble(cal_set, stack_size=2)
+		dut = self.media.line(3e-3)
+		caled_set = ensemble.apply_cal(self.X**dut**self.Y)
+		self.assertTrue(cal_set[0].output_from_cal is output)
+		namespace = {}
+		exec 'from mwavepy.calibration.calibrationFunctions import *' \
+			in namespace
+		self.assertTrue('CalibrationEnsemble' in namespace)
+		for name in ['NetworkSet', 'npy', 'multiprocessing']:
+			self.assertFalse(name in namespace)
+		self.assertEqual(len(caled_set.ntwk_set), 5)
+		for cal, caled in zip(cal_set, caled_set.ntwk_set):
+			ref = mv.Calibration(ideals=cal.ideals, measured=cal.measured,\
+				type='two port')
+			ref.run()
+			self.assertTrue(npy.allclose(ref.output_from_cal['error vector'],\
+				cal.output_from_cal['error vector']))
+			self.assertEqual(ref.apply_cal(self.X**dut**self.Y), caled)
+
+
+for test_case in [OnePortStandardCalibration, TwoPortCalibration]:
+	suite = unittest.TestLoader().loadTestsFromTestCase(test_case)
+	unittest.TextTestRunner(verbosity=2).run(suite)
 
@@ -0,0 +1,67 @@
+import unittest
+import numpy as npy
+import mwavepy as mv
+
+
+
+
+class CircuitTestCase(unittest.TestCase):
+	'''
+	compares Circuit against the equivalent connect/innerconnect calls
+	'''
+	def setUp(self):
+		self.ntwk1 =mv.Network('./ntwk1.s2p')
+		self.ntwk2 =mv.Network('./ntwk2.s2p')
+		self.ntwk3 =mv.Network('./ntwk3.s2p')
+		self.media = mv.media.Freespace(self.ntwk1.frequency)
+
+	def test_cascade(self):
+		cir = mv.Circuit([self.ntwk1, self.ntwk2], [((0,1),(1,0))])
+		self.assertEqual(cir.network, self.ntwk3)
+		self.assertEqual(cir.external_ports, [(0,0),(1,1)])
+
+	def test_chain(self):
+		chain = [self.ntwk1, self.ntwk2, self.ntwk1]
+		# connection order does not change the result
+		for connections in [[((0,1),(1,0)), ((1,1),(2,0))], \
+			[((1,1),(2,0)), ((0,1),(1,0))]]:
+			s = mv.Circuit(chain, connections).s
+			self.assertTrue(npy.all(\
+				npy.abs(s - mv.cascade_list(chain).s) < 1e-9))
+
+	def test_unconnected(self):
+		cir = mv.Circuit([self.ntwk1, self.ntwk2], [])
+		self.assertTrue(npy.all(cir.s[:,:2,:2] == self.ntwk1.s))
+		self.assertTrue(npy.all(cir.s[:,2:,2:] == self.ntwk2.s))
+		self.assertTrue(npy.all(cir.s[:,:2,2:] == 0))
+
+	def test_impedance_mismatch(self):
+		ntwk2 = mv.Network('./ntwk2.s2p')
+		ntwk2.z0 = 25
+		cir = mv.Circuit([self.ntwk1, ntwk2], [((0,1),(1,0))])
+		self.assertEqual(cir.network, self.ntwk1**ntwk2)
+		cir = mv.Circuit([ntwk2, self.ntwk1], [((1,0),(0,1))])
+		self.assertEqual(cir.network, ntwk2**self.ntwk1)
+
+	def test_shunt(self):
+		tee = self.media.tee()
+		load = self.media.load(.5)
+		self.assertEqual(self.media.shunt(load), mv.connect(tee,1,load,0))
+
+	def test_innerconnect(self):
+		tee = self.media.tee()
+		four_port = mv.connect(mv.connect(tee, 2, self.ntwk1, 0), 2, tee, 0)
+		cir = mv.Circuit([four_port], [((0,1),(0,3))])
+		self.assertEqual(cir.network, mv.innerconnect(four_port, 1, 3))
+
+	def test_bad_connections(self):
+		self.assertRaises(ValueError, mv.Circuit, \
+			[self.ntwk1, self.ntwk2], [((0,1),(1,0)), ((0,1),(1,1))])
+		self.assertRaises(ValueError, mv.Circuit, \
+			[self.ntwk1], [((0,0),(0,1))])
+		self.assertRaises(IndexError, mv.Circuit, \
+			[self.ntwk1, self.ntwk2], [((0,2),(1,0))])
+
+
+suite = unittest.TestLoader().loadTestsFromTestCase(CircuitTestCase)
+unittest.TextTestRunner(verbosity=2).run(suite)
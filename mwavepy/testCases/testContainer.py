@@ -0,0 +1,85 @@
+import unittest
+import os
+import numpy as npy
+import mwavepy as mv
+
+
+
+
+class ContainerTestCase(unittest.TestCase):
+	'''
+	round trips of networks through container files, compared to
+	touchstone files
+	'''
+	def setUp(self):
+		self.ntwk1 =mv.Network('./ntwk1.s2p')
+		self.ntwk2 =mv.Network('./ntwk2.s2p')
+		self.ntwk3 =mv.Network('./ntwk3.s2p')
+		self.filename = './testContainer.mwc'
+	
+	def tearDown(self):
+		if os.path.isfile(self.filename):
+			os.remove(self.filename)
+	
+	def test_network(self):
+		mv.write_container(self.ntwk1, self.filename)
+		ntwk = mv.read_container(self.filename)
+		self.assertTrue(isinstance(ntwk, mv.Network))
+		self.assertTrue(npy.all(ntwk.s == self.ntwk1.s))
+		self.assertTrue(npy.all(ntwk.z0 == self.ntwk1.z0))
+		self.assertEqual(ntwk.frequency, self.ntwk1.frequency)
+		self.assertEqual(ntwk.frequency.unit, self.ntwk1.frequency.unit)
+		self.assertEqual(ntwk.name, 'ntwk1')
+	
+	def test_touchstone(self):
+		for touchstone_file in [f for f in os.listdir('.') \
+			if f.endswith('.s1p') or f.endswith('.s2p')]:
+			ntwk = mv.Network(touchstone_file)
+			mv.write_container(ntwk, self.filename)
+			result = mv.read_container(self.filename, mmap=False)
+			self.assertTrue(npy.all(result.s == ntwk.s))
+			self.assertTrue(npy.all(result.z0 == ntwk.z0))
+			self.assertTrue(npy.all(result.f == ntwk.f))
+			self.assertEqual(result.name, ntwk.name)
+	
+	def test_network_set(self):
+		ntwk_set = mv.NetworkSet([self.ntwk1, self.ntwk2, self.ntwk3])
+		mv.write_container(ntwk_set, self.filename)
+		
+		result = mv.read_container(self.filename, mmap=False)
+		self.assertTrue(isinstance(result, mv.NetworkSet))
+		for a,b in zip(result.ntwk_set, ntwk_set.ntwk_set):
+			self.assertTrue(npy.all(a.s == b.s))
+			self.assertEqual(a.name, b.name)
+		
+		# subsets of networks and frequency
+		ntwk = mv.read_container(self.filename, index=2, band=slice(10,20))
+		self.assertTrue(npy.all(ntwk.s == self.ntwk3.s[10:20]))
+		self.assertTrue(npy.all(ntwk.f == self.ntwk3.f[10:20]))
+		result = mv.read_container(self.filename, index=[2,0])
+		self.assertEqual(result.ntwk_set[0], self.ntwk3)
+		self.assertEqual(result.ntwk_set[1], self.ntwk1)
+		
+		header, f, records = mv.load_container_arrays(self.filename)
+		self.assertEqual(header['count'], 3)
+		self.assertTrue(npy.all(records['s'][1] == self.ntwk2.s))
+	
+	def test_mismatched_network(self):
+		writer = mv.ContainerWriter(self.filename, self.ntwk1.frequency, 1)
+		self.assertRaises(ValueError, writer.append, self.ntwk1)
+		writer.close()
+		self.assertEqual(mv.container.read_header(self.filename)['count'], 0)
+		# same number of points, on another grid
+		writer = mv.ContainerWriter(self.filename, \
+			mv.Frequency(1,10,11,'ghz'), 2)
+		other = mv.Network(name='other')
+		other.frequency = mv.Frequency(20,30,11,'ghz')
+		other.s = npy.zeros((11,2,2))
+		self.assertRaises(ValueError, writer.append, other)
+		writer.close()
+		self.assertEqual(mv.container.read_header(self.filename)['count'], 0)
+		self.assertRaises(ValueError, mv.read_container, './ntwk1.s2p')
+
+
+suite = unittest.TestLoader().loadTestsFromTestCase(ContainerTestCase)
+unittest.TextTestRunner(verbosity=2).run(suite)
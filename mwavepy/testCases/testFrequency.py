@@ -0,0 +1,76 @@
+import unittest
+import numpy as npy
+import mwavepy as mv
+
+
+
+
+class FrequencyTestCase(unittest.TestCase):
+	'''
+	tests the stored frequency vector, its derived vectors, and
+	comparison of Frequency objects
+	'''
+	def test_lin(self):
+		freq = mv.Frequency(75,110,101,'ghz')
+		self.assertTrue(npy.all(freq.f == npy.linspace(75e9,110e9,101)))
+		self.assertTrue(npy.allclose(freq.f_scaled, npy.linspace(75,110,101)))
+		self.assertEqual((freq.start, freq.stop, freq.npoints), \
+			(75e9, 110e9, 101))
+		# derived vectors are computed once
+		self.assertTrue(freq.w is freq.w)
+		self.assertTrue(freq.f_scaled is freq.f_scaled)
+		freq.unit = 'mhz'
+		self.assertEqual(freq.f_scaled[0], 75e3)
+
+	def test_read_only(self):
+		freq = mv.Frequency(75,110,101,'ghz')
+		self.assertRaises(ValueError, freq.f.__setitem__, 0, 1.)
+		self.assertRaises(ValueError, freq.w.__setitem__, 0, 1.)
+		freq.npoints = 11
+		self.assertEqual(len(freq.w), 11)
+		self.assertTrue(npy.all(freq.f == npy.linspace(75e9,110e9,11)))
+
+	def test_log(self):
+		freq = mv.Frequency(1,100,3,'ghz', sweep_type='log')
+		self.assertTrue(npy.allclose(freq.f, [1e9, 10e9, 100e9]))
+		freq.stop = 10e9
+		self.assertEqual(freq.sweep_type, 'log')
+		self.assertTrue(npy.allclose(freq.f, [1e9, npy.sqrt(10)*1e9, 10e9]))
+
+	def test_from_f(self):
+		f = [1, 2, 5, 10]
+		freq = mv.Frequency.from_f(f, unit='ghz')
+		self.assertTrue(npy.all(freq.f_scaled == f))
+		ntwk = mv.Network()
+		ntwk.f = npy.array(f)*1e9
+		ntwk.s = npy.zeros(len(f))
+		self.assertTrue(npy.all(ntwk.f == freq.f))
+
+	def test_segments(self):
+		freq = mv.Frequency.from_segments([(1,10,10), (10,100,10)], 'ghz')
+		self.assertEqual(freq.npoints, 19)
+		self.assertEqual(freq.sweep_type, 'segmented')
+		self.assertTrue(npy.all(freq.f_scaled[:10] == npy.linspace(1,10,10)))
+		self.assertTrue(npy.all(freq.f_scaled[9:] == npy.linspace(10,100,10)))
+
+	def test_eq(self):
+		freq = mv.Frequency(75,110,101,'ghz')
+		self.assertEqual(freq, mv.Frequency(75e3,110e3,101,'mhz'))
+		self.assertNotEqual(freq, mv.Frequency(75,110,201,'ghz'))
+		self.assertNotEqual(freq, mv.Frequency(75,111,101,'ghz'))
+		self.assertEqual(freq, mv.Frequency.from_f(freq.f))
+		self.assertEqual(hash(freq), hash(mv.Frequency.from_f(freq.f)))
+		self.assertEqual(len(set([freq, mv.Frequency(75,110,101,'ghz')])), 1)
+
+	def test_eq_tolerance(self):
+		freq = mv.Frequency(75,110,101,'ghz')
+		f = freq.f.copy()
+		f[1:-1] += 1e-6
+		self.assertEqual(freq, mv.Frequency.from_f(f))
+		self.assertEqual(hash(freq), hash(mv.Frequency.from_f(f)))
+		f[50] += 1e3
+		self.assertNotEqual(freq, mv.Frequency.from_f(f))
+
+
+suite = unittest.TestLoader().loadTestsFromTestCase(FrequencyTestCase)
+unittest.TextTestRunner(verbosity=2).run(suite)
@@ -1,4 +1,9 @@
 import unittest
+import os
+import re
+import shutil
+import tempfile
+import numpy as npy
 import mwavepy as mv
 
 
@@ -25,19 +30,252 @@ class NetworkTestCase(unittest.TestCase):
 	def test_open_saved_touchstone(self):
 		self.ntwk1.write_touchstone('./ntwk1Saved')
 		ntwk1Saved = mv.Network('./ntwk1Saved.s2p')
+		os.remove('./ntwk1Saved.s2p')
 		self.assertEqual(self.ntwk1, ntwk1Saved)
 		
+	def test_write_touchstone(self):
+		three_port = mv.connect(self.ntwk1, 1, \
+			mv.media.Freespace(self.ntwk1.frequency).tee(), 0)
+		for ntwk in [self.ntwk1, three_port]:
+			for form in ['ri','ma','db']:
+				for version in [1,2]:
+					ntwk.write_touchstone('./ntwkSaved', form=form, \
+						version=version)
+					filename = './ntwkSaved.s%ip'%ntwk.number_of_ports
+					saved = mv.Network(filename)
+					os.remove(filename)
+					self.assertTrue(npy.max(npy.abs(saved.s - ntwk.s)) < 1e-9)
+					self.assertTrue(npy.all(saved.f == ntwk.f))
+		
+	def test_write_touchstone_z0(self):
+		self.ntwk1.write_touchstone('./ntwk1Saved')
+		self.assertFalse('Port Impedance' in open('./ntwk1Saved.s2p').read())
+		
+		ntwk = self.ntwk1 ** self.ntwk2
+		ntwk.z0 = npy.array([50,75])
+		ntwk.write_touchstone('./ntwk1Saved', version=2)
+		text = open('./ntwk1Saved.s2p').read()
+		self.assertTrue('[Reference] 50 75' in text)
+		self.assertTrue('Port Impedance' in text)
+		saved = mv.Network('./ntwk1Saved.s2p')
+		self.assertTrue(npy.all(saved.z0 == ntwk.z0))
+		
+		ntwk.write_touchstone('./ntwk1Saved', version=2, z0_comments=False)
+		self.assertFalse('Port Impedance' in open('./ntwk1Saved.s2p').read())
+		os.remove('./ntwk1Saved.s2p')
+	
+	def test_touchstone_cache(self):
+		cache_dir = tempfile.mkdtemp()
+		cache = mv.touchstone.TouchstoneCache(cache_dir)
+		filename = os.path.join(cache_dir, 'ntwk.s2p')
+		shutil.copy('./ntwk1.s2p', filename)
+		
+		ntwk = mv.Network()
+		ntwk.read_touchstone(filename, cache=cache)
+		self.assertEqual((cache.hits, cache.misses), (0,1))
+		ntwk.read_touchstone(filename, cache=cache)
+		self.assertEqual((cache.hits, cache.misses), (1,1))
+		self.assertTrue(npy.all(ntwk.s == self.ntwk1.s))
+		self.assertTrue(npy.all(ntwk.f == self.ntwk1.f))
+		
+		# touched, but not changed
+		os.utime(filename, (0, 0))
+		ntwk.read_touchstone(filename, cache=cache)
+		self.assertEqual((cache.hits, cache.misses), (2,1))
+		# the new mtime is stored, so the file isnt hashed again
+		sha1_of_file = mv.touchstone.sha1_of_file
+		mv.touchstone.sha1_of_file = None
+		try:
+			ntwk.read_touchstone(filename, cache=cache)
+		finally:
+			mv.touchstone.sha1_of_file = sha1_of_file
+		self.assertEqual((cache.hits, cache.misses), (3,1))
+		self.assertTrue(npy.all(ntwk.s == self.ntwk1.s))
+		# changed
+		shutil.copy('./ntwk2.s2p', filename)
+		ntwk.read_touchstone(filename, cache=cache)
+		self.assertEqual((cache.hits, cache.misses), (3,2))
+		self.assertEqual(ntwk, self.ntwk2)
+		
+		# default cache, and eviction
+		mv.touchstone.enable_cache(cache_dir, max_size=0)
+		try:
+			self.assertEqual(mv.Network('./ntwk3.s2p'), self.ntwk3)
+			self.assertEqual(mv.touchstone.default_cache.size, 0)
+		finally:
+			mv.touchstone.disable_cache()
+		shutil.rmtree(cache_dir)
+	
+	def test_load_all_touchstones(self):
+		ntwk_dict = mv.load_all_touchstones('.')
+		self.assertEqual(len(ntwk_dict), 10)
+		self.assertEqual(ntwk_dict['ntwk1'], self.ntwk1)
+		for pool in ['process','thread']:
+			parallel = mv.load_all_touchstones('.', workers=3, pool=pool)
+			self.assertEqual(sorted(parallel.keys()), sorted(ntwk_dict.keys()))
+			for name in ntwk_dict:
+				self.assertEqual(parallel[name], ntwk_dict[name])
+		
+		self.assertEqual(sorted(mv.load_all_touchstones('.', \
+			pattern='ntwk*.s2p').keys()), ['ntwk1','ntwk2','ntwk3'])
+		self.assertEqual(sorted(mv.load_all_touchstones('.', \
+			pattern=re.compile(r'^(open|short)')).keys()), ['open','short'])
+		ntwk_set = mv.load_all_touchstones('.', pattern='ntwk*', as_set=True)
+		self.assertEqual(ntwk_set.ntwk_set[2], self.ntwk3)
+		
+	def test_load_all_touchstones_cache(self):
+		cache, calls = {}, []
+		progress = lambda n, total, filename: calls.append((n,total))
+		first = mv.load_all_touchstones('.', cache=cache, progress=progress)
+		self.assertEqual(len(cache), 10)
+		self.assertEqual(calls[-1], (10,10))
+		second = mv.load_all_touchstones('.', cache=cache, f_unit='mhz')
+		for name in first:
+			# not read again, but the frequency is not shared
+			self.assertTrue(first[name].s is second[name].s)
+			self.assertFalse(first[name] is second[name])
+			self.assertEqual(second[name].frequency.unit, 'MHz')
+			self.assertNotEqual(first[name].frequency.unit, 'MHz')
+		for key, ntwk in cache.values():
+			self.assertNotEqual(ntwk.frequency.unit, 'MHz')
+	
+	def test_smn(self):
+		self.assertTrue(npy.all(self.ntwk1.s21.s[:,0,0] == self.ntwk1.s[:,1,0]))
+		self.assertTrue(npy.all(self.ntwk1.s12.s[:,0,0] == self.ntwk1.s[:,0,1]))
+		self.assertTrue(npy.all(self.ntwk1.s11.s[:,0,0] == self.ntwk1.s[:,0,0]))
+		self.assertRaises(AttributeError, getattr, self.ntwk1, 's33')
+		self.assertFalse('s21' in mv.Network.__dict__)
+	
+	def test_z0(self):
+		ntwk = mv.Network()
+		ntwk.s = self.ntwk1.s
+		self.assertTrue(npy.all(ntwk.z0 == 50))
+		self.assertEqual(ntwk.z0.shape, (len(self.ntwk1.f), 2))
+		# constant z0 is not stored for every frequency 
+		self.assertEqual(ntwk.z0.strides, (0,0))
+		
+		ntwk.z0 = [50, 75]
+		self.assertTrue(npy.all(ntwk.z0[:,1] == 75))
+		ntwk.z0 = npy.arange(len(self.ntwk1.f))
+		self.assertTrue(npy.all(ntwk.z0[:,1] == npy.arange(len(self.ntwk1.f))))
+		ntwk.z0 = [1,2,3]
+		self.assertRaises(IndexError, getattr, ntwk, 'z0')
+		
+		cascaded = self.ntwk1 ** self.ntwk2
+		self.assertEqual(cascaded.z0.strides, (0,0))
+
+	def test_from_arrays(self):
+		s = self.ntwk1.s.copy()
+		total = self.ntwk1 + self.ntwk2
+		# inputs are unchanged, and results dont share their s-matrix
+		self.assertTrue(npy.all(self.ntwk1.s == s))
+		self.assertTrue(npy.all(total.s == s + self.ntwk2.s))
+		self.assertFalse(npy.may_share_memory(total.s, self.ntwk1.s))
+		# the frequency is copied, so changing its unit is local
+		total.frequency.unit = 'mhz'
+		self.assertNotEqual(self.ntwk1.frequency.unit, 'mhz')
+
+		ntwk = self.ntwk1[2:5]
+		self.assertEqual(ntwk.s.shape, (3,2,2))
+		self.assertTrue(npy.all(ntwk.f == self.ntwk1.f[2:5]))
+		self.assertTrue(npy.may_share_memory(ntwk.s, self.ntwk1.s))
+		self.assertEqual(self.ntwk1[3].s.shape, (1,2,2))
+		self.assertEqual(len(self.ntwk1.f), len(s))
+
+		ntwk = mv.Network()
+		ntwk.frequency = self.ntwk1.frequency
+		ntwk.s = self.ntwk1.s
+		ntwk.z0 = npy.arange(len(s))+1
+		self.assertTrue(npy.all(ntwk[2:5].z0[:,0] == [3,4,5]))
+
 	def test_cascade(self):
 		self.assertEqual(self.ntwk1**self.ntwk2, self.ntwk3)
 		
+	def test_cascade_list(self):
+		self.assertEqual(mv.cascade_list([self.ntwk1,self.ntwk2]), \
+			self.ntwk3)
+		chain = [self.ntwk1, self.ntwk2, self.ntwk1.inv, self.ntwk2]
+		self.assertEqual(mv.cascade_list(chain), \
+			self.ntwk1**self.ntwk2**self.ntwk1.inv**self.ntwk2)
+		# port impedance mis-match between links
+		ntwk2 = mv.Network('./ntwk2.s2p')
+		ntwk2.z0 = 25
+		self.assertEqual(mv.cascade_list([self.ntwk1,ntwk2,self.ntwk1]),\
+			self.ntwk1**ntwk2**self.ntwk1)
+		# the frequency of the result is not shared with the first link
+		result = mv.cascade_list([self.ntwk1, self.ntwk2])
+		result.frequency.unit = 'mhz'
+		self.assertNotEqual(self.ntwk1.frequency.unit, 'MHz')
+		# the links must have the same frequency
+		ntwk2.frequency = mv.Frequency.from_f(ntwk2.f*2)
+		self.assertRaises(IndexError, mv.cascade_list, \
+			[self.ntwk1, ntwk2])
+
 	def test_connect(self):
 		self.assertEqual(mv.connect(self.ntwk1,1,self.ntwk2,0), \
 			self.ntwk3)
 
+	def test_innerconnect(self):
+		# cascading is the same as connecting the inner ports of the 
+		# composite 4-port made from both networks
+		composite = npy.zeros((len(self.ntwk1.s),4,4), dtype=complex)
+		composite[:,:2,:2] = self.ntwk1.s
+		composite[:,2:,2:] = self.ntwk2.s
+		s = mv.innerconnect_s(composite,1,2)
+		self.assertTrue(npy.all(npy.abs(s - self.ntwk3.s) < 1e-6))
+		# a single 2-d s-matrix works as well
+		self.assertTrue(npy.all(npy.abs(\
+			mv.innerconnect_s(composite[0],1,2) - self.ntwk3.s[0]) < 1e-6))
+
 	def test_de_embed_by_inv(self):
 		self.assertEqual(self.ntwk1.inv**self.ntwk3,self.ntwk2)
 		self.assertEqual(self.ntwk3**self.ntwk2.inv,self.ntwk1)
 
+	def test_s2t_t2s_batched(self):
+		# leading batch dimensions of any shape are supported
+		s = self.ntwk1.s.reshape((1,-1,2,2)).repeat(3,0)
+		self.assertTrue(npy.all(npy.abs(mv.t2s(mv.s2t(s)) - s) < 1e-9))
+		self.assertEqual(mv.flip(mv.flip(s)).shape, s.shape)
+		self.assertTrue(npy.all(mv.flip(s)[...,0,0] == s[...,1,1]))
+
+	def test_s2t_singular(self):
+		s = self.ntwk1.s.copy()
+		s[0,1,0] = 0
+		self.assertRaises(ValueError, mv.s2t, s, singular='raise')
+		t = mv.s2t(s, singular='ignore')
+		self.assertTrue(npy.isnan(t[0]).all())
+		self.assertFalse(npy.isnan(t[1:]).any())
+
+	def test_iter_touchstone(self):
+		ntwks = list(mv.iter_touchstone('./ntwk1.s2p', npoints=30))
+		self.assertEqual(ntwks[0].frequency.npoints, 30)
+		self.assertTrue(npy.all(\
+			npy.vstack([ntwk.s for ntwk in ntwks]) == self.ntwk1.s))
+		self.assertTrue(npy.all(\
+			npy.hstack([ntwk.f for ntwk in ntwks]) == self.ntwk1.f))
+	
+	def test_touchstone_chunks(self):
+		touchstoneFile = mv.touchstone.touchstone('./ntwk1.s2p', \
+			header_only=True)
+		touchstoneFile.chunk_lines = 7
+		touchstoneFile.load_file('./ntwk1.s2p')
+		f, s = touchstoneFile.get_sparameter_arrays()
+		self.assertTrue(npy.all(s == self.ntwk1.s))
+
+	def test_touchstone_fallback(self):
+		# comments in the data section are parsed by the tokenizer
+		lines = open('./ntwk1.s2p').readlines()
+		lines[20] = lines[20].strip() + ' ! a comment\n'
+		open('./ntwk1Commented.s2p','w').writelines(lines)
+		touchstoneFile = mv.touchstone.touchstone('./ntwk1Commented.s2p')
+		os.remove('./ntwk1Commented.s2p')
+		f, s = touchstoneFile.get_sparameter_arrays()
+		self.assertTrue(npy.all(s == self.ntwk1.s))
+		
+		touchstoneFile.fast_parse = False
+		self.assertTrue(npy.all(touchstoneFile.parse_values(lines[5:]) ==\
+			touchstoneFile.sparameters.flatten()))
+
 	def test_plot_one_port_db(self):
 		self.ntwk1.plot_s_db(0,0)
 	def test_plot_one_port_deg(self):
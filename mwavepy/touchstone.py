@@ -34,11 +34,41 @@ touchstone Class
 	
 	touchstone
 
+Parsed File Cache
+------------------
+	
+.. autosummary::
+	:toctree: generated/
+	
+	TouchstoneCache
+	enable_cache
+	disable_cache
+
 contains touchstone class
 '''
 
+import os
+import ast
+import hashlib
+import tempfile
+import itertools
+
 import numpy
 
+## characters which may appear in the data section of a regular file
+NUMERIC_CHARACTERS = '0123456789.+-eE \t\r\n'
+
+def count_tokens(text):
+    """
+    counts the whitespace separated tokens in a string, without
+    splitting it
+    """
+    if len(text) == 0:
+        return 0
+    is_space = numpy.frombuffer(text, dtype=numpy.uint8) <= ord(' ')
+    return int(numpy.count_nonzero(is_space[:-1] & ~is_space[1:])) + \
+        int(not is_space[0])
+
 class touchstone():
     """
     class to read touchstone s-parameter files
@@ -46,7 +76,7 @@ class touchstone():
     Touchstone(R) File Format Specification Rev 2.0
     http://www.eda-stds.org/ibis/adhoc/interconnect/touchstone_spec2_draft.pdf
     """
-    def __init__(self,filename):
+    def __init__(self, filename, header_only=False, cache=None):
         ## file name of the touchstone data file
         self.filename = filename
 
@@ -62,6 +92,8 @@ class touchstone():
         self.resistance = None
         ## reference impedance for each s-parameter
         self.reference = None
+        ## order of the 2-port data in a version 2 file (12_21, 21_12)
+        self.two_port_data_order = '21_12'
 
         ## numpy array of original sparameter data
         self.sparameters = None
@@ -71,14 +103,61 @@ class touchstone():
         ## kind of s-parameter data (s1p, s2p, s3p, s4p)
         self.rank = None
         
-        self.load_file(filename)
+        ## number of data lines parsed at a time
+        self.chunk_lines = 10000
+        ## parse regular data with a single numpy call, see parse_values
+        self.fast_parse = True
+
+        ## TouchstoneCache used to load the file, default_cache if None
+        if cache is None:
+            cache = default_cache
+
+        if header_only:
+            f = open(filename)
+            self.read_header(f)
+            f.close()
+        elif cache is not None:
+            cache.load(self)
+        else:
+            self.load_file(filename)
 
     def load_file(self, filename):
         """
         Load the touchstone file into the interal data structures
+
+        The data section is parsed in chunks of `chunk_lines` lines,
+        straight into a preallocated numpy buffer, so the peak memory
+        is set by the size of the data, not the number of values.
         """
         f = open(filename)
-        
+        line = self.read_header(f)
+        values = self.read_values(f, line)
+        f.close()
+
+        # let's do some postprocessing to the read values
+        # for s2p parameters there may be noise parameters in the value list
+        if self.rank == 2:
+            # the first frequency value that is smaller than the last one is the
+            # indicator for the start of the noise section
+            # each set of the s-parameter section is 9 values long
+            pos = numpy.where(numpy.sign(numpy.diff(values[::9])) == -1)
+            if len(pos[0]) != 0:
+                # we have noise data in the values
+                pos = pos[0][0] + 1   # add 1 because diff reduced it by 1
+                noise_values = values[pos*9:]
+                values = values[:pos*9]
+                self.noise = noise_values.reshape((-1,5))
+
+        # reshape the values to match the rank
+        self.sparameters = values.reshape((-1, 1 + 2*self.rank**2))
+
+    def read_header(self, f):
+        """
+        Read the header of an open touchstone file, up to the first
+        line of data. Returns that line, with comments removed, or an
+        empty string if there is no data.
+        """
+        filename = f.name
         extention = filename.split('.')[-1].lower()
         #self.rank = {'s1p':1, 's2p':2, 's3p':3, 's4p':4}.get(extention, None)
         try:
@@ -87,10 +166,7 @@ class touchstone():
             raise (ValueError("filename does not have a s-parameter extention. It has  [%s] instead. please, correct the extension to of form: 'sNp', where N is any integer." %(extention)))
 
         
-        linenr = 0
-        values = []
         while (1):
-            linenr +=1
             line = f.readline()
             if not line:
                 break
@@ -107,9 +183,23 @@ class touchstone():
                 self.version = line.split()[1]
                 continue
 
-            # grab the [reference] string
+            # grab the [reference] string. in version 2 files the
+            # values may continue on the following lines
             if line[:11] == '[reference]':
-                self.reference = [ float(r) for r in line.split()[2:] ]
+                self.reference = [ float(r) for r in line.split()[1:] ]
+                continue
+            if self.reference is not None and len(self.reference) < self.rank \
+                and line[0] not in '#[':
+                self.reference.extend([ float(r) for r in line.split() ])
+                continue
+
+            # grab the [two-port data order] string
+            if line[:21] == '[two-port data order]':
+                self.two_port_data_order = line.split()[-1]
+                continue
+
+            # other version 2 keywords don't change how the data is read
+            if line[0] == '[':
                 continue
 
             # the option line
@@ -133,33 +223,126 @@ class touchstone():
 
                 continue
 
-            # collect all values without taking care of there meaning
-            # we're seperating them later
-            values.extend([ float(v) for v in line.split() ])
-
-        # let's do some postprocessing to the read values
-        # for s2p parameters there may be noise parameters in the value list
-        values = numpy.asarray(values)
-        if self.rank == 2:
-            # the first frequency value that is smaller than the last one is the
-            # indicator for the start of the noise section
-            # each set of the s-parameter section is 9 values long
-            pos = numpy.where(numpy.sign(numpy.diff(values[::9])) == -1)
-            if len(pos[0]) != 0:
-                # we have noise data in the values
-                pos = pos[0][0] + 1   # add 1 because diff reduced it by 1
-                noise_values = values[pos*9:]
-                values = values[:pos*9]
-                self.noise = noise_values.reshape((-1,5))
+            # the first line of data
+            break
 
-        # reshape the values to match the rank
-        self.sparameters = values.reshape((-1, 1 + 2*self.rank**2))
         # multiplier from the frequency unit
         self.frequency_mult = {'hz':1.0, 'khz':1e3,
                                'mhz':1e6, 'ghz':1e9}.get(self.frequency_unit)
         # set the reference to the resistance value if no [reference] is provided
         if not self.reference:
             self.reference = [self.resistance] * self.rank
+        return line
+
+    def iter_value_chunks(self, f, line=''):
+        """
+        Generator parsing the data section of an open touchstone file,
+        `chunk_lines` lines at a time. `line` is the first data line,
+        as returned by read_header. Yields 1d numpy.arrays of values,
+        without taking care of their meaning.
+        """
+        lines = [line + '\n']
+        while (1):
+            lines.extend(itertools.islice(f, self.chunk_lines))
+            if not lines:
+                break
+            yield self.parse_values(lines)
+            lines = []
+
+    def parse_values(self, lines):
+        """
+        Parse a list of data lines into a 1d numpy.array of values.
+
+        If fast_parse is set, and the lines hold nothing but numbers,
+        they are parsed with a single call to numpy.fromstring. Anything
+        else (comments, keywords, malformed values) goes through the
+        per-value tokenizer.
+        """
+        if self.fast_parse:
+            text = ''.join(lines)
+            if len(text.translate(None, NUMERIC_CHARACTERS)) == 0:
+                values = numpy.fromstring(text, sep=' ')
+                # fromstring stops quietly at a value it can't parse
+                if len(values) == count_tokens(text):
+                    return values
+
+        values = []
+        for line in lines:
+            line = line.split('!',1)[0].strip()
+            # skip version 2 keywords, like [end]
+            if line[:1] == '[':
+                continue
+            values.extend([ float(v) for v in line.split() ])
+        return numpy.array(values)
+
+    def read_values(self, f, line=''):
+        """
+        Parse the data section of an open touchstone file into a 1d
+        numpy.array of values, without taking care of their meaning.
+
+        The buffer is preallocated from the file size and the number of
+        bytes per value in the first chunk, and only grown if that
+        estimate was too small.
+        """
+        start = f.tell() - len(line)
+        size = os.fstat(f.fileno()).st_size
+        values = None
+        n = 0
+        for chunk in self.iter_value_chunks(f, line):
+            if values is None:
+                # first chunk, estimate the total number of values
+                bytes_per_value = float(max(f.tell() - start, 1))/max(len(chunk), 1)
+                values = numpy.empty(int(1.05*(size - start)/bytes_per_value) + len(chunk))
+            if n + len(chunk) > len(values):
+                values = numpy.concatenate((values[:n], numpy.empty(max(n, len(chunk)))))
+            values[n:n+len(chunk)] = chunk
+            n += len(chunk)
+        if values is None:
+            return numpy.empty(0)
+        return values[:n].copy()
+
+    def iter_sparameter_arrays(self, npoints=10000):
+        """
+        Generator reading the file in chunks of `npoints` frequency
+        points. Yields (f, s) tuples, in the same form as
+        get_sparameter_arrays, without loading the whole file.
+        Noise data at the end of a s2p file is not returned.
+        """
+        f = open(self.filename)
+        line = self.read_header(f)
+        row_length = 1 + 2*self.rank**2
+        rows = numpy.empty((npoints, row_length))
+        n = 0               # number of rows in the buffer
+        rest = numpy.empty(0)
+        last_frequency = -numpy.inf
+        for chunk in self.iter_value_chunks(f, line):
+            chunk = numpy.concatenate((rest, chunk))
+            n_rows = len(chunk)//row_length
+            rest = chunk[n_rows*row_length:]
+            chunk = chunk[:n_rows*row_length].reshape((-1, row_length))
+
+            if self.rank == 2 and n_rows > 0:
+                # stop at the noise section, see load_file
+                frequency = numpy.concatenate(([last_frequency], chunk[:,0]))
+                pos = numpy.where(numpy.diff(frequency) < 0)[0]
+                if len(pos) != 0:
+                    chunk = chunk[:pos[0]]
+                    rest = None
+                last_frequency = frequency[-1]
+
+            while len(chunk) > 0:
+                m = min(npoints - n, len(chunk))
+                rows[n:n+m] = chunk[:m]
+                chunk = chunk[m:]
+                n += m
+                if n == npoints:
+                    yield self._rows_2_arrays(rows)
+                    n = 0
+            if rest is None:
+                break
+        f.close()
+        if n > 0:
+            yield self._rows_2_arrays(rows[:n])
 
     def get_format(self, format="ri"):
         """
@@ -244,8 +427,13 @@ class touchstone():
           f,a = self.sgetparameter_arrays()
           s11 = a[:,0,0]
         """
-        v = self.sparameters
+        return self._rows_2_arrays(self.sparameters)
 
+    def _rows_2_arrays(self, v):
+        """
+        converts rows of s-parameter data, in the original format, to
+        a frequency vector (in Hz) and a 3d complex numpy array.
+        """
         if self.format == 'ri':
             v_complex = v[:,1::2] + 1j* v[:,2::2]
         elif self.format == 'ma':
@@ -253,9 +441,14 @@ class touchstone():
         elif self.format == 'db':
             v_complex = ((10**(v[:,1::2]/20.0)) * numpy.exp(1j*numpy.pi/180 * v[:,2::2]))
         
+        v_complex = v_complex.reshape((-1, self.rank, self.rank))
+        if self.version[:1] == '2' and (self.rank != 2 or \
+            self.two_port_data_order == '12_21'):
+            # version 2 data is in rows, s11, s12, s13, ...
+            return (v[:,0] * self.frequency_mult, v_complex)
         # this return is tricky its do the stupid way the touchtone lines are in order like s11,s21, etc. because of this we need the transpose command, and axes specifier
         return (v[:,0] * self.frequency_mult,
-                numpy.transpose(v_complex.reshape((-1, self.rank, self.rank)),axes=(0,2,1)))
+                numpy.transpose(v_complex,axes=(0,2,1)))
 
     def get_noise_names(self):
         """
@@ -276,6 +469,181 @@ class touchstone():
         noise_normalized_resistance = noise_values[:,4]
 
 
+## attributes of a touchstone stored in the cache, besides the arrays
+CACHED_ATTRIBUTES = ['version', 'frequency_unit', 'parameter', 'format',
+    'resistance', 'reference', 'two_port_data_order', 'rank',
+    'frequency_mult']
+
+## cache used by all touchstone objects, see enable_cache
+default_cache = None
+
+class TouchstoneCache():
+    """
+    on-disk cache of parsed touchstone files
+
+    The parsed arrays of each file are stored in a numpy .npz file in
+    `directory`, along with the size, modification time and sha1 hash
+    of the source file. A cached file is used if the source has the
+    same size and modification time, or the same size and content. If
+    not, the source is parsed again and the entry replaced.
+
+    When the total size of the entries exceeds `max_size` bytes, the
+    least recently used entries are removed.
+
+    usage:
+      cache = TouchstoneCache('/tmp/ts_cache')
+      t = touchstone('ntwk1.s2p', cache=cache)
+    """
+    def __init__(self, directory=None, max_size=256*2**20):
+        if directory is None:
+            directory = os.path.join(os.path.expanduser('~'), '.mwavepy',
+                                     'touchstone_cache')
+        ## directory holding the cache entries
+        self.directory = directory
+        ## maximum total size of the entries, in bytes
+        self.max_size = max_size
+        ## number of loads served from, and not from, the cache
+        self.hits = 0
+        self.misses = 0
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+
+    def entry_filename(self, filename):
+        """
+        the cache entry for a source file, named by a hash of its path
+        """
+        key = hashlib.sha1(os.path.abspath(filename)).hexdigest()
+        return os.path.join(self.directory, key + '.npz')
+
+    def load(self, ts):
+        """
+        Load the file of the touchstone `ts` from the cache, or parse
+        it and store it in the cache.
+        """
+        stat = os.stat(ts.filename)
+        entry = self.entry_filename(ts.filename)
+        content_hash = None
+        if os.path.isfile(entry):
+            data = numpy.load(entry)
+            header = ast.literal_eval(str(data['header']))
+            valid = header['size'] == stat.st_size
+            if valid and header['mtime'] != stat.st_mtime:
+                # the file was touched, see if its content changed
+                content_hash = sha1_of_file(ts.filename)
+                valid = header['sha1'] == content_hash
+            if valid:
+                for name in CACHED_ATTRIBUTES:
+                    setattr(ts, name, header[name])
+                ts.sparameters = data['sparameters']
+                if header['noise']:
+                    ts.noise = data['noise']
+                noise = data['noise']
+                data.close()
+                if header['mtime'] != stat.st_mtime:
+                    # store the new mtime, so the file isnt hashed again
+                    header['mtime'] = stat.st_mtime
+                    self._write_entry(entry, header, ts.sparameters, noise)
+                else:
+                    # the entry's modification time marks its last use
+                    os.utime(entry, None)
+                self.hits += 1
+                return
+            data.close()
+
+        self.misses += 1
+        ts.load_file(ts.filename)
+        if content_hash is None:
+            content_hash = sha1_of_file(ts.filename)
+        header = dict([(name, getattr(ts, name)) for name in CACHED_ATTRIBUTES])
+        header.update({'size': stat.st_size, 'mtime': stat.st_mtime,
+                       'sha1': content_hash, 'path': os.path.abspath(ts.filename),
+                       'noise': ts.noise is not None})
+        noise = ts.noise
+        if noise is None:
+            noise = numpy.empty(0)
+        self._write_entry(entry, header, ts.sparameters, noise)
+        self.evict()
+
+    def _write_entry(self, entry, header, sparameters, noise):
+        """
+        write a cache entry. the entry is written to a temporary file
+        first, so a reader never sees a partial entry
+        """
+        fd, tmp_filename = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        f = os.fdopen(fd, 'wb')
+        numpy.savez(f, header=numpy.array(repr(header)),
+                    sparameters=sparameters, noise=noise)
+        f.close()
+        os.rename(tmp_filename, entry)
+
+    def entries(self):
+        """
+        returns a list of (last use, size, filename) of all entries
+        """
+        entries = []
+        for name in os.listdir(self.directory):
+            if name.endswith('.npz'):
+                filename = os.path.join(self.directory, name)
+                stat = os.stat(filename)
+                entries.append((stat.st_mtime, stat.st_size, filename))
+        return entries
+
+    @property
+    def size(self):
+        """
+        total size of the entries, in bytes
+        """
+        return sum([size for last_use, size, filename in self.entries()])
+
+    def evict(self):
+        """
+        removes the least recently used entries until the total size
+        is no more than max_size
+        """
+        entries = sorted(self.entries())
+        total = sum([size for last_use, size, filename in entries])
+        while total > self.max_size and entries:
+            last_use, size, filename = entries.pop(0)
+            os.remove(filename)
+            total -= size
+
+    def clear(self):
+        """
+        removes all entries
+        """
+        for last_use, size, filename in self.entries():
+            os.remove(filename)
+
+def sha1_of_file(filename):
+    """
+    sha1 hex digest of the content of a file
+    """
+    h = hashlib.sha1()
+    f = open(filename, 'rb')
+    while (1):
+        block = f.read(2**20)
+        if not block:
+            break
+        h.update(block)
+    f.close()
+    return h.hexdigest()
+
+def enable_cache(directory=None, max_size=256*2**20):
+    """
+    use a TouchstoneCache for all touchstone files which are read,
+    including through mwavepy.Network. returns the cache.
+    """
+    global default_cache
+    default_cache = TouchstoneCache(directory, max_size)
+    return default_cache
+
+def disable_cache():
+    """
+    stop using the cache set by enable_cache. the entries are kept.
+    """
+    global default_cache
+    default_cache = None
+
 #if __name__ == "__main__":
     #import sys
     #import pylab